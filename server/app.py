@@ -1,25 +1,100 @@
 #!/usr/bin/env python3
-from flask import Flask, jsonify, request
+import os
+from datetime import date
+import click
+from flask import Flask, jsonify, request, send_file
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_cors import CORS
 from config import Config
-from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
-
-db = SQLAlchemy()
+import database
+from pagination import fields_arg, list_response
+from hashing import hasher, HashingBusy
+from catalog import catalog
+from profiles import profiles
+from json_provider import FastJSONProvider
+from metrics import metrics, stats_lines
+from revocation import revocations
+from jobs import jobs, prefers_async
+from sync import sync, SyncExpired
+from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt, get_jwt_identity, unset_jwt_cookies
+
+db = SQLAlchemy(session_options={"class_": database.RoutingSession})
 migrate = Migrate()
 
-def create_app():
+def create_app(config=None):
     app = Flask(__name__)
+    app.json = FastJSONProvider(app)
     app.config.from_object(Config)
+    if config:
+        app.config.update(config)
 
     CORS(app, supports_credentials=True)
-    db.init_app(app)
+    database.init_app(app, db)
     jwt = JWTManager()
     jwt.init_app(app)
+    revocations.init_app(app, jwt, db.session)
     migrate.init_app(app, db)
+    hasher.init_app(app)
+    catalog.init_app(app, db.session)
+    profiles.init_app(app, db.session)
+    metrics.init_app(app)
+    jobs.init_app(app, db.session)
+    sync.init_app(app, db.session)
+    metrics.add_source(lambda: stats_lines(
+        "password_hash", hasher.stats(), "Password hashing pool: jobs, rejections, queue wait vs hash time."
+    ))
+
+    @app.errorhandler(HashingBusy)
+    def hashing_busy(e):
+        return jsonify({"error": "Server busy, please retry"}), 503, {"Retry-After": "1"}
+
+    from models import User, Goal, Workout, Exercise, ExerciseLog, Import, Job, parse_date
+    from serializers import USER, GOAL, WORKOUT, WORKOUT_SUMMARY, EXERCISE, EXERCISE_LOG, EXERCISE_FIELDS
+    import bulk
+    import dashboard
+    import export
+    import importer
+    import leaderboards
+    import progress
+    import records
+    import rollups
+    import search
+
+    # GET /goals nests each goal's users with their workouts and logs
+    catalog.watch("goals", Goal, Exercise, User, Workout, ExerciseLog)
+    # Deleting a goal deletes its exercises in the database, unseen by the session
+    catalog.watch("exercises", Exercise, Goal)
+
+    def accepted(job, **extra):
+        """202 for work handed to a background job; poll the Location for its outcome."""
+        return jsonify({**job.to_dict(), **extra}), 202, {"Location": f"/jobs/{job.id}"}
+
+    def date_arg(name):
+        value = request.args.get(name)
+        if not value:
+            return None
+        try:
+            return date.fromisoformat(value)
+        except ValueError:
+            raise ValueError(f"{name} must be a date (YYYY-MM-DD)")
+
+    def int_arg(name):
+        value = request.args.get(name)
+        if value is None:
+            return None
+        try:
+            return int(value)
+        except ValueError:
+            raise ValueError(f"{name} must be an integer")
+
+    def check_batch(items):
+        if not isinstance(items, list) or not items:
+            return "Expected a non-empty JSON array"
+        if len(items) > app.config["BULK_MAX_ITEMS"]:
+            return f"At most {app.config['BULK_MAX_ITEMS']} items per request"
+        return None
 
-    from models import User, Goal, Workout, Exercise, ExerciseLog
     # Home URL
     @app.route('/')
     def index():
@@ -28,8 +103,7 @@ def create_app():
     # Users Endpoints
     @app.route("/users", methods=["GET"])
     def get_users():
-        users = User.query.all()
-        return jsonify([user.to_dict() for user in users]), 200
+        return list_response(User.query, User, USER.dump, options=USER.options, fields=USER.fieldset)
 
     @app.route("/users", methods=["POST"])
     def create_user():
@@ -61,7 +135,7 @@ def create_app():
 
         return jsonify({
             "message": "User created successfully",
-            "user": new_user.to_dict()
+            "user": USER.dump(new_user)
         }), 201
 
     
@@ -72,20 +146,229 @@ def create_app():
         user.name = data.get("name", user.name)
         user.email = data.get("email", user.email)
         db.session.commit()
-        return jsonify(user.to_dict()), 200
+        return jsonify(USER.dump(user)), 200
 
     @app.route("/users/<int:id>", methods=["DELETE"])
     def delete_user(id):
         user = User.query.get_or_404(id)
+        revocations.revoke_user(user.id)
+        if prefers_async():
+            job = jobs.enqueue("delete_user", user_id=user.id)
+            db.session.commit()
+            return accepted(job)
         db.session.delete(user)
         db.session.commit()
         return jsonify({"message": "User deleted"}), 204
 
+    @jobs.handler("delete_user")
+    def delete_user_job(job):
+        user = db.session.get(User, job.user_id)
+        if user is not None:
+            db.session.delete(user)
+            db.session.commit()
+        return {"deleted": user is not None}
+
+    @app.route("/users/<int:id>/stats", methods=["GET"])
+    def user_stats(id):
+        user = User.query.get_or_404(id)
+        try:
+            start = date_arg("from")
+            end = date_arg("to")
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        return jsonify({"user_id": user.id, "days": rollups.stats(user.id, start, end)}), 200
+
+    @app.route("/users/<int:id>/dashboard", methods=["GET"])
+    def user_dashboard(id):
+        """Goals, workouts with their logs, and totals for the DASHBOARD_DAYS days ending ?to= (today)."""
+        user = User.query.get_or_404(id)
+        try:
+            end = date_arg("to") or date.today()
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        return jsonify(dashboard.build(user, end, app.config["DASHBOARD_DAYS"])), 200
+
+    @app.route("/users/<int:id>/export", methods=["GET"])
+    def export_user(id):
+        user = User.query.get_or_404(id)
+        fmt = request.args.get("format", "ndjson")
+        if fmt not in export.EXPORT_FORMATS:
+            return jsonify({"error": f"format must be one of {', '.join(export.EXPORT_FORMATS)}"}), 400
+        return export.export_response(user.id, fmt)
+
+    @app.route("/users/<int:id>/export", methods=["POST"])
+    def export_user_job(id):
+        """Same data as GET, written to a gzipped file by a background job."""
+        user = User.query.get_or_404(id)
+        fmt = request.args.get("format", "ndjson")
+        if fmt not in export.EXPORT_FORMATS:
+            return jsonify({"error": f"format must be one of {', '.join(export.EXPORT_FORMATS)}"}), 400
+        job = jobs.enqueue("export", user_id=user.id, format=fmt)
+        db.session.commit()
+        return accepted(job)
+
+    @app.route("/users/<int:id>/import", methods=["POST"])
+    def import_user(id):
+        user = User.query.get_or_404(id)
+        try:
+            import_id = int_arg("import_id")
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        if import_id is not None:
+            progress = Import.query.filter_by(id=import_id, user_id=user.id).first_or_404()
+            if progress.status == "done":
+                return jsonify({"error": "Import already finished", "import": progress.to_dict()}), 409
+            progress.status = "running"
+        else:
+            upload = request.files.get("file")
+            filename = upload.filename if upload else ""
+            fmt = request.args.get("format") or (
+                "csv" if filename.endswith(".csv") or request.mimetype == "text/csv" else "ndjson"
+            )
+            if fmt not in importer.IMPORT_FORMATS:
+                return jsonify({"error": f"format must be one of {', '.join(importer.IMPORT_FORMATS)}"}), 400
+            progress = Import(user_id=user.id, format=fmt)
+            db.session.add(progress)
+
+        if prefers_async():
+            progress.status = "queued"
+            db.session.flush()
+            job = jobs.enqueue("import", user_id=user.id, import_id=progress.id)
+            importer.save_upload(request, jobs.path(job, "upload"))
+            db.session.commit()
+            return accepted(job, import_id=progress.id)
+        db.session.commit()
+
+        try:
+            importer.run(progress, importer.open_stream(request))
+        except importer.ImportFailed as e:
+            return jsonify({"error": str(e), "import": progress.to_dict()}), 400
+        return jsonify(progress.to_dict()), 200
+
+    @app.route("/users/<int:id>/imports/<int:import_id>", methods=["GET"])
+    def get_import(id, import_id):
+        progress = Import.query.filter_by(id=import_id, user_id=id).first_or_404()
+        return jsonify(progress.to_dict()), 200
+
+    @app.route("/users/<int:id>/progress/<int:exercise_id>", methods=["GET"])
+    def user_progress(id, exercise_id):
+        """
+        The user's best weight (?metric=weight), estimated 1RM (1rm) or volume
+        per training day on an exercise, downsampled to at most ?points= points.
+        """
+        user = User.query.get_or_404(id)
+        exercise = Exercise.query.get_or_404(exercise_id)
+        metric = request.args.get("metric", "weight")
+        if metric not in progress.METRICS:
+            return jsonify({"error": f"metric must be one of: {', '.join(progress.METRICS)}"}), 400
+        try:
+            start = date_arg("from")
+            end = date_arg("to")
+            points = int_arg("points")
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        if points is None:
+            points = app.config["PROGRESS_DEFAULT_POINTS"]
+        if not 1 <= points <= app.config["PROGRESS_MAX_POINTS"]:
+            return jsonify({"error": f"points must be between 1 and {app.config['PROGRESS_MAX_POINTS']}"}), 400
+        result, days = progress.series(user.id, exercise.id, metric, points, start, end)
+        return jsonify({
+            "user_id": user.id, "exercise_id": exercise.id, "metric": metric, "days": days, "points": result,
+        }), 200
+
+    @app.route("/users/<int:id>/records", methods=["GET"])
+    def user_records(id):
+        user = User.query.get_or_404(id)
+        result = records.user_records(user.id)
+        db.session.commit()
+        return jsonify({"user_id": user.id, "records": result}), 200
+
+    @jobs.handler("leaderboards")
+    def leaderboards_job(job):
+        board, subject_ids = job.params["board"], job.params["subject_ids"]
+        count = sum(leaderboards.rebuild(board, subject_id) for subject_id in subject_ids)
+        db.session.commit()
+        return {"rows": count}
+
+    def own_job(id):
+        """The current user's job; 404 for anyone else's, and for jobs with no user like leaderboard rebuilds."""
+        return Job.query.filter_by(id=id, user_id=int(get_jwt_identity())).first_or_404()
+
+    @app.route("/jobs/<int:id>", methods=["GET"])
+    @jwt_required()
+    def get_job(id):
+        return jsonify(own_job(id).to_dict()), 200
+
+    @app.route("/jobs/<int:id>/retry", methods=["POST"])
+    @jwt_required()
+    def retry_job(id):
+        job = own_job(id)
+        if job.status != "failed":
+            return jsonify({"error": "Only failed jobs can be retried", "job": job.to_dict()}), 409
+        jobs.retry(job)
+        db.session.commit()
+        return accepted(job)
+
+    @app.route("/jobs/<int:id>/download", methods=["GET"])
+    @jwt_required()
+    def download_job(id):
+        job = own_job(id)
+        if job.kind != "export" or job.status != "done":
+            return jsonify({"error": "No finished export for this job", "job": job.to_dict()}), 404
+        path = jobs.path(job, export.filename(job.user_id, job.result["format"]))
+        if not os.path.exists(path):
+            return jsonify({"error": "Export file is no longer available"}), 410
+        return send_file(path, mimetype="application/gzip", as_attachment=True,
+                         download_name=export.filename(job.user_id, job.result["format"]))
+
+    @app.cli.command("run-jobs")
+    @click.option("--once", is_flag=True, help="Exit once no jobs are due instead of waiting for more")
+    def run_jobs(once):
+        """Run background jobs in this process (e.g. with JOBS_WORKERS=0 on the web servers)."""
+        jobs.work(once=once)
+
+    @app.cli.command("rebuild-rollups")
+    def rebuild_rollups():
+        """Recompute the daily volume rollup from exercise logs."""
+        count = rollups.rebuild()
+        db.session.commit()
+        print(f"Rebuilt {count} daily volume rows")
+
+    @app.cli.command("rebuild-records")
+    def rebuild_records():
+        """Mark every personal record for recomputation on its next read."""
+        count = records.rebuild()
+        db.session.commit()
+        print(f"Marked {count} personal records for recomputation")
+
+    @app.cli.command("prune-sync")
+    @click.option("--days", type=float, default=None, help="Keep tombstones this many days (default SYNC_TOMBSTONE_DAYS)")
+    def prune_sync(days):
+        """Delete old sync tombstones; clients that last synced before them resync from scratch."""
+        count = sync.prune(app.config["SYNC_TOMBSTONE_DAYS"] if days is None else days)
+        db.session.commit()
+        print(f"Deleted {count} sync tombstones")
+
+    @app.cli.command("rebuild-leaderboards")
+    def rebuild_leaderboards():
+        """Recompute every goal and exercise leaderboard from exercise logs."""
+        count = leaderboards.rebuild()
+        db.session.commit()
+        print(f"Rebuilt {count} leaderboard rows")
+
     # Goals Endpoints
     @app.route("/goals", methods=["GET"])
     def get_goals():
-        goals = Goal.query.all()
-        return jsonify([goal.to_dict() for goal in goals]), 200
+        try:
+            names = fields_arg(GOAL.fieldset)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        if names:
+            return catalog.response("goals", lambda: GOAL.fieldset.rows(Goal.query, names), variant=names)
+        return catalog.response("goals", lambda: [
+            GOAL.dump(goal) for goal in Goal.query.options(*GOAL.options)
+        ])
 
     @app.route("/goals", methods=["POST"])
     def create_goal():
@@ -93,7 +376,7 @@ def create_app():
         new_goal = Goal(name=data["name"])
         db.session.add(new_goal)
         db.session.commit()
-        return jsonify(new_goal.to_dict()), 201
+        return jsonify(GOAL.dump(new_goal)), 201
     
     @app.route("/goals/<int:id>", methods=["PATCH"])
     def update_goal(id):
@@ -101,7 +384,7 @@ def create_app():
         data = request.get_json()
         goal.name = data.get("name", goal.name)
         db.session.commit()
-        return jsonify(goal.to_dict()), 200
+        return jsonify(GOAL.dump(goal)), 200
 
     @app.route("/goals/<int:id>", methods=["DELETE"])
     def delete_goal(id):
@@ -113,64 +396,181 @@ def create_app():
     # Exercises Endpoints
     @app.route("/exercises", methods=["GET"])
     def get_exercises():
-        exercises = Exercise.query.all()
-        return jsonify([
-            {"id": e.id, "name": e.exercise_name, "goal_id": e.goal_id} for e in exercises
+        try:
+            names = fields_arg(EXERCISE_FIELDS)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        if names:
+            return catalog.response("exercises", lambda: EXERCISE_FIELDS.rows(Exercise.query, names), variant=names)
+        return catalog.response("exercises", lambda: [
+            {"id": e.id, "name": e.exercise_name, "goal_id": e.goal_id} for e in Exercise.query.all()
         ])
 
+    def search_limit():
+        return max(1, min(request.args.get("limit", 10, type=int), app.config["SEARCH_MAX_RESULTS"]))
+
+    @app.route("/exercises/autocomplete", methods=["GET"])
+    def autocomplete_exercises():
+        """Exercises with a word starting with ?prefix= (every word of it), best match first."""
+        prefix = request.args.get("prefix", "")
+        if not prefix.strip():
+            return jsonify({"error": "prefix is required"}), 400
+        return jsonify(search.exercises(prefix, search_limit())), 200
+
     @app.route("/exercises", methods=["POST"])
     def create_exercise():
         data = request.get_json()
         new_exercise = Exercise(exercise_name=data["exercise_name"], goal_id=data["goal_id"])
         db.session.add(new_exercise)
         db.session.commit()
-        return jsonify(new_exercise.to_dict()), 201
+        return jsonify(EXERCISE.dump(new_exercise)), 201
     
     @app.route("/exercises/<int:id>", methods=["PATCH"])
     def update_exercise(id):
         exercise = Exercise.query.get_or_404(id)
         data = request.get_json()
         exercise.name = data.get("name", exercise.exercise_name)
+        previous_goal_id = exercise.goal_id
         exercise.goal_id = data.get("goal_id", exercise.goal_id)
+        if exercise.goal_id != previous_goal_id:
+            # Its volume moves between goal boards; recounted in the background
+            subject_ids = [id for id in (previous_goal_id, exercise.goal_id) if id is not None]
+            jobs.enqueue("leaderboards", board="goals", subject_ids=subject_ids)
         db.session.commit()
-        return jsonify(exercise.to_dict()), 200
+        return jsonify(EXERCISE.dump(exercise)), 200
 
     @app.route("/exercises/<int:id>", methods=["DELETE"])
     def delete_exercise(id):
         exercise = Exercise.query.get_or_404(id)
+        # Its logs are kept without an exercise, so they drop out of the goal's board
+        if exercise.goal_id is not None:
+            jobs.enqueue("leaderboards", board="goals", subject_ids=[exercise.goal_id])
         db.session.delete(exercise)
         db.session.commit()
         return jsonify({"message": "Exercise deleted"}), 204
     
+    # Search Endpoints
+    @app.route("/search", methods=["GET"])
+    def search_all():
+        """Exercises by name and workouts by title or notes matching ?q=, optionally one ?user_id='s workouts."""
+        text = request.args.get("q", "")
+        if not text.strip():
+            return jsonify({"error": "q is required"}), 400
+        limit = search_limit()
+        return jsonify({
+            "query": text,
+            "exercises": search.exercises(text, limit),
+            "workouts": search.workouts(text, limit, request.args.get("user_id", type=int)),
+        }), 200
+
+    # Leaderboards Endpoints
+    def leaderboard_response(board, subject_id, body):
+        try:
+            period = leaderboards.period_arg(request.args.get("period"))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        size = app.config["LEADERBOARD_SIZE"]
+        limit = max(1, min(request.args.get("limit", 10, type=int), size))
+        return jsonify({
+            **body,
+            "period": period,
+            "entries": leaderboards.top(board, subject_id, period, limit),
+        }), 200
+
+    @app.route("/leaderboards/goals/<int:id>", methods=["GET"])
+    def goal_leaderboard(id):
+        """Training volume on the goal's exercises, for ?period=week (default), all or a given week."""
+        goal = Goal.query.get_or_404(id)
+        return leaderboard_response("goals", goal.id, {"goal_id": goal.id, "score": "volume"})
+
+    @app.route("/leaderboards/exercises/<int:id>", methods=["GET"])
+    def exercise_leaderboard(id):
+        """Heaviest weight logged for the exercise, for ?period=week (default), all or a given week."""
+        exercise = Exercise.query.get_or_404(id)
+        return leaderboard_response("exercises", exercise.id, {"exercise_id": exercise.id, "score": "max_weight"})
+
     # Workouts Endpoints
     @app.route("/workouts", methods=["GET"])
     def get_workouts():
-        workouts = Workout.query.all()
-        return jsonify([
-            {"id": w.id, "title": w.title, "date": w.date, "user_id": w.user_id} for w in workouts
-        ])
+        query = Workout.query
+        try:
+            user_id = int_arg("user_id")
+            start = date_arg("from")
+            end = date_arg("to")
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        order = request.args.get("order", "id")
+        if order not in ("id", "date", "-date"):
+            return jsonify({"error": "order must be one of id, date, -date"}), 400
+
+        # With user_id, range and ordering by date come from ix_workouts_user_id_date
+        if user_id is not None:
+            query = query.filter(Workout.user_id == user_id)
+        if start:
+            query = query.filter(Workout.date >= start)
+        if end:
+            query = query.filter(Workout.date <= end)
+        sort = (Workout.date, parse_date) if order != "id" else None
+
+        return list_response(query, Workout, WORKOUT_SUMMARY.dump, sort=sort, descending=order == "-date",
+                             fields=WORKOUT_SUMMARY.fieldset)
 
     @app.route("/workouts", methods=["POST"])
     def create_workout():
         data = request.get_json()
-        new_workout = Workout(title=data["title"], date=data["date"], user_id=data["user_id"])
+        try:
+            workout_date = parse_date(data["date"])
+        except ValueError:
+            return jsonify({"error": "date must be an ISO 8601 date"}), 400
+        new_workout = Workout(title=data["title"], date=workout_date, notes=data.get("notes", ""), user_id=data["user_id"])
         db.session.add(new_workout)
         db.session.commit()
-        return jsonify(new_workout.to_dict()), 201
+        return jsonify(WORKOUT.dump(new_workout)), 201
     
+    @app.route("/workouts/bulk", methods=["POST"])
+    def create_workouts_bulk():
+        items = request.get_json()
+        error = check_batch(items)
+        if error:
+            return jsonify({"error": error}), 400
+        results, ok = bulk.create_workouts(items)
+        if not ok:
+            return jsonify({"error": "Invalid items, nothing was saved", "results": results}), 400
+        return jsonify({"results": results}), 201
+
     @app.route("/workouts/<int:id>", methods=["PATCH"])
     def update_workout(id):
         workout = Workout.query.get_or_404(id)
         data = request.get_json()
+        try:
+            workout_date = parse_date(data.get("date", workout.date))
+        except ValueError:
+            return jsonify({"error": "date must be an ISO 8601 date"}), 400
+        moved = (
+            workout_date != workout.date
+            or data.get("user_id", workout.user_id) != workout.user_id
+        )
+        if moved:
+            rollups.remove_workout(workout)
+            records.remove_workout(workout)
+            leaderboards.remove_workout(workout)
         workout.title = data.get("title", workout.title)
-        workout.date = data.get("date", workout.date)
+        workout.notes = data.get("notes", workout.notes)
+        workout.date = workout_date
         workout.user_id = data.get("user_id", workout.user_id)
+        if moved:
+            rollups.add_workout(workout)
+            records.add_workout(workout)
+            leaderboards.add_workout(workout)
         db.session.commit()
-        return jsonify(workout.to_dict()), 200
+        return jsonify(WORKOUT.dump(workout)), 200
 
     @app.route("/workouts/<int:id>", methods=["DELETE"])
     def delete_workout(id):
         workout = Workout.query.get_or_404(id)
+        rollups.remove_workout(workout)
+        records.remove_workout(workout)
+        leaderboards.remove_workout(workout)
         db.session.delete(workout)
         db.session.commit()
         return jsonify({"message": "Workout deleted"}), 204
@@ -178,17 +578,7 @@ def create_app():
     # Exercise Logs Endpoints
     @app.route("/exercise_logs", methods=["GET"])
     def get_logs():
-        logs = ExerciseLog.query.all()
-        return jsonify([
-            {
-                "id": log.id,
-                "sets": log.sets,
-                "reps": log.reps,
-                "weight": log.weight,
-                "workout_id": log.workout_id,
-                "exercise_id": log.exercise_id
-            } for log in logs
-        ])
+        return list_response(ExerciseLog.query, ExerciseLog, EXERCISE_LOG.dump, fields=EXERCISE_LOG.fieldset)
 
     @app.route("/exercise_logs", methods=["POST"])
     def create_log():
@@ -201,24 +591,47 @@ def create_app():
             exercise_id=data["exercise_id"]
         )
         db.session.add(new_log)
+        rollups.add_log(new_log)
+        records.add_log(new_log)
+        leaderboards.add_log(new_log)
         db.session.commit()
-        return jsonify(new_log.to_dict()), 201
+        return jsonify(EXERCISE_LOG.dump(new_log)), 201
     
+    @app.route("/exercise_logs/bulk", methods=["POST"])
+    def create_logs_bulk():
+        items = request.get_json()
+        error = check_batch(items)
+        if error:
+            return jsonify({"error": error}), 400
+        results, ok = bulk.create_logs(items)
+        if not ok:
+            return jsonify({"error": "Invalid items, nothing was saved", "results": results}), 400
+        return jsonify({"results": results}), 201
+
     @app.route("/exercise_logs/<int:id>", methods=["PATCH"])
     def update_log(id):
         log = ExerciseLog.query.get_or_404(id)
         data = request.get_json()
+        rollups.remove_log(log)
+        records.remove_log(log)
+        leaderboards.remove_log(log)
         log.sets = data.get("sets", log.sets)
         log.reps = data.get("reps", log.reps)
         log.weight = data.get("weight", log.weight)
         log.workout_id = data.get("workout_id", log.workout_id)
         log.exercise_id = data.get("exercise_id", log.exercise_id)
+        rollups.add_log(log)
+        records.add_log(log)
+        leaderboards.add_log(log)
         db.session.commit()
-        return jsonify(log.to_dict()), 200
+        return jsonify(EXERCISE_LOG.dump(log)), 200
 
     @app.route("/exercise_logs/<int:id>", methods=["DELETE"])
     def delete_log(id):
         log = ExerciseLog.query.get_or_404(id)
+        rollups.remove_log(log)
+        records.remove_log(log)
+        leaderboards.remove_log(log)
         db.session.delete(log)
         db.session.commit()
         return jsonify({"message": "Exercise log deleted"}), 204
@@ -250,6 +663,9 @@ def create_app():
             if goal:
                 user.goals.append(goal)
 
+        db.session.add(user)
+        db.session.commit()
+        return jsonify(USER.dump(user)), 201
 
     # Login authentication
     @app.route("/auth/login", methods=["POST"])
@@ -269,17 +685,58 @@ def create_app():
         if not user or not user.check_password(password):
             return jsonify({"error": "invalid credentials"}), 401
 
-        access_token = create_access_token(identity=user.id)
-        return jsonify({"access_token": access_token, "user": user.to_dict()}), 200
+        # Upgrade hashes made with older method/parameters while we have the password
+        if user.password_needs_rehash():
+            user.set_password(password)
+            db.session.commit()
+
+        access_token = create_access_token(identity=str(user.id))
+        return jsonify({"access_token": access_token, "user": USER.dump(user)}), 200
 
+    @app.route("/auth/logout", methods=["POST"])
+    @jwt_required()
+    def auth_logout():
+        """Revokes the token this request was made with."""
+        revocations.revoke(get_jwt())
+        db.session.commit()
+        response = jsonify({"message": "Logged out"})
+        unset_jwt_cookies(response)
+        return response, 200
+
+    @app.route("/auth/logout-all", methods=["POST"])
+    @jwt_required()
+    def auth_logout_all():
+        """Revokes every token issued to the current user so far, on any device."""
+        revocations.revoke_user(get_jwt_identity())
+        db.session.commit()
+        response = jsonify({"message": "Logged out everywhere"})
+        unset_jwt_cookies(response)
+        return response, 200
+
+    # Changes to goals, exercises and the current user's workouts and logs
+    # since ?since= (a previous response's version); everything without it
+    @app.route("/sync", methods=["GET"])
+    @jwt_required()
+    def sync_changes():
+        try:
+            since = int_arg("since")
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        if since is not None and since < 0:
+            return jsonify({"error": "since must not be negative"}), 400
+        try:
+            return jsonify(sync.changes(int(get_jwt_identity()), since)), 200
+        except SyncExpired as e:
+            return jsonify({"error": str(e), "version": e.version}), 410
 
     # shows current user info
     @app.route("/users/me", methods=["GET"])
     @jwt_required()
     def users_me():
-        current_user_id = get_jwt_identity()
-        user = User.query.get_or_404(current_user_id)
-        return jsonify(user.to_dict()), 200
+        current_user_id = int(get_jwt_identity())
+        return profiles.response(current_user_id, lambda: USER.dump(
+            User.query.options(*USER.options).get_or_404(current_user_id)
+        ))
     return app
 
 
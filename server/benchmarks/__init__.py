@@ -0,0 +1,13 @@
+"""
+Benchmark suite for the Fitness Tracker API.
+
+Run from the server/ directory:
+
+    python -m benchmarks.generate --database sqlite:///bench.db --users 100000 --logs 5000000
+    python -m benchmarks.run --database sqlite:///bench.db                 # in-process, every route
+    python -m benchmarks.run --url http://127.0.0.1:5000 --threads 16      # HTTP load against a server
+    python -m benchmarks.compare results/old.json results/new.json
+    python -m benchmarks.json_encoding --rows 10000                       # JSON provider micro-benchmark
+    python -m benchmarks.delete_cascade --sizes 10,1000,10000             # user delete time vs history size
+    python -m benchmarks.bulk_ingest --batch 1000                         # bulk log rows/s; fails under 10k
+"""
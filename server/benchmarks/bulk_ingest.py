@@ -0,0 +1,80 @@
+"""
+Benchmark: POST /exercise_logs/bulk throughput in log rows per second,
+rollup, personal record and leaderboard maintenance included. Exits
+non-zero when it falls below --floor, the 10k rows/s bulk ingest target.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from sqlalchemy import insert
+
+from app import create_app, db
+
+FLOOR = 10000
+
+
+def _seed(users, workouts_per_user, exercises):
+    from models import User, Goal, Exercise, Workout
+
+    goal = Goal(name="bench")
+    db.session.add(goal)
+    db.session.flush()
+    exercise_ids = db.session.execute(
+        insert(Exercise).returning(Exercise.id, sort_by_parameter_order=True),
+        [{"exercise_name": f"bench_{i}", "goal_id": goal.id} for i in range(exercises)],
+    ).scalars().all()
+    user_ids = db.session.execute(
+        insert(User).returning(User.id, sort_by_parameter_order=True),
+        [{"name": "Bench", "email": f"bulk_{i}@example.com", "password_hash": "x"} for i in range(users)],
+    ).scalars().all()
+    today = date.today()
+    workout_ids = db.session.execute(
+        insert(Workout).returning(Workout.id, sort_by_parameter_order=True),
+        [{"title": "Bench", "date": today - timedelta(days=day), "notes": "", "user_id": user_id}
+         for user_id in user_ids for day in range(workouts_per_user)],
+    ).scalars().all()
+    db.session.commit()
+    return workout_ids, exercise_ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch", type=int, default=1000, help="Logs per request")
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--floor", type=float, default=FLOOR, help="Minimum rows/s")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as directory:
+        app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.join(directory, 'bulk.db')}", "DATABASE_PROFILE": "production"})
+        with app.app_context():
+            db.create_all()
+            workout_ids, exercise_ids = _seed(users=50, workouts_per_user=40, exercises=30)
+            client = app.test_client()
+            rows, seconds = 0, 0.0
+            for _ in range(args.requests):
+                body = [
+                    {"sets": rng.randint(1, 6), "reps": rng.randint(1, 15), "weight": rng.choice([20, 40, 60, 80, 100]),
+                     "workout_id": rng.choice(workout_ids), "exercise_id": rng.choice(exercise_ids)}
+                    for _ in range(args.batch)
+                ]
+                db.session.remove()
+                started = time.perf_counter()
+                response = client.post("/exercise_logs/bulk", json=body)
+                seconds += time.perf_counter() - started
+                assert response.status_code == 201, (response.status_code, response.get_data(as_text=True)[:200])
+                rows += args.batch
+
+    rate = rows / seconds
+    print(f"{rows:,} rows in {seconds:.2f}s: {rate:,.0f} rows/s (floor {args.floor:,.0f})")
+    if rate < args.floor:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""Compares two benchmark result files scenario by scenario."""
+import argparse
+import json
+
+
+def _fmt(value, unit=""):
+    return f"{value:.2f}{unit}" if value is not None else "-"
+
+
+def _change(old, new):
+    if not old or new is None:
+        return ""
+    return f"{(new - old) / old * 100:+.0f}%"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--metric", default="p95_ms", help="p50_ms, p95_ms, p99_ms, mean_ms or throughput_rps")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        old = json.load(f)
+    with open(args.candidate) as f:
+        new = json.load(f)
+
+    print(f"{old['commit']} ({old['mode']}) -> {new['commit']} ({new['mode']}), {args.metric}")
+    print(f"{'scenario':48} {'before':>10} {'after':>10} {'change':>8} {'queries':>12}")
+    for name in sorted(set(old["results"]) | set(new["results"])):
+        a = old["results"].get(name, {})
+        b = new["results"].get(name, {})
+        queries = f"{_fmt(a.get('queries_per_request'))}->{_fmt(b.get('queries_per_request'))}" \
+            if "queries_per_request" in a or "queries_per_request" in b else ""
+        print(f"{name:48} {_fmt(a.get(args.metric)):>10} {_fmt(b.get(args.metric)):>10} "
+              f"{_change(a.get(args.metric), b.get(args.metric)):>8} {queries:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Benchmark: DELETE /users/<id> with database-side cascades, against loading
+the user's history into the session and deleting it row by row (what the
+ORM cascade did before ON DELETE CASCADE).
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+from sqlalchemy import insert
+from sqlalchemy.orm import selectinload
+
+from app import create_app, db
+
+LOGS_PER_WORKOUT = 8
+
+
+def _seed_user(workouts):
+    from models import User, Workout, ExerciseLog, Exercise, Goal
+
+    exercise = Exercise.query.first()
+    if exercise is None:
+        goal = Goal(name="bench")
+        exercise = Exercise(exercise_name="bench", goal=goal)
+        db.session.add(exercise)
+        db.session.flush()
+    user = User(name="Bench", email=f"delete_{time.monotonic_ns()}@example.com", password_hash="x")
+    db.session.add(user)
+    db.session.flush()
+    today = date.today()
+    workout_ids = db.session.execute(
+        insert(Workout).returning(Workout.id, sort_by_parameter_order=True),
+        [{"title": "Bench", "date": today - timedelta(days=i), "notes": "", "user_id": user.id} for i in range(workouts)],
+    ).scalars().all()
+    db.session.execute(insert(ExerciseLog), [
+        {"sets": 3, "reps": 5, "weight": 100, "workout_id": workout_id, "exercise_id": exercise.id}
+        for workout_id in workout_ids for _ in range(LOGS_PER_WORKOUT)
+    ])
+    db.session.commit()
+    return user.id
+
+
+def _measure(delete):
+    db.session.remove()
+    tracemalloc.start()
+    started = time.perf_counter()
+    delete()
+    seconds = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak
+
+
+def _database_cascade(client, user_id):
+    def delete():
+        response = client.delete(f"/users/{user_id}")
+        assert response.status_code == 204, response.status_code
+    return delete
+
+
+def _loaded_cascade(user_id):
+    from models import User, Workout
+
+    def delete():
+        user = db.session.execute(
+            db.select(User).options(selectinload(User.workouts).selectinload(Workout.exercises))
+            .where(User.id == user_id)
+        ).scalar_one()
+        db.session.delete(user)
+        db.session.commit()
+    return delete
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10,100,1000,10000", help="Comma-separated workouts per user")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.join(directory, 'delete.db')}"})
+        with app.app_context():
+            db.create_all()
+            client = app.test_client()
+            print(f"{'workouts':>9} {'logs':>9} {'cascade':>10} {'ms':>10} {'peak MiB':>9}")
+            for size in (int(size) for size in args.sizes.split(",")):
+                for name, delete in [
+                    ("database", lambda user_id: _database_cascade(client, user_id)),
+                    ("loaded", _loaded_cascade),
+                ]:
+                    seconds, peak = _measure(delete(_seed_user(size)))
+                    print(f"{size:9,} {size * LOGS_PER_WORKOUT:9,} {name:>10} {seconds * 1000:10.1f} {peak / 2**20:9.1f}")
+
+
+if __name__ == "__main__":
+    main()
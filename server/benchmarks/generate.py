@@ -0,0 +1,144 @@
+"""Synthetic dataset generator: bulk core inserts of users, workouts and logs."""
+import argparse
+import random
+import time
+from datetime import date, timedelta
+from sqlalchemy import event, func, insert, select
+
+from app import create_app, db
+from hashing import hasher
+
+GOALS = ["lose_weight", "gain_muscle", "add_weight", "stay_fit", "grow_glutes"]
+EXERCISES = [
+    "squat", "front_squat", "deadlift", "romanian_deadlift", "bench_press", "incline_bench_press",
+    "overhead_press", "push_press", "barbell_row", "pull_up", "chin_up", "lat_pulldown", "dip",
+    "lunge", "hip_thrust", "glute_bridge", "leg_press", "leg_curl", "leg_extension", "calf_raise",
+    "bicep_curl", "tricep_extension", "face_pull", "lateral_raise", "plank", "kettlebell_swing",
+    "burpee", "box_jump", "rowing_machine", "cycling",
+]
+TITLES = ["Push day", "Pull day", "Leg day", "Full body", "Upper body", "Lower body", "Conditioning"]
+PASSWORD = "benchmark"
+BATCH = 10000
+
+
+def _batched_insert(table, rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH:
+            db.session.execute(insert(table), batch)
+            batch = []
+    if batch:
+        db.session.execute(insert(table), batch)
+
+
+def _next_id(model):
+    return (db.session.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+
+def generate(users, logs, logs_per_workout=8, days=3 * 365, seed=1):
+    from models import User, Goal, Exercise, Workout, ExerciseLog, user_goals
+    import leaderboards
+    import records
+    import rollups
+
+    rng = random.Random(seed)
+    counts = {}
+
+    goal_ids = []
+    for name in GOALS:
+        goal = Goal.query.filter_by(name=name).first() or Goal(name=name)
+        db.session.add(goal)
+        db.session.flush()
+        goal_ids.append(goal.id)
+
+    first_exercise = _next_id(Exercise)
+    _batched_insert(Exercise, (
+        {"id": first_exercise + i, "exercise_name": name, "goal_id": goal_ids[i % len(goal_ids)]}
+        for i, name in enumerate(EXERCISES)
+    ))
+    exercise_ids = list(range(first_exercise, first_exercise + len(EXERCISES)))
+
+    # One shared hash, made with the app's configured method so logins don't
+    # rehash (and cost what they do in production); every user logs in with PASSWORD
+    password_hash = hasher.hash(PASSWORD)
+    first_user = _next_id(User)
+    user_ids = range(first_user, first_user + users)
+    _batched_insert(User, (
+        {"id": id, "name": f"bench_user_{id}", "email": f"bench_{id}@example.com", "password_hash": password_hash}
+        for id in user_ids
+    ))
+    _batched_insert(user_goals, (
+        {"user_id": id, "goal_id": rng.choice(goal_ids)} for id in user_ids
+    ))
+    counts["users"] = users
+
+    workouts = max(1, logs // logs_per_workout)
+    first_workout = _next_id(Workout)
+    today = date.today()
+    # Skewed so a few users have long histories, like real data
+    owners = [first_user + min(users - 1, int(rng.paretovariate(1.2)) - 1) if rng.random() < 0.3
+              else rng.choice(user_ids) for _ in range(workouts)]
+    _batched_insert(Workout, (
+        {
+            "id": first_workout + i,
+            "title": rng.choice(TITLES),
+            "date": today - timedelta(days=rng.randrange(days)),
+            "notes": "",
+            "user_id": owner,
+        }
+        for i, owner in enumerate(owners)
+    ))
+    counts["workouts"] = workouts
+
+    def log_rows():
+        for i in range(logs):
+            sets = rng.randint(1, 6)
+            yield {
+                "sets": sets,
+                "reps": rng.randint(1, 15),
+                "weight": round(rng.uniform(5, 200) / 2.5) * 2.5,
+                "workout_id": first_workout + i % workouts,
+                "exercise_id": rng.choice(exercise_ids),
+            }
+    _batched_insert(ExerciseLog, log_rows())
+    counts["exercise_logs"] = logs
+    db.session.flush()
+
+    counts["daily_volumes"] = rollups.rebuild()
+    counts["personal_records"] = records.rebuild()
+    counts["leaderboards"] = leaderboards.rebuild()
+    db.session.commit()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--database", required=True, help="SQLAlchemy URL, e.g. sqlite:///bench.db")
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--logs", type=int, default=5_000_000)
+    parser.add_argument("--logs-per-workout", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    app = create_app({"SQLALCHEMY_DATABASE_URI": args.database})
+    with app.app_context():
+        db.create_all()
+        if db.engine.dialect.name == "sqlite":
+            # Throwaway dataset: trade durability for load speed
+            @event.listens_for(db.engine, "connect")
+            def fast_pragmas(conn, record):
+                conn.execute("PRAGMA journal_mode=OFF")
+                conn.execute("PRAGMA synchronous=OFF")
+            db.engine.dispose()
+
+        started = time.perf_counter()
+        counts = generate(args.users, args.logs, args.logs_per_workout, seed=args.seed)
+        elapsed = time.perf_counter() - started
+        rows = counts["users"] + counts["workouts"] + counts["exercise_logs"]
+        print(", ".join(f"{count} {name}" for name, count in counts.items()))
+        print(f"Generated in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Micro-benchmark: Flask's default JSON provider vs FastJSONProvider on list payloads."""
+import argparse
+import time
+from datetime import date, timedelta
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import create_engine, insert, select
+
+import json_provider
+from json_provider import FastJSONProvider
+
+
+def _dataset(rows):
+    """`rows` workout-like rows from an in-memory SQLite table, as Rows and as dicts."""
+    from sqlalchemy import Column, Date, Integer, MetaData, String, Table, Text
+
+    metadata = MetaData()
+    table = Table(
+        "workouts", metadata,
+        Column("id", Integer, primary_key=True), Column("title", String(100)), Column("date", Date),
+        Column("notes", Text), Column("user_id", Integer),
+    )
+    engine = create_engine("sqlite://")
+    metadata.create_all(engine)
+    today = date.today()
+    with engine.begin() as conn:
+        conn.execute(insert(table), [
+            {"title": f"Workout {i}", "date": today - timedelta(days=i % 1000), "notes": "", "user_id": i % 97}
+            for i in range(rows)
+        ])
+        result = conn.execute(select(table)).all()
+    dicts = [{**row._mapping, "date": row.date.isoformat()} for row in result]
+    return result, dicts
+
+
+def _time(render, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = render()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, len(body)
+
+
+def _body(response):
+    return b"".join(response.response)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=20, help="Runs per case; the best time is reported")
+    args = parser.parse_args()
+
+    rows, dicts = _dataset(args.rows)
+    app = Flask(__name__)
+    app.config["JSON_STREAM_THRESHOLD"] = 1000
+    default = DefaultJSONProvider(app)
+    fast = FastJSONProvider(app)
+    fragment = json_provider.Fragment(fast.dumps(dicts))
+
+    cases = [
+        ("default provider, dicts", lambda: _body(default.response(dicts))),
+        ("fast provider, dicts", lambda: _body(fast.response(dicts))),
+        ("fast provider, Rows", lambda: _body(fast.response(rows))),
+        ("fast provider, pre-encoded fragment", lambda: _body(fast.response({"items": fragment}))),
+    ]
+    if json_provider.orjson is None:
+        print("orjson isn't installed; the fast provider is using the stdlib encoder")
+
+    with app.app_context():
+        baseline = None
+        print(f"{'case':40} {'ms':>9} {'rows/s':>12} {'bytes':>10} {'speedup':>8}")
+        for name, render in cases:
+            seconds, size = _time(render, args.repeat)
+            baseline = baseline or seconds
+            print(f"{name:40} {seconds * 1000:9.2f} {args.rows / seconds:12,.0f} {size:10,} {baseline / seconds:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
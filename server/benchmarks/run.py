@@ -0,0 +1,220 @@
+"""Drives every route in-process or over HTTP and records latency statistics."""
+import argparse
+import json
+import os
+import subprocess
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from http.client import HTTPConnection
+from urllib.parse import urlsplit
+from sqlalchemy import event, func, select
+
+from app import create_app, db
+from benchmarks.generate import PASSWORD
+from benchmarks.scenarios import Context, SCENARIOS
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def percentile(ordered, p):
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples, elapsed):
+    latencies = sorted(s["seconds"] * 1000 for s in samples)
+    summary = {
+        "requests": len(samples),
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "mean_ms": sum(latencies) / len(latencies) if latencies else None,
+        "throughput_rps": len(samples) / elapsed if elapsed else None,
+        "statuses": dict(Counter(str(s["status"]) for s in samples)),
+    }
+    queries = [s["queries"] for s in samples if s.get("queries") is not None]
+    if queries:
+        summary["queries_per_request"] = sum(queries) / len(queries)
+    return summary
+
+
+def id_ranges():
+    from models import User, Goal, Exercise, Workout, ExerciseLog
+
+    ranges = {}
+    for table, model in [("users", User), ("goals", Goal), ("exercises", Exercise),
+                         ("workouts", Workout), ("exercise_logs", ExerciseLog)]:
+        low, high = db.session.execute(select(func.min(model.id), func.max(model.id))).one()
+        ranges[table] = (low or 1, high or 1)
+    return ranges
+
+
+def run_client(app, scenarios, iterations, seed):
+    """Sequential in-process run through the Flask test client, counting SQL per request."""
+    from flask_jwt_extended import create_access_token
+
+    results = {}
+    with app.app_context():
+        ctx = Context(id_ranges(), seed)
+        queries = [0]
+
+        def count(*args):
+            queries[0] += 1
+
+        event.listen(db.engine, "before_cursor_execute", count)
+        client = app.test_client()
+        client.set_cookie("access_token_cookie", create_access_token(identity=str(ctx.pick("users"))))
+
+        for scenario in scenarios:
+            samples = []
+            started = time.perf_counter()
+            for _ in range(iterations):
+                request = scenario.build(ctx)
+                if request is None:
+                    continue
+                method, path, body = request
+                db.session.remove()
+                queries[0] = 0
+                t0 = time.perf_counter()
+                response = client.open(path, method=method, json=body)
+                response.get_data()
+                seconds = time.perf_counter() - t0
+                samples.append({"seconds": seconds, "status": response.status_code, "queries": queries[0]})
+                if scenario.collect and response.status_code < 300:
+                    scenario.collect(ctx, response.get_json())
+            results[scenario.name] = summarize(samples, time.perf_counter() - started)
+            print(f"{scenario.name:48} p50 {results[scenario.name]['p50_ms'] or 0:8.2f} ms"
+                  f"  {results[scenario.name].get('queries_per_request', 0):6.1f} queries")
+        event.remove(db.engine, "before_cursor_execute", count)
+    return results
+
+
+def run_http(url, app, scenarios, threads, duration, seed):
+    """Multi-threaded load against a running server; scenarios are mixed uniformly."""
+    with app.app_context():
+        ranges = id_ranges()
+    parts = urlsplit(url)
+    samples = defaultdict(list)
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def login(conn, ctx):
+        body = json.dumps({"email": f"bench_{ctx.pick('users')}@example.com", "password": PASSWORD})
+        conn.request("POST", "/auth/login", body, {"Content-Type": "application/json"})
+        response = conn.getresponse()
+        data = json.loads(response.read() or b"{}")
+        return f"access_token_cookie={data.get('access_token', '')}"
+
+    def worker(n):
+        ctx = Context(ranges, seed + n)
+        conn = HTTPConnection(parts.hostname, parts.port or 80, timeout=60)
+        cookie = login(conn, ctx)
+        local = defaultdict(list)
+        while time.perf_counter() < deadline:
+            scenario = ctx.rng.choice(scenarios)
+            request = scenario.build(ctx)
+            if request is None:
+                continue
+            method, path, body = request
+            headers = {"Cookie": cookie}
+            if body is not None:
+                headers["Content-Type"] = "application/json"
+                body = json.dumps(body)
+            t0 = time.perf_counter()
+            try:
+                conn.request(method, path, body, headers)
+                response = conn.getresponse()
+                payload = response.read()
+                status = response.status
+            except OSError:
+                conn.close()
+                conn = HTTPConnection(parts.hostname, parts.port or 80, timeout=60)
+                payload, status = b"", "connection_error"
+            local[scenario.name].append({"seconds": time.perf_counter() - t0, "status": status})
+            if scenario.collect and isinstance(status, int) and status < 300:
+                scenario.collect(ctx, json.loads(payload))
+        with lock:
+            for name, items in local.items():
+                samples[name].extend(items)
+
+    started = time.perf_counter()
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    results = {name: summarize(items, elapsed) for name, items in samples.items()}
+    everything = [s for items in samples.values() for s in items]
+    results["TOTAL"] = summarize(everything, elapsed)
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--database", required=True, help="SQLAlchemy URL of a generated dataset")
+    parser.add_argument("--url", help="Base URL of a running server; runs the threaded HTTP load test")
+    parser.add_argument("--iterations", type=int, default=50, help="Requests per scenario (in-process)")
+    parser.add_argument("--threads", type=int, default=8, help="Client threads (HTTP)")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of load (HTTP)")
+    parser.add_argument("--writes", action="store_true", help="Include writes in the HTTP mix")
+    parser.add_argument("--heavy", action="store_true", help="Include whole-table scenarios")
+    parser.add_argument("--only", help="Comma-separated endpoint names to run")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/<commit>-<mode>.json)")
+    args = parser.parse_args()
+
+    app = create_app({"SQLALCHEMY_DATABASE_URI": args.database})
+    endpoints = {rule.endpoint for rule in app.url_map.iter_rules()} - {"static"}
+    covered = {scenario.endpoint for scenario in SCENARIOS}
+    for endpoint in sorted(endpoints - covered):
+        print(f"warning: no benchmark scenario for {endpoint}")
+
+    scenarios = [s for s in SCENARIOS if args.heavy or not s.heavy]
+    if args.only:
+        wanted = set(args.only.split(","))
+        scenarios = [s for s in scenarios if s.endpoint in wanted]
+
+    if args.url:
+        mode = "http"
+        scenarios = [s for s in scenarios if args.writes or not s.write]
+        results = run_http(args.url, app, scenarios, args.threads, args.duration, args.seed)
+    else:
+        mode = "client"
+        results = run_client(app, scenarios, args.iterations, args.seed)
+
+    with app.app_context():
+        from models import User, Workout, ExerciseLog
+        dataset = {name: db.session.execute(select(func.count()).select_from(model)).scalar()
+                   for name, model in [("users", User), ("workouts", Workout), ("exercise_logs", ExerciseLog)]}
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "mode": mode,
+        "dataset": dataset,
+        "settings": {k: v for k, v in vars(args).items() if k not in ("output",)},
+        "results": results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit}-{mode}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
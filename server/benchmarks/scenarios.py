@@ -0,0 +1,230 @@
+"""Request builders covering every route registered by create_app()."""
+import random
+from collections import defaultdict
+from datetime import date, timedelta
+
+from benchmarks.generate import EXERCISES, PASSWORD, TITLES
+
+# What a user would type: the start of an exercise name, a word of a workout title
+_PREFIXES = sorted({word[:2] for name in EXERCISES for word in name.split("_")})
+_TITLE_WORDS = sorted({word.lower() for title in TITLES for word in title.split()})
+
+
+class Context:
+    """Id ranges of the dataset plus ids created during the run."""
+
+    def __init__(self, ranges, seed=1):
+        self.rng = random.Random(seed)
+        self.ranges = ranges
+        self.created = defaultdict(list)
+        self.counter = 0
+
+    def pick(self, table):
+        low, high = self.ranges[table]
+        return self.rng.randint(low, high)
+
+    def created_id(self, table, pop=False):
+        ids = self.created[table]
+        if not ids:
+            return None
+        return ids.pop() if pop else self.rng.choice(ids)
+
+    def unique(self):
+        self.counter += 1
+        return f"{self.rng.getrandbits(32):08x}{self.counter}"
+
+
+class Scenario:
+    """
+    One kind of request. `build(ctx)` returns (method, path, json) or None
+    when there's nothing to act on yet; `collect(ctx, body)` records ids
+    from the response so later scenarios can update/delete them.
+    """
+
+    def __init__(self, endpoint, name, build, collect=None, write=False, heavy=False, auth=False):
+        self.endpoint = endpoint
+        self.name = name
+        self.build = build
+        self.collect = collect
+        self.write = write
+        self.heavy = heavy
+        self.auth = auth
+
+
+def _collect(table, key="id"):
+    def collect(ctx, body):
+        value = body
+        for part in key.split("."):
+            value = value[part]
+        ctx.created[table].append(value)
+    return collect
+
+
+def _collect_bulk(table):
+    def collect(ctx, body):
+        ctx.created[table].extend(item["id"] for item in body["results"])
+    return collect
+
+
+def _on(table, method, path, body=None, pop=False):
+    def build(ctx):
+        id = ctx.created_id(table, pop=pop)
+        if id is None:
+            return None
+        return method, path.format(id=id), body(ctx) if body else None
+    return build
+
+
+def _log(ctx, workout_id=None):
+    return {
+        "sets": ctx.rng.randint(1, 6),
+        "reps": ctx.rng.randint(1, 15),
+        "weight": ctx.rng.choice([20, 40, 60, 80, 100]),
+        "workout_id": workout_id or ctx.pick("workouts"),
+        "exercise_id": ctx.pick("exercises"),
+    }
+
+
+def _day(ctx):
+    return (date.today() - timedelta(days=ctx.rng.randrange(365))).isoformat()
+
+
+def _stats_range(ctx):
+    end = date.today() - timedelta(days=ctx.rng.randrange(365))
+    return f"from={(end - timedelta(days=30)).isoformat()}&to={end.isoformat()}"
+
+
+# Ordered so creates run before the updates and deletes that use their ids
+SCENARIOS = [
+    # Writes: creates
+    Scenario("create_goal", "POST /goals",
+             lambda ctx: ("POST", "/goals", {"name": f"bench_goal_{ctx.unique()}"}),
+             collect=_collect("goals"), write=True),
+    Scenario("create_exercise", "POST /exercises",
+             lambda ctx: ("POST", "/exercises", {"exercise_name": f"bench_{ctx.unique()}", "goal_id": ctx.pick("goals")}),
+             collect=_collect("exercises"), write=True),
+    Scenario("create_user", "POST /users",
+             lambda ctx: ("POST", "/users", {"name": "Bench", "email": f"new_{ctx.unique()}@example.com",
+                                             "password": PASSWORD, "goal": "stay_fit"}),
+             collect=_collect("users", "user.id"), write=True),
+    Scenario("auth_register", "POST /auth/register",
+             lambda ctx: ("POST", "/auth/register", {"name": "Bench", "email": f"reg_{ctx.unique()}@example.com",
+                                                     "password": PASSWORD}),
+             collect=_collect("users"), write=True),
+    Scenario("create_workout", "POST /workouts",
+             lambda ctx: ("POST", "/workouts", {"title": "Bench", "date": _day(ctx), "user_id": ctx.pick("users")}),
+             collect=_collect("workouts"), write=True),
+    Scenario("create_workouts_bulk", "POST /workouts/bulk (1 workout, 8 logs)",
+             lambda ctx: ("POST", "/workouts/bulk", [{
+                 "title": "Bench", "date": _day(ctx), "user_id": ctx.pick("users"),
+                 "logs": [{k: v for k, v in _log(ctx).items() if k != "workout_id"} for _ in range(8)],
+             }]),
+             collect=_collect_bulk("workouts"), write=True),
+    Scenario("import_user", "POST /users/<id>/import (1 workout, 8 logs)",
+             lambda ctx: ("POST", f"/users/{ctx.pick('users')}/import", {
+                 "title": "Imported", "date": _day(ctx),
+                 "logs": [{k: v for k, v in _log(ctx).items() if k != "workout_id"} for _ in range(8)],
+             }),
+             collect=lambda ctx, body: ctx.created["imports"].append((body["user_id"], body["id"])), write=True),
+    Scenario("export_user_job", "POST /users/<id>/export (background job)",
+             lambda ctx: ("POST", f"/users/{ctx.pick('users')}/export", None),
+             collect=_collect("jobs"), write=True),
+    Scenario("create_log", "POST /exercise_logs",
+             lambda ctx: ("POST", "/exercise_logs", _log(ctx)),
+             collect=_collect("exercise_logs"), write=True),
+    Scenario("create_logs_bulk", "POST /exercise_logs/bulk (40 logs)",
+             lambda ctx: ("POST", "/exercise_logs/bulk", [_log(ctx) for _ in range(40)]),
+             write=True),
+
+    # Reads
+    Scenario("index", "GET /", lambda ctx: ("GET", "/", None)),
+    Scenario("metrics", "GET /metrics", lambda ctx: ("GET", "/metrics", None)),
+    Scenario("auth_login", "POST /auth/login",
+             lambda ctx: ("POST", "/auth/login", {"email": f"bench_{ctx.pick('users')}@example.com", "password": PASSWORD})),
+    Scenario("users_me", "GET /users/me", lambda ctx: ("GET", "/users/me", None), auth=True),
+    Scenario("sync_changes", "GET /sync (full)", lambda ctx: ("GET", "/sync", None),
+             collect=_collect("sync", key="version"), auth=True),
+    # Changes since an earlier full sync, i.e. made by the write scenarios
+    Scenario("sync_changes", "GET /sync?since=<earlier version>",
+             lambda ctx: ("GET", f"/sync?since={ctx.created_id('sync')}", None) if ctx.created["sync"] else None,
+             auth=True),
+    Scenario("get_users", "GET /users?limit=100",
+             lambda ctx: ("GET", f"/users?limit=100&after={ctx.pick('users')}", None)),
+    Scenario("get_users", "GET /users?stream=ndjson&limit=1000",
+             lambda ctx: ("GET", "/users?stream=ndjson&limit=1000", None)),
+    Scenario("get_users", "GET /users?fields=id,name&limit=1000",
+             lambda ctx: ("GET", f"/users?fields=id,name&limit=1000&after={ctx.pick('users')}", None)),
+    Scenario("get_users", "GET /users (everything)", lambda ctx: ("GET", "/users", None), heavy=True),
+    Scenario("user_stats", "GET /users/<id>/stats (30 days)",
+             lambda ctx: ("GET", f"/users/{ctx.pick('users')}/stats?{_stats_range(ctx)}", None)),
+    Scenario("user_dashboard", "GET /users/<id>/dashboard?to=",
+             lambda ctx: ("GET", f"/users/{ctx.pick('users')}/dashboard?to={_day(ctx)}", None)),
+    Scenario("user_progress", "GET /users/<id>/progress/<exercise_id>?points=100",
+             lambda ctx: ("GET", f"/users/{ctx.pick('users')}/progress/{ctx.pick('exercises')}?points=100", None)),
+    Scenario("user_progress", "GET /users/<id>/progress/<exercise_id>?metric=volume&points=100",
+             lambda ctx: ("GET", f"/users/{ctx.pick('users')}/progress/{ctx.pick('exercises')}?metric=volume&points=100", None)),
+    Scenario("user_records", "GET /users/<id>/records",
+             lambda ctx: ("GET", f"/users/{ctx.pick('users')}/records", None)),
+    Scenario("goal_leaderboard", "GET /leaderboards/goals/<id>?period=all",
+             lambda ctx: ("GET", f"/leaderboards/goals/{ctx.pick('goals')}?period=all", None)),
+    Scenario("goal_leaderboard", "GET /leaderboards/goals/<id>?period=<week>",
+             lambda ctx: ("GET", f"/leaderboards/goals/{ctx.pick('goals')}?period={_day(ctx)}", None)),
+    Scenario("exercise_leaderboard", "GET /leaderboards/exercises/<id>?period=all&limit=100",
+             lambda ctx: ("GET", f"/leaderboards/exercises/{ctx.pick('exercises')}?period=all&limit=100", None)),
+    Scenario("export_user", "GET /users/<id>/export?format=ndjson",
+             lambda ctx: ("GET", f"/users/{ctx.pick('users')}/export", None)),
+    Scenario("export_user", "GET /users/<id>/export?format=csv",
+             lambda ctx: ("GET", f"/users/{ctx.pick('users')}/export?format=csv", None)),
+    Scenario("get_import", "GET /users/<id>/imports/<import_id>",
+             lambda ctx: ("GET", "/users/{}/imports/{}".format(*ctx.created_id("imports")), None)
+             if ctx.created["imports"] else None),
+    # Jobs are only visible to their user: 404 for exports of anyone but the token's
+    Scenario("get_job", "GET /jobs/<id>", _on("jobs", "GET", "/jobs/{id}"), auth=True),
+    # 404 until the export has run; jobs run alongside the benchmark in the app's worker threads
+    Scenario("download_job", "GET /jobs/<id>/download", _on("jobs", "GET", "/jobs/{id}/download"), auth=True),
+    # 409 unless the job failed
+    Scenario("retry_job", "POST /jobs/<id>/retry", _on("jobs", "POST", "/jobs/{id}/retry"), write=True, auth=True),
+    # Nests every user with their workouts and logs
+    Scenario("get_goals", "GET /goals", lambda ctx: ("GET", "/goals", None), heavy=True),
+    Scenario("get_exercises", "GET /exercises", lambda ctx: ("GET", "/exercises", None)),
+    Scenario("autocomplete_exercises", "GET /exercises/autocomplete?prefix=<2 letters>",
+             lambda ctx: ("GET", f"/exercises/autocomplete?prefix={ctx.rng.choice(_PREFIXES)}", None)),
+    Scenario("search", "GET /search?q=<word>&user_id=",
+             lambda ctx: ("GET", f"/search?q={ctx.rng.choice(_TITLE_WORDS)}&user_id={ctx.pick('users')}", None)),
+    Scenario("get_workouts", "GET /workouts?limit=100",
+             lambda ctx: ("GET", f"/workouts?limit=100&after={ctx.pick('workouts')}", None)),
+    Scenario("get_workouts", "GET /workouts?user_id=&order=-date&limit=50",
+             lambda ctx: ("GET", f"/workouts?user_id={ctx.pick('users')}&order=-date&limit=50", None)),
+    Scenario("get_logs", "GET /exercise_logs?limit=100",
+             lambda ctx: ("GET", f"/exercise_logs?limit=100&after={ctx.pick('exercise_logs')}", None)),
+    Scenario("get_logs", "GET /exercise_logs?stream=ndjson&limit=10000",
+             lambda ctx: ("GET", f"/exercise_logs?stream=ndjson&limit=10000&after={ctx.pick('exercise_logs')}", None)),
+    Scenario("get_logs", "GET /exercise_logs?fields=sets,reps,weight&stream=ndjson&limit=10000",
+             lambda ctx: ("GET", "/exercise_logs?fields=sets,reps,weight&stream=ndjson&limit=10000"
+                                 f"&after={ctx.pick('exercise_logs')}", None)),
+
+    # Writes: updates and deletes of rows created above
+    Scenario("update_goal", "PATCH /goals/<id>",
+             _on("goals", "PATCH", "/goals/{id}", lambda ctx: {"name": f"bench_goal_{ctx.unique()}"}), write=True),
+    Scenario("update_exercise", "PATCH /exercises/<id>",
+             _on("exercises", "PATCH", "/exercises/{id}", lambda ctx: {"goal_id": ctx.pick("goals")}), write=True),
+    Scenario("update_user", "PATCH /users/<id>",
+             _on("users", "PATCH", "/users/{id}", lambda ctx: {"name": f"Bench {ctx.unique()}"}), write=True),
+    Scenario("update_workout", "PATCH /workouts/<id>",
+             _on("workouts", "PATCH", "/workouts/{id}", lambda ctx: {"date": _day(ctx)}), write=True),
+    Scenario("update_log", "PATCH /exercise_logs/<id>",
+             _on("exercise_logs", "PATCH", "/exercise_logs/{id}", lambda ctx: {"reps": ctx.rng.randint(1, 15)}),
+             write=True),
+    Scenario("delete_log", "DELETE /exercise_logs/<id>",
+             _on("exercise_logs", "DELETE", "/exercise_logs/{id}", pop=True), write=True),
+    Scenario("delete_workout", "DELETE /workouts/<id>",
+             _on("workouts", "DELETE", "/workouts/{id}", pop=True), write=True),
+    # /auth/logout and /auth/logout-all aren't covered: they would revoke the
+    # token every auth=True scenario shares
+    Scenario("delete_user", "DELETE /users/<id>",
+             _on("users", "DELETE", "/users/{id}", pop=True), write=True),
+    Scenario("delete_exercise", "DELETE /exercises/<id>",
+             _on("exercises", "DELETE", "/exercises/{id}", pop=True), write=True),
+    Scenario("delete_goal", "DELETE /goals/<id>",
+             _on("goals", "DELETE", "/goals/{id}", pop=True), write=True),
+]
@@ -0,0 +1,171 @@
+from sqlalchemy import insert, select
+
+from app import db
+import leaderboards
+import records
+import rollups
+from models import User, Workout, Exercise, ExerciseLog, parse_date
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _log_row(item, nested=False):
+    """Validates one exercise log payload. Returns (row, error)."""
+    if not isinstance(item, dict):
+        return None, "must be an object"
+    row = {
+        "sets": item.get("sets"),
+        "reps": item.get("reps"),
+        "weight": item.get("weight", 0),
+        "workout_id": None if nested else item.get("workout_id"),
+        "exercise_id": item.get("exercise_id"),
+    }
+    required = ("sets", "reps", "exercise_id") if nested else ("sets", "reps", "workout_id", "exercise_id")
+    for field in required:
+        if row[field] is None:
+            return None, f"{field} is required"
+        if not _is_int(row[field]):
+            return None, f"{field} must be an integer"
+    if row["weight"] is not None and not _is_number(row["weight"]):
+        return None, "weight must be a number"
+    return row, None
+
+
+def workout_row(item):
+    """Validates one workout payload with nested logs. Returns (row, log_rows, error)."""
+    if not isinstance(item, dict):
+        return None, None, "must be an object"
+    row = {
+        "title": item.get("title"),
+        "date": item.get("date"),
+        "notes": item.get("notes", ""),
+        "user_id": item.get("user_id"),
+    }
+    for field in ("title", "date"):
+        if not row[field]:
+            return None, None, f"{field} is required"
+    if not isinstance(row["title"], str):
+        return None, None, "title must be a string"
+    try:
+        row["date"] = parse_date(row["date"])
+    except ValueError:
+        return None, None, "date must be an ISO 8601 date"
+    if not _is_int(row["user_id"]):
+        return None, None, "user_id must be an integer"
+    logs = item.get("logs", [])
+    if not isinstance(logs, list):
+        return None, None, "logs must be a list"
+    log_rows = []
+    for n, log in enumerate(logs):
+        log_row, error = _log_row(log, nested=True)
+        if error:
+            return None, None, f"logs[{n}]: {error}"
+        log_rows.append(log_row)
+    return row, log_rows, None
+
+
+def _missing(model, ids):
+    ids = set(ids)
+    if not ids:
+        return set()
+    found = db.session.execute(select(model.id).where(model.id.in_(ids))).scalars()
+    return ids - set(found)
+
+
+def _insert(model, rows):
+    """executemany-style insert; returns new ids in the order of `rows`."""
+    if not rows:
+        return []
+    stmt = insert(model).returning(model.id, sort_by_parameter_order=True)
+    return db.session.execute(stmt, rows).scalars().all()
+
+
+def _add_logs(rows, ids):
+    """Updates the rollup, records and leaderboards for inserted log rows, looking their workouts up once."""
+    workouts = rollups.workouts_by_id(row["workout_id"] for row in rows)
+    rollups.add_logs(rows, workouts)
+    records.add_logs(rows, ids, workouts)
+    leaderboards.add_logs(rows, workouts)
+
+
+def _check_references(rows, results, field, model):
+    missing = _missing(model, (row[field] for row in rows if row))
+    for index, row in enumerate(rows):
+        if row and row[field] in missing and results[index] is None:
+            results[index] = {"index": index, "error": f"{field} {row[field]} does not exist"}
+
+
+def insert_workouts(workouts, logs):
+    """
+    Inserts validated workout rows and their log rows (a list per workout)
+    and updates the rollup. Returns (workout ids, log ids); doesn't commit.
+    """
+    workout_ids = _insert(Workout, workouts)
+    log_rows = []
+    for workout_id, rows in zip(workout_ids, logs):
+        for row in rows:
+            row["workout_id"] = workout_id
+            log_rows.append(row)
+    log_ids = _insert(ExerciseLog, log_rows)
+    _add_logs(log_rows, log_ids)
+    return workout_ids, log_ids
+
+
+def create_logs(items):
+    """
+    Validates and inserts a batch of exercise logs in one transaction.
+    Returns (results, ok); nothing is written unless every item is valid.
+    """
+    rows, results = [], []
+    for index, item in enumerate(items):
+        row, error = _log_row(item)
+        rows.append(row)
+        results.append({"index": index, "error": error} if error else None)
+
+    _check_references(rows, results, "workout_id", Workout)
+    _check_references(rows, results, "exercise_id", Exercise)
+    if any(results):
+        return [r for r in results if r], False
+
+    ids = _insert(ExerciseLog, rows)
+    _add_logs(rows, ids)
+    db.session.commit()
+    return [{"index": index, "id": id} for index, id in enumerate(ids)], True
+
+
+def create_workouts(items):
+    """
+    Validates and inserts a batch of workouts, each with optional nested
+    `logs`, in one transaction. Returns (results, ok).
+    """
+    workouts, logs, results = [], [], []
+    for index, item in enumerate(items):
+        row, log_rows, error = workout_row(item)
+        workouts.append(row)
+        logs.append(log_rows or [])
+        results.append({"index": index, "error": error} if error else None)
+
+    _check_references(workouts, results, "user_id", User)
+    exercise_ids = {log["exercise_id"] for log_rows in logs for log in log_rows}
+    missing = _missing(Exercise, exercise_ids)
+    for index, log_rows in enumerate(logs):
+        bad = sorted({log["exercise_id"] for log in log_rows} & missing)
+        if bad and results[index] is None:
+            results[index] = {"index": index, "error": f"exercise_id {bad[0]} does not exist"}
+    if any(results):
+        return [r for r in results if r], False
+
+    workout_ids, log_ids = insert_workouts(workouts, logs)
+    log_ids = iter(log_ids)
+    db.session.commit()
+
+    return [
+        {"index": index, "id": workout_id, "log_ids": [next(log_ids) for _ in logs[index]]}
+        for index, workout_id in enumerate(workout_ids)
+    ], True
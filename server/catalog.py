@@ -0,0 +1,99 @@
+import hashlib
+import threading
+import time
+from flask import Response, current_app, request
+from sqlalchemy import event
+
+
+class CatalogCache:
+    """
+    In-process cache of serialized responses for read-mostly collections.
+
+    Each cache name watches some models. Committing a change to any of them
+    bumps that name's version, so the next request rebuilds the body. The ETag
+    is a hash of the body, so every worker agrees on it; requests carrying a
+    matching If-None-Match get a 304 without touching the database. Entries
+    also expire after CATALOG_CACHE_TTL seconds so changes committed by other
+    processes are picked up.
+    """
+
+    def __init__(self):
+        self.ttl = 30
+        self._watched = {}
+        self._versions = {}
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app, session):
+        self.ttl = app.config["CATALOG_CACHE_TTL"]
+        if not event.contains(session, "after_flush", self._after_flush):
+            event.listen(session, "after_flush", self._after_flush)
+            event.listen(session, "do_orm_execute", self._after_execute)
+            event.listen(session, "after_commit", self._after_commit)
+            event.listen(session, "after_rollback", self._after_rollback)
+
+    def watch(self, name, *models):
+        self._watched[name] = set(models)
+        self._versions.setdefault(name, 0)
+
+    def invalidate(self, *names):
+        with self._lock:
+            for name in names or list(self._versions):
+                self._versions[name] += 1
+
+    def _mark(self, session, classes):
+        changed = session.info.setdefault("catalog_changed", set())
+        for name, models in self._watched.items():
+            if any(issubclass(cls, model) for cls in classes for model in models):
+                changed.add(name)
+
+    def _after_flush(self, session, flush_context):
+        objects = list(session.new) + list(session.dirty) + list(session.deleted)
+        self._mark(session, {type(obj) for obj in objects})
+
+    def _after_execute(self, state):
+        # Core-style insert()/update()/delete() against mapped classes
+        if (state.is_insert or state.is_update or state.is_delete) and state.bind_mapper is not None:
+            self._mark(state.session, {state.bind_mapper.class_})
+
+    def _after_commit(self, session):
+        changed = session.info.pop("catalog_changed", None)
+        if changed:
+            self.invalidate(*changed)
+
+    def _after_rollback(self, session):
+        session.info.pop("catalog_changed", None)
+
+    def _entry(self, name, build, variant):
+        now = time.monotonic()
+        key = (name, variant)
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != self._versions[name] or now - entry[1] > self.ttl:
+            with self._lock:
+                version = self._versions[name]
+            body = current_app.json.dumps(build()).encode()
+            entry = (version, now, body, hashlib.sha1(body).hexdigest())
+            self._entries[key] = entry
+        return entry
+
+    def body(self, name, build, variant=None):
+        """The cached JSON bytes, e.g. to embed in another response as a json_provider.Fragment."""
+        return self._entry(name, build, variant)[2]
+
+    def response(self, name, build, variant=None):
+        """
+        Serve `name` from cache, calling build() for the payload on a miss.
+        `variant` keys alternative bodies (e.g. a ?fields= projection) that
+        are invalidated along with `name`.
+        """
+        _, _, body, etag = self._entry(name, build, variant)
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            response = Response(body, mimetype="application/json")
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = "no-cache"
+        return response
+
+
+catalog = CatalogCache()
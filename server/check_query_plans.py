@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Query-plan regression check.
+
+Builds a throwaway in-memory database from the models, drives each endpoint
+through the test client, and runs EXPLAIN QUERY PLAN on every statement it
+issues. Exits non-zero if a statement scans a table that the endpoint is not
+expected to scan (i.e. an index is missing or not used).
+
+    python check_query_plans.py
+"""
+import sys
+from datetime import date
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from app import create_app, db
+
+# (method, path, json body, tables the endpoint may legitimately scan)
+CHECKS = [
+    ("GET", "/users", None, {"users"}),
+    ("GET", "/users?limit=2&after=1", None, set()),
+    ("GET", "/users?fields=id,name&limit=2&after=1", None, set()),
+    ("GET", "/users/me", None, set()),
+    ("GET", "/sync", None, {"goals", "exercises"}),
+    ("GET", "/sync?since=1", None, set()),
+    ("GET", "/users/1/stats?from=2024-01-01&to=2024-01-31", None, set()),
+    ("GET", "/users/1/export", None, set()),
+    ("GET", "/users/1/export?format=csv", None, set()),
+    ("GET", "/users/1/records", None, set()),
+    ("GET", "/users/1/progress/1?points=2", None, set()),
+    ("GET", "/users/1/progress/1?metric=1rm&from=2024-01-01&to=2024-01-31", None, set()),
+    ("GET", "/users/1/progress/1?metric=volume", None, set()),
+    ("GET", "/users/1/dashboard?to=2024-01-03", None, set()),
+    ("GET", "/leaderboards/goals/1?period=all", None, set()),
+    ("GET", "/leaderboards/exercises/1?period=2024-01-10&limit=5", None, set()),
+    ("GET", "/exercises/autocomplete?prefix=exer", None, set()),
+    ("GET", "/search?q=workout&user_id=1", None, set()),
+    ("GET", "/goals", None, {"goals"}),
+    ("GET", "/exercises", None, {"exercises"}),
+    ("GET", "/workouts", None, {"workouts"}),
+    ("GET", "/workouts?limit=2&after=1", None, set()),
+    ("GET", "/workouts?user_id=1&from=2024-01-01&to=2024-01-31&order=-date", None, set()),
+    ("GET", "/workouts?user_id=1&order=date&limit=2&after=2024-01-02,2", None, set()),
+    ("GET", "/workouts?user_id=1&order=-date&limit=2&fields=date,title", None, set()),
+    ("GET", "/exercise_logs", None, {"exercise_logs"}),
+    ("GET", "/exercise_logs?fields=sets,reps,weight&limit=2&after=1", None, set()),
+    ("GET", "/exercise_logs?limit=2&after=1", None, set()),
+    ("POST", "/users", {"name": "New", "email": "new@example.com", "password": "pw", "goal": "goal_1"}, set()),
+    ("POST", "/workouts/bulk", [{"title": "Bulk", "date": "2024-02-01", "user_id": 1,
+                                  "logs": [{"sets": 3, "reps": 5, "exercise_id": 1}]}], set()),
+    ("POST", "/exercise_logs/bulk", [{"sets": 3, "reps": 5, "workout_id": 1, "exercise_id": 2}], set()),
+    ("POST", "/users/1/import", {"title": "Imported", "date": "2024-02-02",
+                                 "logs": [{"sets": 3, "reps": 5, "exercise_name": "exercise_1"}]}, {"exercises"}),
+    ("GET", "/users/1/imports/1", None, set()),
+    ("POST", "/users/1/export?format=csv", None, set()),
+    ("GET", "/jobs/1", None, set()),
+    ("PATCH", "/users/1", {"name": "Renamed"}, set()),
+    ("PATCH", "/workouts/1", {"title": "Renamed"}, set()),
+    ("PATCH", "/exercise_logs/1", {"reps": 6, "weight": 1}, set()),
+    ("PATCH", "/exercises/2", {"goal_id": 1}, set()),
+    ("DELETE", "/exercise_logs/1", None, set()),
+    ("DELETE", "/workouts/1", None, set()),
+    ("DELETE", "/users/2", None, set()),
+    ("DELETE", "/exercises/1", None, set()),
+    ("DELETE", "/goals/3", None, set()),
+    # Revokes the token used by every check above, so it goes last
+    ("POST", "/auth/logout", None, set()),
+]
+
+# Endpoints that must not issue more statements than this, however much
+# data there is (every CHECKS entry for the path is counted)
+QUERY_BUDGETS = {
+    "/users/1/dashboard": 4,
+}
+
+
+def seed():
+    from models import User, Goal, Workout, Exercise, ExerciseLog
+
+    goals = [Goal(name=f"goal_{i}") for i in range(1, 4)]
+    exercises = [Exercise(exercise_name=f"exercise_{i}", goal=goals[i % 3]) for i in range(6)]
+    db.session.add_all(goals + exercises)
+    db.session.flush()
+    for u in range(3):
+        user = User(name=f"user_{u}", email=f"user_{u}@example.com", password_hash="x")
+        user.goals.append(goals[u])
+        for w in range(3):
+            workout = Workout(title=f"workout_{w}", date=date(2024, 1, w + 1), user=user)
+            for exercise in exercises[:3]:
+                workout.exercises.append(ExerciseLog(sets=3, reps=5, weight=50, exercise_id=exercise.id))
+        db.session.add(user)
+    db.session.commit()
+
+
+def scans(conn, statement, parameters):
+    rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).fetchall()
+    found = set()
+    for row in rows:
+        detail = row[-1]
+        # FTS5 reports index lookups as a virtual table "SCAN"; an M in its
+        # index string means the MATCH constraint is used
+        if " VIRTUAL TABLE INDEX " in detail and "M" in detail.rsplit(":", 1)[-1]:
+            continue
+        if detail.startswith("SCAN "):
+            found.add(detail.split()[1])
+    return found
+
+
+def main():
+    app = create_app({"SQLALCHEMY_DATABASE_URI": "sqlite://", "JWT_COOKIE_CSRF_PROTECT": False, "JOBS_WORKERS": 0})
+    failures = []
+
+    with app.app_context():
+        db.create_all()
+        seed()
+        captured = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")) and not executemany:
+                captured.append((statement, parameters))
+
+        event.listen(db.engine, "before_cursor_execute", capture)
+        client = app.test_client()
+        client.set_cookie("access_token_cookie", create_access_token(identity="1"))
+
+        for method, path, body, allowed in CHECKS:
+            captured.clear()
+            db.session.remove()
+            response = client.open(path, method=method, json=body)
+            response.get_data()
+            if response.status_code >= 400:
+                failures.append(f"{method} {path}: HTTP {response.status_code}")
+                continue
+
+            event.remove(db.engine, "before_cursor_execute", capture)
+            with db.engine.connect() as conn:
+                for statement, parameters in captured:
+                    unexpected = scans(conn, statement, parameters) - allowed
+                    if unexpected:
+                        failures.append(f"{method} {path}: scans {', '.join(sorted(unexpected))}\n    {statement}")
+            event.listen(db.engine, "before_cursor_execute", capture)
+            budget = QUERY_BUDGETS.get(path.split("?")[0])
+            if budget is not None and len(captured) > budget:
+                failures.append(f"{method} {path}: {len(captured)} statements, budget is {budget}")
+            print(f"{method:6} {path}: {len(captured)} statements checked")
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
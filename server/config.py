@@ -3,6 +3,18 @@ import os
 class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL", "sqlite:///fitness.db")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # "production" turns on WAL and the SQLite pragmas below and sizes the pool per worker
+    DATABASE_PROFILE = os.getenv("DATABASE_PROFILE", "default")
+    # Optional read replica (or the same SQLite file, for a separate read pool); GET requests use it
+    DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")
+    # Connections per worker process; match the server's threads per worker
+    DATABASE_POOL_SIZE = int(os.getenv("DATABASE_POOL_SIZE", 8))
+    DATABASE_MAX_OVERFLOW = int(os.getenv("DATABASE_MAX_OVERFLOW", 4))
+    DATABASE_POOL_TIMEOUT = float(os.getenv("DATABASE_POOL_TIMEOUT", 10))
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000))
+    SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+    SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", 64 * 1024))
     SECRET_KEY = os.getenv("SECRET_KEY", "dev")
     JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "dev-jwt-secret") 
 
@@ -11,4 +23,67 @@ class Config:
     JWT_COOKIE_SECURE = False              
     JWT_COOKIE_CSRF_PROTECT = True         
     JWT_ACCESS_TOKEN_EXPIRES = 60 * 60 * 24  
-    JWT_COOKIE_SAMESITE = "Lax"
\ No newline at end of file
+    JWT_COOKIE_SAMESITE = "Lax"
+
+    # List endpoints: keyset page size cap and server-side cursor batch size
+    PAGINATION_MAX_LIMIT = int(os.getenv("PAGINATION_MAX_LIMIT", 1000))
+    STREAM_YIELD_PER = int(os.getenv("STREAM_YIELD_PER", 500))
+
+    # Bulk ingest endpoints: maximum items accepted per request
+    BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", 10000))
+
+    # Password hashing process pool (0 workers hashes inline on the request thread)
+    PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt")
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+    PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", 0))  # 0 = 4 per worker
+    PASSWORD_HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", 10))
+
+    # History uploads: workout + log rows per commit, and errors kept on the progress record
+    IMPORT_CHUNK_ROWS = int(os.getenv("IMPORT_CHUNK_ROWS", 5000))
+    IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", 100))
+
+    # Revoked tokens: seconds between picking up other processes' revocations,
+    # revocations the in-memory filter is sized for, and lookups remembered
+    TOKEN_BLOCKLIST_REFRESH_SECONDS = float(os.getenv("TOKEN_BLOCKLIST_REFRESH_SECONDS", 5))
+    TOKEN_BLOCKLIST_CAPACITY = int(os.getenv("TOKEN_BLOCKLIST_CAPACITY", 100000))
+    TOKEN_BLOCKLIST_CACHE_SIZE = int(os.getenv("TOKEN_BLOCKLIST_CACHE_SIZE", 10000))
+
+    # GET /users/me bodies kept in process: seconds each may be reused, and how many users
+    IDENTITY_CACHE_TTL = float(os.getenv("IDENTITY_CACHE_TTL", 10))
+    IDENTITY_CACHE_SIZE = int(os.getenv("IDENTITY_CACHE_SIZE", 1024))
+
+    # Background jobs: worker threads per process (0 = only `flask run-jobs` runs them),
+    # idle poll interval, attempts and base retry delay (doubled per attempt), seconds
+    # before a running job is presumed lost, and days finished jobs and their files are kept
+    JOBS_WORKERS = int(os.getenv("JOBS_WORKERS", 2))
+    JOBS_POLL_SECONDS = float(os.getenv("JOBS_POLL_SECONDS", 5))
+    JOBS_MAX_ATTEMPTS = int(os.getenv("JOBS_MAX_ATTEMPTS", 3))
+    JOBS_RETRY_SECONDS = float(os.getenv("JOBS_RETRY_SECONDS", 30))
+    JOBS_TIMEOUT_SECONDS = float(os.getenv("JOBS_TIMEOUT_SECONDS", 3600))
+    JOBS_RETENTION_DAYS = float(os.getenv("JOBS_RETENTION_DAYS", 7))
+    JOBS_DIR = os.getenv("JOBS_DIR")  # default: <instance path>/jobs
+
+    # Days `flask prune-sync` keeps the tombstones GET /sync reports deletes from
+    SYNC_TOMBSTONE_DAYS = float(os.getenv("SYNC_TOMBSTONE_DAYS", 90))
+
+    # GET /users/<id>/progress/<exercise_id>: points returned without ?points=, and at most
+    PROGRESS_DEFAULT_POINTS = int(os.getenv("PROGRESS_DEFAULT_POINTS", 200))
+    PROGRESS_MAX_POINTS = int(os.getenv("PROGRESS_MAX_POINTS", 2000))
+
+    # Days of workouts and totals GET /users/<id>/dashboard covers
+    DASHBOARD_DAYS = int(os.getenv("DASHBOARD_DAYS", 7))
+
+    # Most results GET /search and GET /exercises/autocomplete return per list (?limit=, default 10)
+    SEARCH_MAX_RESULTS = int(os.getenv("SEARCH_MAX_RESULTS", 50))
+
+    # Most entries a GET /leaderboards/... response returns (?limit=, default 10)
+    LEADERBOARD_SIZE = int(os.getenv("LEADERBOARD_SIZE", 100))
+
+    # Seconds an in-process /goals or /exercises response may be reused before re-querying
+    CATALOG_CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", 30))
+
+    # jsonify() streams top-level arrays longer than this instead of building one string
+    JSON_STREAM_THRESHOLD = int(os.getenv("JSON_STREAM_THRESHOLD", 1000))
+
+    # Requests slower than this are logged with their slowest SQL statements
+    SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", 1.0))
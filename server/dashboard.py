@@ -0,0 +1,89 @@
+from datetime import timedelta
+from sqlalchemy import func, select
+
+from app import db
+from models import Goal, Workout, Exercise, ExerciseLog, DailyVolume, user_goals
+
+
+def _goals(user_id):
+    return [
+        {"id": id, "name": name}
+        for id, name in db.session.execute(
+            select(Goal.id, Goal.name)
+            .join(user_goals, user_goals.c.goal_id == Goal.id)
+            .where(user_goals.c.user_id == user_id)
+            .order_by(Goal.id)
+        )
+    ]
+
+
+def _workouts(user_id, start, end):
+    """The user's workouts in [start, end], newest first, with their logs and exercise names."""
+    rows = db.session.execute(
+        select(
+            Workout.id, Workout.title, Workout.date, Workout.notes,
+            ExerciseLog.id, ExerciseLog.sets, ExerciseLog.reps, ExerciseLog.weight,
+            ExerciseLog.exercise_id, Exercise.exercise_name,
+        )
+        .outerjoin(ExerciseLog, ExerciseLog.workout_id == Workout.id)
+        .outerjoin(Exercise, Exercise.id == ExerciseLog.exercise_id)
+        .where(Workout.user_id == user_id, Workout.date >= start, Workout.date <= end)
+        .order_by(Workout.date.desc(), Workout.id.desc(), ExerciseLog.id)
+    )
+    workouts = []
+    for id, title, when, notes, log_id, sets, reps, weight, exercise_id, exercise_name in rows:
+        if not workouts or workouts[-1]["id"] != id:
+            workouts.append({
+                "id": id, "title": title, "date": when.isoformat(), "notes": notes, "exercises": [],
+            })
+        if log_id is not None:
+            workouts[-1]["exercises"].append({
+                "id": log_id, "sets": sets, "reps": reps, "weight": weight,
+                "exercise_id": exercise_id, "exercise_name": exercise_name,
+            })
+    return workouts
+
+
+def _totals(user_id, start, end):
+    """Totals for [start, end] from the daily rollup, overall and by exercise."""
+    rows = db.session.execute(
+        select(
+            DailyVolume.exercise_id, Exercise.exercise_name, Exercise.goal_id,
+            func.sum(DailyVolume.sets), func.sum(DailyVolume.reps), func.sum(DailyVolume.volume),
+        )
+        .join(Exercise, Exercise.id == DailyVolume.exercise_id)
+        .where(DailyVolume.user_id == user_id, DailyVolume.date >= start, DailyVolume.date <= end)
+        .group_by(DailyVolume.exercise_id)
+        .order_by(DailyVolume.exercise_id)
+    )
+    totals = {"sets": 0, "reps": 0, "volume": 0.0, "exercises": []}
+    for exercise_id, name, goal_id, sets, reps, volume in rows:
+        totals["sets"] += sets
+        totals["reps"] += reps
+        totals["volume"] += volume
+        totals["exercises"].append({
+            "exercise_id": exercise_id, "name": name, "goal_id": goal_id,
+            "sets": sets, "reps": reps, "volume": volume,
+        })
+    return totals
+
+
+def build(user, end, days):
+    """
+    The home screen for `user`: their goals, workouts (with logs and
+    exercise names) and totals for the `days` days ending on `end`. Three
+    queries whatever the amount of history, four per request with the user
+    lookup; see QUERY_BUDGETS in check_query_plans.py.
+    """
+    start = end - timedelta(days=days - 1)
+    workouts = _workouts(user.id, start, end)
+    totals = _totals(user.id, start, end)
+    totals["workouts"] = len(workouts)
+    return {
+        "user": {"id": user.id, "name": user.name, "email": user.email},
+        "goals": _goals(user.id),
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "totals": totals,
+        "workouts": workouts,
+    }
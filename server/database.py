@@ -0,0 +1,143 @@
+from flask import has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
+
+READ_BIND = "read"
+READ_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+class RoutingSession(Session):
+    """
+    Sends statements issued while handling a GET request to the "read"
+    bind when one is configured. Flushes always go to the primary, so a
+    read handler that ends up writing still writes to the right place.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and is_read_request():
+            engine = self._db.engines.get(READ_BIND)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def is_read_request():
+    return has_request_context() and request.method in READ_METHODS
+
+
+_upserts = {}
+
+
+def upsert(session, model, keys, **values):
+    """
+    INSERT ... ON CONFLICT (keys) DO UPDATE into `model`, for SQLite and
+    PostgreSQL. Each of `values` maps a column to a function of the row
+    that was proposed (`excluded`) returning the column's new value; pass
+    the same functions each time and the statement is only built once. Run
+    it with a list of rows to write a whole batch in one executemany.
+    """
+    name = session.get_bind().dialect.name
+    cache_key = (name, model, tuple(keys), tuple(values.items()))
+    if cache_key not in _upserts:
+        dialect = postgresql if name == "postgresql" else sqlite
+        # Against the table, so rows skip the ORM's per-row bulk insert bookkeeping
+        table = model.__table__
+        stmt = dialect.insert(table)
+        _upserts[cache_key] = stmt.on_conflict_do_update(
+            index_elements=[table.c[key] for key in keys],
+            set_={column: value(stmt.excluded) for column, value in values.items()},
+        )
+    return _upserts[cache_key]
+
+
+def _is_file_sqlite(url):
+    url = make_url(url)
+    return url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:")
+
+
+def _pool_options(config):
+    return {
+        "pool_size": config["DATABASE_POOL_SIZE"],
+        "max_overflow": config["DATABASE_MAX_OVERFLOW"],
+        "pool_timeout": config["DATABASE_POOL_TIMEOUT"],
+    }
+
+
+def _sqlite_pragmas(config, read_only):
+    pragmas = [
+        f"PRAGMA busy_timeout={config['SQLITE_BUSY_TIMEOUT_MS']}",
+        "PRAGMA synchronous=NORMAL",
+        f"PRAGMA mmap_size={config['SQLITE_MMAP_SIZE']}",
+        f"PRAGMA cache_size=-{config['SQLITE_CACHE_SIZE_KB']}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+    # journal_mode is stored in the file, so only the primary sets it
+    pragmas.insert(0, "PRAGMA query_only=ON" if read_only else "PRAGMA journal_mode=WAL")
+    return pragmas
+
+
+def _enforce_foreign_keys(engine):
+    # SQLite ignores FOREIGN KEY clauses, ON DELETE CASCADE included, unless
+    # this is set on every connection
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+
+def _listen_sqlite(engine, pragmas, read_only):
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, record):
+        # Let SQLAlchemy emit BEGIN itself (see on_begin) instead of pysqlite
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+    @event.listens_for(engine, "begin")
+    def on_begin(conn):
+        # Write transactions take the write lock up front so they wait out
+        # busy_timeout instead of failing with SQLITE_BUSY when a read
+        # transaction has to be upgraded after another writer committed
+        conn.exec_driver_sql("BEGIN" if read_only or is_read_request() else "BEGIN IMMEDIATE")
+
+
+def init_app(app, db):
+    """
+    Applies DATABASE_PROFILE and initialises `db` on the app. "default"
+    leaves SQLAlchemy's defaults alone; "production" sizes the pool from
+    the DATABASE_POOL_* settings and, for SQLite files, switches on WAL
+    and the SQLITE_* pragmas for every new connection. SQLite foreign
+    keys are enforced under either profile. DATABASE_READ_URL adds a
+    "read" bind that GET requests are routed to.
+    """
+    config = app.config
+    profile = config["DATABASE_PROFILE"]
+    if profile not in ("default", "production"):
+        raise ValueError(f"Unknown DATABASE_PROFILE {profile!r}")
+    production = profile == "production"
+
+    if production and _is_file_sqlite(config["SQLALCHEMY_DATABASE_URI"]):
+        config["SQLALCHEMY_ENGINE_OPTIONS"] = {**_pool_options(config), **config.get("SQLALCHEMY_ENGINE_OPTIONS", {})}
+
+    read_url = config.get("DATABASE_READ_URL")
+    if read_url:
+        read = {"url": read_url}
+        if production and _is_file_sqlite(read_url):
+            read.update(_pool_options(config))
+        config["SQLALCHEMY_BINDS"] = {**config.get("SQLALCHEMY_BINDS", {}), READ_BIND: read}
+
+    db.init_app(app)
+
+    with app.app_context():
+        for key, engine in db.engines.items():
+            if engine.dialect.name != "sqlite":
+                continue
+            _enforce_foreign_keys(engine)
+            if production:
+                read_only = key == READ_BIND
+                _listen_sqlite(engine, _sqlite_pragmas(config, read_only), read_only)
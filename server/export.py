@@ -0,0 +1,126 @@
+import csv
+import io
+import os
+import zlib
+from itertools import groupby
+from flask import Response, current_app, request, stream_with_context
+from sqlalchemy import select
+
+from app import db
+from jobs import jobs
+from models import Workout, ExerciseLog, Exercise
+
+EXPORT_FORMATS = ("ndjson", "csv")
+CSV_COLUMNS = ["workout_id", "date", "title", "notes", "log_id", "exercise_id", "exercise_name", "sets", "reps", "weight"]
+# Flush compressed output roughly this often so clients see progress
+GZIP_FLUSH_BYTES = 64 * 1024
+
+
+def _rows(user_id):
+    """One row per log (or per workout without logs), from a single server-side cursor."""
+    statement = (
+        select(
+            Workout.id.label("workout_id"), Workout.date, Workout.title, Workout.notes,
+            ExerciseLog.id.label("log_id"), ExerciseLog.exercise_id, Exercise.exercise_name,
+            ExerciseLog.sets, ExerciseLog.reps, ExerciseLog.weight,
+        )
+        .outerjoin(ExerciseLog, ExerciseLog.workout_id == Workout.id)
+        .outerjoin(Exercise, Exercise.id == ExerciseLog.exercise_id)
+        .where(Workout.user_id == user_id)
+        .order_by(Workout.date, Workout.id, ExerciseLog.id)
+    )
+    yield from db.session.execute(
+        statement, execution_options={"yield_per": current_app.config["STREAM_YIELD_PER"]}
+    )
+
+
+def _ndjson(rows):
+    dumps = current_app.json.dumps
+    for workout_id, group in groupby(rows, key=lambda row: row.workout_id):
+        first = next(group)
+        logs = [first, *group] if first.log_id is not None else []
+        yield dumps({
+            "id": workout_id,
+            "date": first.date.isoformat(),
+            "title": first.title,
+            "notes": first.notes,
+            "exercises": [
+                {
+                    "id": log.log_id,
+                    "exercise_id": log.exercise_id,
+                    "exercise_name": log.exercise_name,
+                    "sets": log.sets,
+                    "reps": log.reps,
+                    "weight": log.weight,
+                }
+                for log in logs
+            ],
+        }) + "\n"
+
+
+def _csv(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+    for row in rows:
+        writer.writerow([row.workout_id, row.date.isoformat(), *row[2:]])
+        if buffer.tell() >= GZIP_FLUSH_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _gzip(chunks):
+    compressor = zlib.compressobj(wbits=31)  # gzip container
+    pending = 0
+    for chunk in chunks:
+        data = chunk.encode()
+        pending += len(data)
+        out = compressor.compress(data)
+        if pending >= GZIP_FLUSH_BYTES:
+            out += compressor.flush(zlib.Z_SYNC_FLUSH)
+            pending = 0
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+def _chunks(user_id, fmt):
+    return _ndjson(_rows(user_id)) if fmt == "ndjson" else _csv(_rows(user_id))
+
+
+def export_response(user_id, fmt):
+    """
+    Streams a user's workouts with their logs and exercise names, oldest
+    first. NDJSON has one workout per line with its logs nested; CSV has one
+    row per log. Compressed with gzip when the client accepts it.
+    """
+    chunks = _chunks(user_id, fmt)
+    headers = {
+        "Content-Disposition": f"attachment; filename=user-{user_id}-history.{fmt}",
+        "Vary": "Accept-Encoding",
+    }
+    if "gzip" in request.accept_encodings:
+        chunks = _gzip(chunks)
+        headers["Content-Encoding"] = "gzip"
+    mimetype = "application/x-ndjson" if fmt == "ndjson" else "text/csv"
+    return Response(stream_with_context(chunks), mimetype=mimetype, headers=headers)
+
+
+def filename(user_id, fmt):
+    return f"user-{user_id}-history.{fmt}.gz"
+
+
+@jobs.handler("export")
+def export_job(job):
+    """Writes the export gzipped next to the job, for GET /jobs/<id>/download."""
+    fmt = job.params["format"]
+    path = jobs.path(job, filename(job.user_id, fmt))
+    size = 0
+    with open(path + ".part", "wb") as f:
+        for data in _gzip(_chunks(job.user_id, fmt)):
+            f.write(data)
+            size += len(data)
+    os.replace(path + ".part", path)
+    return {"format": fmt, "bytes": size, "download": f"/jobs/{job.id}/download"}
@@ -0,0 +1,103 @@
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class HashingBusy(Exception):
+    """Raised when the hashing queue is full or a job times out."""
+
+
+def _hash_job(password, method, submitted):
+    started = time.time()
+    result = generate_password_hash(password, method=method)
+    return result, started - submitted, time.time() - started
+
+
+def _verify_job(pwhash, password, submitted):
+    started = time.time()
+    result = check_password_hash(pwhash, password)
+    return result, started - submitted, time.time() - started
+
+
+class PasswordHasher:
+    """
+    Runs werkzeug's password hashing in a bounded process pool so the
+    CPU-heavy work doesn't hold the request worker (or the GIL). At most
+    `max_pending` jobs may be queued or running; beyond that callers get
+    HashingBusy instead of piling up. With workers=0 hashing runs inline.
+    """
+
+    def __init__(self):
+        self.method = "scrypt"
+        self.workers = 0
+        self.max_pending = 0
+        self.timeout = None
+        self._pool = None
+        self._slots = None
+        self._pool_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._prefix = None
+        self._stats = dict(jobs=0, rejected=0, queue_wait_seconds=0.0, hash_seconds=0.0, max_queue_wait_seconds=0.0)
+
+    def init_app(self, app):
+        self.method = app.config["PASSWORD_HASH_METHOD"]
+        self.workers = app.config["PASSWORD_HASH_WORKERS"]
+        self.max_pending = app.config["PASSWORD_HASH_MAX_PENDING"] or self.workers * 4
+        self.timeout = app.config["PASSWORD_HASH_TIMEOUT"]
+        self._slots = threading.BoundedSemaphore(self.max_pending) if self.workers else None
+        self._prefix = None
+        app.extensions["password_hasher"] = self
+
+    def _get_pool(self):
+        # Created lazily so pre-forking servers don't share one pool
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    def _run(self, job, *args):
+        if not self.workers:
+            result, waited, took = job(*args, time.time())
+        else:
+            if not self._slots.acquire(blocking=False):
+                with self._stats_lock:
+                    self._stats["rejected"] += 1
+                raise HashingBusy("Too many password hashing requests in flight")
+            try:
+                future = self._get_pool().submit(job, *args, time.time())
+            except Exception:
+                self._slots.release()
+                raise
+            future.add_done_callback(lambda _: self._slots.release())
+            try:
+                result, waited, took = future.result(timeout=self.timeout)
+            except TimeoutError:
+                raise HashingBusy("Password hashing timed out")
+
+        with self._stats_lock:
+            self._stats["jobs"] += 1
+            self._stats["queue_wait_seconds"] += waited
+            self._stats["hash_seconds"] += took
+            self._stats["max_queue_wait_seconds"] = max(self._stats["max_queue_wait_seconds"], waited)
+        return result
+
+    def hash(self, password):
+        return self._run(_hash_job, password, self.method)
+
+    def verify(self, pwhash, password):
+        return self._run(_verify_job, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        """True if `pwhash` was made with different method/parameters than configured."""
+        if self._prefix is None:
+            self._prefix = self.hash("").split("$", 1)[0]
+        return pwhash.split("$", 1)[0] != self._prefix
+
+    def stats(self):
+        with self._stats_lock:
+            return dict(self._stats)
+
+
+hasher = PasswordHasher()
@@ -0,0 +1,200 @@
+import csv
+import io
+import json
+import os
+import shutil
+from itertools import groupby
+from flask import current_app
+from sqlalchemy import select
+
+from app import db
+import bulk
+from jobs import JobFailed, jobs
+from models import Exercise, Import
+
+IMPORT_FORMATS = ("ndjson", "csv")
+
+
+class ImportFailed(Exception):
+    """The upload can't be read any further; committed chunks are kept."""
+
+
+def _exercise_lookup():
+    """Lower-cased exercise name -> id; the lowest id wins for duplicate names."""
+    lookup = {}
+    for id, name in db.session.execute(select(Exercise.id, Exercise.exercise_name).order_by(Exercise.id.desc())):
+        lookup[name.strip().lower()] = id
+    return lookup
+
+
+def _ndjson_records(lines):
+    """(line number, workout item or None, error) per line."""
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            yield number, None, None
+            continue
+        try:
+            yield number, json.loads(line), None
+        except ValueError:
+            yield number, None, "not valid JSON"
+
+
+def _csv_value(value, convert):
+    return convert(value) if value not in (None, "") else None
+
+
+def _csv_records(lines):
+    """
+    Rows in the /export CSV layout, grouped into one workout per run of
+    rows sharing workout_id (or date and title when there's no workout_id).
+    Yields (number of the group's last row, workout item, error).
+    """
+    reader = csv.DictReader(lines)
+    missing = {"date", "title"} - set(reader.fieldnames or ())
+    if missing:
+        raise ImportFailed(f"CSV header is missing {', '.join(sorted(missing))}")
+
+    def key(numbered):
+        row = numbered[1]
+        return row.get("workout_id") or (row.get("date"), row.get("title"))
+
+    for _, group in groupby(enumerate(reader, 1), key=key):
+        group = list(group)
+        number, first = group[-1][0], group[0][1]
+        item = {"title": first["title"], "date": first["date"], "notes": first.get("notes") or "", "logs": []}
+        try:
+            for _, row in group:
+                if not row.get("sets") and not row.get("reps"):
+                    continue  # workout without logs
+                item["logs"].append({
+                    "sets": _csv_value(row.get("sets"), int),
+                    "reps": _csv_value(row.get("reps"), int),
+                    "weight": _csv_value(row.get("weight"), float),
+                    "exercise_id": _csv_value(row.get("exercise_id"), int),
+                    "exercise_name": row.get("exercise_name"),
+                })
+        except ValueError:
+            yield number, None, "sets, reps and exercise_id must be integers and weight a number"
+            continue
+        yield number, item, None
+
+
+def _resolve(item, user_id, lookup, known_ids):
+    """Validates one workout item for `user_id`. Returns (row, log_rows, error)."""
+    if not isinstance(item, dict):
+        return None, None, "must be an object"
+    logs = item.get("logs", item.get("exercises", []))
+    if isinstance(logs, list):
+        for log in logs:
+            if not isinstance(log, dict):
+                continue
+            name = log.get("exercise_name")
+            if name:
+                exercise_id = lookup.get(str(name).strip().lower())
+                if exercise_id is None:
+                    return None, None, f"unknown exercise {name!r}"
+                log["exercise_id"] = exercise_id
+            elif type(log.get("exercise_id")) is int and log["exercise_id"] not in known_ids:
+                return None, None, f"exercise_id {log['exercise_id']} does not exist"
+    item = {**item, "user_id": user_id, "logs": logs}
+    return bulk.workout_row(item)
+
+
+def run(progress, stream):
+    """
+    Reads `stream` (text lines) and inserts workouts for progress.user_id,
+    committing every IMPORT_CHUNK_ROWS workout and log rows together with
+    the updated progress row. Records at or below progress.records were
+    committed by an earlier attempt and are skipped, so a failed upload can
+    be resent as-is.
+    """
+    chunk_rows = current_app.config["IMPORT_CHUNK_ROWS"]
+    max_errors = current_app.config["IMPORT_MAX_ERRORS"]
+    lookup = _exercise_lookup()
+    known_ids = set(lookup.values())
+    records = _csv_records(stream) if progress.format == "csv" else _ndjson_records(stream)
+    resume_after = progress.records
+    # Anything reported past the committed point (e.g. the error that stopped
+    # an earlier attempt) is read again below
+    errors = [error for error in progress.errors if error["record"] <= resume_after]
+    workouts, logs = [], []
+    pending = 0
+
+    def commit(through):
+        if workouts:
+            bulk.insert_workouts(workouts, logs)
+        progress.records = through
+        progress.workouts += len(workouts)
+        progress.logs += sum(len(rows) for rows in logs)
+        progress.errors = errors[:max_errors]
+        db.session.commit()
+        workouts.clear()
+        logs.clear()
+
+    number = resume_after
+    try:
+        for number, item, error in records:
+            if number <= resume_after or (item is None and error is None):
+                continue
+            if error is None:
+                row, log_rows, error = _resolve(item, progress.user_id, lookup, known_ids)
+            if error:
+                progress.skipped += 1
+                errors.append({"record": number, "error": error})
+                continue
+            workouts.append(row)
+            logs.append(log_rows)
+            pending += len(log_rows) + 1
+            if pending >= chunk_rows:
+                commit(number)
+                pending = 0
+    except (ImportFailed, UnicodeDecodeError, csv.Error) as e:
+        db.session.rollback()
+        # The uncommitted chunk will be read again on resume
+        errors = [error for error in errors if error["record"] <= progress.records]
+        progress.status = "failed"
+        errors.append({"record": number + 1, "error": str(e)})
+        progress.errors = errors[:max_errors]
+        db.session.commit()
+        raise ImportFailed(str(e))
+
+    progress.status = "done"
+    commit(number)
+    return progress
+
+
+def _upload(request):
+    """Binary stream over a multipart "file" upload or the raw request body."""
+    upload = request.files.get("file")
+    return upload.stream if upload else request.stream
+
+
+def _text(raw):
+    return io.TextIOWrapper(raw, encoding="utf-8-sig", newline="")
+
+
+def open_stream(request):
+    return _text(_upload(request))
+
+
+def save_upload(request, path):
+    """Copies the upload to `path` so a job can import it after the request ends."""
+    with open(path, "wb") as f:
+        shutil.copyfileobj(_upload(request), f, 1024 * 1024)
+
+
+@jobs.handler("import")
+def import_job(job):
+    """Runs an upload saved by save_upload(); a retry resumes after the last committed chunk."""
+    progress = db.session.get(Import, job.params["import_id"])
+    if progress is None:
+        raise JobFailed("The import no longer exists")
+    progress.status = "running"
+    path = jobs.path(job, "upload")
+    try:
+        with open(path, "rb") as raw:
+            run(progress, _text(raw))
+    except ImportFailed as e:
+        raise JobFailed(str(e))
+    os.remove(path)
+    return progress.to_dict()
@@ -0,0 +1,209 @@
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import request
+from sqlalchemy import delete, event, select, update
+
+
+class JobFailed(Exception):
+    """Raised by a handler for failures a retry won't fix (e.g. an unreadable upload)."""
+
+
+def prefers_async():
+    """True when the client sent `Prefer: respond-async` (RFC 7240)."""
+    return any(
+        part.strip().lower() == "respond-async"
+        for value in request.headers.getlist("Prefer") for part in value.split(",")
+    )
+
+
+class JobRunner:
+    """
+    Runs slow work (exports, imports, rebuilds, account deletions) outside
+    the request that asked for it.
+
+    Jobs are rows in the jobs table, so they survive restarts and any
+    process can run them. Each process starts JOBS_WORKERS threads the first
+    time it serves a request or commits a new job; `flask run-jobs` runs
+    them in a dedicated process instead. A job is claimed with a conditional
+    UPDATE, so it runs once even with several processes polling. Handlers
+    that raise are retried with exponential backoff up to JOBS_MAX_ATTEMPTS
+    times, except for JobFailed. Jobs whose worker died are requeued after
+    JOBS_TIMEOUT_SECONDS, and finished jobs are deleted, with their files,
+    after JOBS_RETENTION_DAYS.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.session = None
+        self.workers = 0
+        self.poll_seconds = 5.0
+        self.max_attempts = 3
+        self.retry_seconds = 30.0
+        self.timeout = timedelta(hours=1)
+        self.retention = timedelta(days=7)
+        self.directory = None
+        self._handlers = {}
+        self._threads = []
+        self._wake = threading.Event()
+        self._start_lock = threading.Lock()
+        self._next_maintenance = 0.0
+
+    def init_app(self, app, session):
+        self.app = app
+        self.session = session
+        self.workers = app.config["JOBS_WORKERS"]
+        self.poll_seconds = app.config["JOBS_POLL_SECONDS"]
+        self.max_attempts = app.config["JOBS_MAX_ATTEMPTS"]
+        self.retry_seconds = app.config["JOBS_RETRY_SECONDS"]
+        self.timeout = timedelta(seconds=app.config["JOBS_TIMEOUT_SECONDS"])
+        self.retention = timedelta(days=app.config["JOBS_RETENTION_DAYS"])
+        self.directory = app.config["JOBS_DIR"] or os.path.join(app.instance_path, "jobs")
+        app.before_request(self.start)
+        if not event.contains(session, "after_commit", self._after_commit):
+            event.listen(session, "after_commit", self._after_commit)
+            event.listen(session, "after_rollback", self._after_rollback)
+
+    def handler(self, kind):
+        """Registers fn(job) for `kind`; its return value is stored as the job's result."""
+        def register(fn):
+            self._handlers[kind] = fn
+            return fn
+        return register
+
+    def path(self, job, name):
+        """A file belonging to `job` (an upload, an export), removed with it."""
+        os.makedirs(self.directory, exist_ok=True)
+        return os.path.join(self.directory, f"{job.id}.{name}")
+
+    def enqueue(self, kind, user_id=None, **params):
+        """Adds a queued job to the session and flushes for its id; the caller commits."""
+        from models import Job
+
+        if kind not in self._handlers:
+            raise ValueError(f"No handler for job kind {kind!r}")
+        job = Job(kind=kind, user_id=user_id, params=params, max_attempts=self.max_attempts)
+        self.session.add(job)
+        self.session.flush()
+        self.session.info["jobs_enqueued"] = True
+        return job
+
+    def retry(self, job):
+        """Queues a failed job for another round of attempts; the caller commits."""
+        job.status = "queued"
+        job.max_attempts = job.attempts + self.max_attempts
+        job.run_after = datetime.utcnow()
+        self.session.info["jobs_enqueued"] = True
+
+    def _after_commit(self, session):
+        if session.info.pop("jobs_enqueued", False):
+            self.start()
+            self._wake.set()
+
+    def _after_rollback(self, session):
+        session.info.pop("jobs_enqueued", None)
+
+    def start(self):
+        # Threads are started lazily so pre-forking servers don't lose them in the fork
+        if len(self._threads) >= self.workers:
+            return
+        with self._start_lock:
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self.work, name=f"jobs-{len(self._threads)}", daemon=True)
+                self._threads.append(thread)
+                thread.start()
+
+    def _maintain(self, now):
+        """Requeues jobs abandoned by a dead worker and deletes expired ones."""
+        from models import Job
+
+        stale = (Job.status == "running") & (Job.started_at < now - self.timeout)
+        self.session.execute(
+            update(Job).where(stale, Job.attempts >= Job.max_attempts)
+            .values(status="failed", error="Worker stopped before the job finished", finished_at=now)
+        )
+        self.session.execute(update(Job).where(stale).values(status="queued", run_after=now))
+        expired = self.session.execute(
+            select(Job.id).where(Job.status.in_(("done", "failed")), Job.finished_at < now - self.retention)
+        ).scalars().all()
+        if expired:
+            self._remove_files(expired)
+            self.session.execute(delete(Job).where(Job.id.in_(expired)))
+        self.session.commit()
+
+    def _remove_files(self, job_ids):
+        prefixes = tuple(f"{id}." for id in job_ids)
+        if os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                if name.startswith(prefixes):
+                    os.remove(os.path.join(self.directory, name))
+
+    def _claim(self):
+        from models import Job
+
+        now = datetime.utcnow()
+        if time.monotonic() >= self._next_maintenance:
+            self._next_maintenance = time.monotonic() + 60
+            self._maintain(now)
+        while True:
+            job_id = self.session.execute(
+                select(Job.id).where(Job.status == "queued", Job.run_after <= now)
+                .order_by(Job.run_after, Job.id).limit(1)
+            ).scalar()
+            if job_id is None:
+                self.session.commit()
+                return None
+            claimed = self.session.execute(
+                update(Job).where(Job.id == job_id, Job.status == "queued")
+                .values(status="running", attempts=Job.attempts + 1, started_at=now)
+            ).rowcount
+            self.session.commit()
+            if claimed:
+                return self.session.get(Job, job_id)
+
+    def run_next(self):
+        """Runs the next due job, if any. Returns the job, or None when nothing was due."""
+        from models import Job
+
+        job = self._claim()
+        if job is None:
+            return None
+        job_id = job.id
+        try:
+            result = self._handlers[job.kind](job)
+        except Exception as e:
+            self.session.rollback()
+            job = self.session.get(Job, job_id)
+            self.app.logger.warning(
+                "Job %s (%s) attempt %s failed: %s", job.id, job.kind, job.attempts, e,
+                exc_info=not isinstance(e, JobFailed),
+            )
+            job.error = str(e) or type(e).__name__
+            if isinstance(e, JobFailed) or job.attempts >= job.max_attempts:
+                job.status, job.finished_at = "failed", datetime.utcnow()
+            else:
+                job.status = "queued"
+                job.run_after = datetime.utcnow() + timedelta(seconds=self.retry_seconds * 2 ** (job.attempts - 1))
+        else:
+            job.status, job.result, job.error, job.finished_at = "done", result, None, datetime.utcnow()
+        self.session.commit()
+        return job
+
+    def work(self, once=False):
+        """Runs due jobs, then waits for more; with once=True returns when none are due."""
+        while True:
+            self._wake.clear()
+            try:
+                while True:
+                    with self.app.app_context():
+                        if self.run_next() is None:
+                            break
+            except Exception:
+                self.app.logger.exception("Job worker error")
+            if once:
+                return
+            self._wake.wait(self.poll_seconds)
+
+
+jobs = JobRunner()
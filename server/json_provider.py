@@ -0,0 +1,133 @@
+import dataclasses
+import decimal
+import json
+import uuid
+from datetime import date, datetime, time
+from flask import Response
+from flask.json.provider import JSONProvider
+from sqlalchemy.engine import Row
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib encoder is used instead
+    orjson = None
+
+# Items encoded per chunk when a large top-level array is streamed
+STREAM_CHUNK_ITEMS = 500
+
+
+class Fragment:
+    """
+    Already-encoded JSON (e.g. a cached catalog body) to embed as is. Allowed
+    as the payload itself or directly inside a top-level list or dict.
+    """
+
+    __slots__ = ("data",)
+
+    def __init__(self, data):
+        self.data = data.encode() if isinstance(data, str) else data
+
+
+def _default(o):
+    if isinstance(o, Row):
+        return dict(o._mapping)
+    if isinstance(o, (datetime, date, time)):
+        return o.isoformat()
+    if isinstance(o, decimal.Decimal):
+        return float(o)
+    if isinstance(o, uuid.UUID):
+        return str(o)
+    if dataclasses.is_dataclass(o):
+        return dataclasses.asdict(o)
+    if hasattr(o, "__html__"):
+        return str(o.__html__())
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    _OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SORT_KEYS
+
+    def _encode(obj):
+        return orjson.dumps(obj, default=_default, option=_OPTIONS)
+else:
+    _encoder = json.JSONEncoder(default=_default, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+    def _encode(obj):
+        return _encoder.encode(obj).encode()
+
+
+def _rows_as_dicts(items):
+    """A list of Rows as dicts in one pass, rather than one default() call per row."""
+    if items and isinstance(items[0], Row):
+        fields = items[0]._fields
+        return [dict(zip(fields, row)) if isinstance(row, Row) else row for row in items]
+    return items
+
+
+def _encode_items(items):
+    """Encodes list items (comma-joined, no brackets), passing Fragments through."""
+    items = _rows_as_dicts(items)
+    parts, batch = [], []
+    for item in items:
+        if isinstance(item, Fragment):
+            if batch:
+                parts.append(_encode(batch)[1:-1])
+                batch = []
+            parts.append(item.data)
+        else:
+            batch.append(item)
+    if batch:
+        parts.append(_encode(batch)[1:-1])
+    return b",".join(part for part in parts if part)
+
+
+def encode(obj):
+    """UTF-8 JSON bytes for `obj`."""
+    if isinstance(obj, Fragment):
+        return obj.data
+    if isinstance(obj, (list, tuple)):
+        obj = _rows_as_dicts(obj)
+        if any(isinstance(item, Fragment) for item in obj):
+            return b"[" + _encode_items(obj) + b"]"
+    elif isinstance(obj, dict):
+        fragments = {key: value for key, value in obj.items() if isinstance(value, Fragment)}
+        if fragments:
+            rest = _encode({key: value for key, value in obj.items() if key not in fragments})[1:-1]
+            parts = [rest] if rest else []
+            parts += [_encode(str(key)) + b":" + value.data for key, value in sorted(fragments.items())]
+            return b"{" + b",".join(parts) + b"}"
+    return _encode(obj)
+
+
+def iterencode(items):
+    """A JSON array written STREAM_CHUNK_ITEMS items at a time."""
+    yield b"["
+    for start in range(0, len(items), STREAM_CHUNK_ITEMS):
+        chunk = _encode_items(items[start:start + STREAM_CHUNK_ITEMS])
+        yield (b"," + chunk) if start else chunk
+    yield b"]\n"
+
+
+class FastJSONProvider(JSONProvider):
+    """
+    Compact JSON through orjson when it's installed (the stdlib otherwise).
+    Besides plain data it encodes SQLAlchemy Rows as objects, dates and times
+    as ISO 8601 and Decimals as numbers, and embeds Fragment bytes without
+    re-encoding them. Top-level arrays longer than JSON_STREAM_THRESHOLD are
+    streamed in chunks instead of being built as one string.
+    """
+
+    def dumps(self, obj, **kwargs):
+        return encode(obj).decode()
+
+    def loads(self, s, **kwargs):
+        if orjson is not None:
+            return orjson.loads(s)
+        return json.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        mimetype = self._app.config.get("JSONIFY_MIMETYPE", "application/json")
+        if isinstance(obj, (list, tuple)) and len(obj) > self._app.config["JSON_STREAM_THRESHOLD"]:
+            return Response(iterencode(obj), mimetype=mimetype)
+        return Response(encode(obj) + b"\n", mimetype=mimetype)
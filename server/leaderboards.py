@@ -0,0 +1,320 @@
+import re
+from collections import defaultdict
+from datetime import date, timedelta
+from sqlalchemy import bindparam, case, delete, func, insert, select, update
+
+from app import db
+from database import upsert
+from models import Workout, ExerciseLog, Exercise, User, GoalLeaderboard, ExerciseLeaderboard
+from rollups import workout_day, workouts_by_id
+
+ALL_TIME = "all"
+_WEEK = re.compile(r"^(\d{4})-W(\d{2})$")
+
+# Scores this close to zero are treated as gone (float sums don't cancel exactly)
+_EPSILON = 1e-6
+
+# board name -> (model, subject column)
+BOARDS = {
+    "goals": (GoalLeaderboard, GoalLeaderboard.goal_id),
+    "exercises": (ExerciseLeaderboard, ExerciseLeaderboard.exercise_id),
+}
+
+
+def week(day):
+    """ISO week of a date, e.g. "2024-W05"."""
+    year, number, _ = day.isocalendar()
+    return f"{year}-W{number:02d}"
+
+
+def period_arg(value, today=None):
+    """
+    A ?period= value as stored: "all", an ISO week ("2024-W05"), "week" (the
+    current one) or a date (its week). Raises ValueError for anything else.
+    """
+    if value in (None, "", "week"):
+        return week(today or date.today())
+    if value == ALL_TIME:
+        return value
+    match = _WEEK.match(value)
+    if match:
+        date.fromisocalendar(int(match[1]), int(match[2]), 1)
+        return value
+    try:
+        return week(date.fromisoformat(value))
+    except ValueError:
+        raise ValueError("period must be 'all', 'week', an ISO week like 2024-W05 or a date") from None
+
+
+def _week_range(period):
+    match = _WEEK.match(period)
+    start = date.fromisocalendar(int(match[1]), int(match[2]), 1)
+    return start, start + timedelta(days=7)
+
+
+def _goals(exercise_ids):
+    if not exercise_ids:
+        return {}
+    return dict(db.session.execute(
+        select(Exercise.id, Exercise.goal_id).where(Exercise.id.in_(exercise_ids))
+    ).all())
+
+
+def _key(model, subject, subject_id, period, user_id):
+    return (subject == subject_id) & (model.period == period) & (model.user_id == user_id)
+
+
+def _add_score(new):
+    return GoalLeaderboard.score + new.score
+
+
+def _max_score(new):
+    return case((new.score > ExerciseLeaderboard.score, new.score), else_=ExerciseLeaderboard.score)
+
+
+def _trim(model, subject, keys):
+    """Drops the entries at or below zero on each (subject_id, period) board, off the ranking index."""
+    if keys:
+        table = model.__table__
+        db.session.execute(
+            delete(table).where(
+                table.c[subject.key] == bindparam("key_subject"),
+                table.c.period == bindparam("key_period"),
+                table.c.score <= _EPSILON,
+            ),
+            [{"key_subject": subject_id, "key_period": period} for subject_id, period in sorted(keys)],
+        )
+
+
+def _add_volumes(deltas):
+    """Adds {(goal_id, period, user_id): volume} onto the goal boards in one upsert."""
+    model, subject = BOARDS["goals"]
+    rows = [
+        {"goal_id": goal_id, "period": period, "user_id": user_id, "score": volume}
+        for (goal_id, period, user_id), volume in deltas.items() if abs(volume) >= _EPSILON
+    ]
+    if not rows:
+        return
+    db.session.execute(upsert(db.session, model, ["goal_id", "period", "user_id"], score=_add_score), rows)
+    # Removals (including those inserted for users with no entry) may leave scores at or below zero
+    _trim(model, subject, {(row["goal_id"], row["period"]) for row in rows if row["score"] < 0})
+
+
+def _raise_weights(weights):
+    """Raises {(exercise_id, period, user_id): weight} on the exercise boards in one upsert."""
+    model, _ = BOARDS["exercises"]
+    rows = [
+        {"exercise_id": exercise_id, "period": period, "user_id": user_id, "score": weight}
+        for (exercise_id, period, user_id), weight in weights.items()
+    ]
+    if rows:
+        db.session.execute(upsert(db.session, model, ["exercise_id", "period", "user_id"], score=_max_score), rows)
+
+
+def _lower_weights(weights, excluded):
+    """
+    Recomputes the boards whose best lift was one of the removed logs, from
+    the user's other logs of that exercise in the period. `excluded` filters
+    out the logs being removed, which are still in the database.
+    """
+    model, subject = BOARDS["exercises"]
+    for (exercise_id, period, user_id), weight in weights.items():
+        key = _key(model, subject, exercise_id, period, user_id)
+        best = db.session.execute(select(model.score).where(key)).scalar()
+        if best is None or best > weight + _EPSILON:
+            continue
+        remaining = (
+            select(func.max(ExerciseLog.weight))
+            .join(Workout, Workout.id == ExerciseLog.workout_id)
+            .where(Workout.user_id == user_id, ExerciseLog.exercise_id == exercise_id, excluded)
+        )
+        if period != ALL_TIME:
+            start, end = _week_range(period)
+            remaining = remaining.where(Workout.date >= start, Workout.date < end)
+        best = db.session.execute(remaining).scalar()
+        if best and best > 0:
+            db.session.execute(update(model).where(key).values(score=best))
+        else:
+            db.session.execute(delete(model).where(key))
+
+
+def _apply(rows, sign, excluded=None):
+    """rows: (user_id, workout date, exercise_id, volume, heaviest weight)."""
+    goals = _goals({row[2] for row in rows if row[2] is not None})
+    volumes = defaultdict(float)
+    weights = {}
+    for user_id, when, exercise_id, volume, weight in rows:
+        day = workout_day(when)
+        if user_id is None or day is None or exercise_id is None:
+            continue
+        for period in (ALL_TIME, week(day)):
+            goal_id = goals.get(exercise_id)
+            if goal_id is not None:
+                volumes[(goal_id, period, user_id)] += sign * (volume or 0)
+            if weight and weight > 0:
+                key = (exercise_id, period, user_id)
+                weights[key] = max(weights.get(key, 0), weight)
+    _add_volumes(volumes)
+    if sign > 0:
+        _raise_weights(weights)
+    else:
+        _lower_weights(weights, excluded)
+
+
+def _log_row(log):
+    workout = db.session.get(Workout, log.workout_id) if log.workout_id else None
+    if workout is None:
+        return None
+    volume = (log.sets or 0) * (log.reps or 0) * (log.weight or 0)
+    return workout.user_id, workout.date, log.exercise_id, volume, log.weight
+
+
+def add_log(log):
+    """Call after adding or changing a log (and after remove_log for a change)."""
+    row = _log_row(log)
+    if row:
+        _apply([row], 1)
+
+
+def remove_log(log):
+    """Call before deleting or changing a log."""
+    row = _log_row(log)
+    if row:
+        _apply([row], -1, ExerciseLog.id != log.id)
+
+
+def _workout_rows(workout_id):
+    return db.session.execute(
+        select(
+            Workout.user_id, Workout.date, ExerciseLog.exercise_id,
+            func.sum(ExerciseLog.sets * ExerciseLog.reps * func.coalesce(ExerciseLog.weight, 0)),
+            func.max(ExerciseLog.weight),
+        )
+        .join(ExerciseLog, ExerciseLog.workout_id == Workout.id)
+        .where(Workout.id == workout_id)
+        .group_by(ExerciseLog.exercise_id)
+    ).all()
+
+
+def add_workout(workout):
+    _apply(_workout_rows(workout.id), 1)
+
+
+def remove_workout(workout):
+    """Call before deleting a workout or moving it to another user/date."""
+    _apply(_workout_rows(workout.id), -1, ExerciseLog.workout_id != workout.id)
+
+
+def add_logs(rows, workouts=None):
+    """
+    Adds freshly inserted log dicts (workout_id, exercise_id, sets, reps,
+    weight). `workouts` is their rollups.workouts_by_id(), if the caller has it.
+    """
+    if workouts is None:
+        workouts = workouts_by_id(row["workout_id"] for row in rows)
+    log_rows = []
+    for row in rows:
+        user_id, when = workouts.get(row["workout_id"], (None, None))
+        weight = row.get("weight")
+        log_rows.append((user_id, when, row["exercise_id"], row["sets"] * row["reps"] * (weight or 0), weight))
+    _apply(log_rows, 1)
+
+
+def top(board, subject_id, period, limit):
+    """
+    The first `limit` entries of a board, best first, read straight off its
+    ranking index. Equal scores share a rank ("1224" ranking).
+    """
+    model, subject = BOARDS[board]
+    rows = db.session.execute(
+        select(model.user_id, User.name, model.score)
+        .join(User, User.id == model.user_id)
+        .where(subject == subject_id, model.period == period)
+        .order_by(model.score.desc(), model.user_id.desc())
+        .limit(limit)
+    ).all()
+    entries, previous, rank = [], None, 0
+    for position, (user_id, name, score) in enumerate(rows, 1):
+        if score != previous:
+            rank, previous = position, score
+        entries.append({"rank": rank, "user_id": user_id, "name": name, "score": round(score, 2)})
+    return entries
+
+
+def rebuild(board=None, subject_id=None, user_id=None):
+    """
+    Recomputes the boards from exercise_logs: both kinds or one ("goals" or
+    "exercises"), optionally for a single goal or exercise of that kind,
+    and for one user or everyone. Returns the number of rows written.
+    """
+    if subject_id is not None and board is None:
+        raise ValueError("subject_id needs a board: a goal and an exercise id aren't the same thing")
+    query = (
+        select(
+            Workout.user_id, Workout.date, ExerciseLog.exercise_id, Exercise.goal_id,
+            func.sum(ExerciseLog.sets * ExerciseLog.reps * func.coalesce(ExerciseLog.weight, 0)),
+            func.max(ExerciseLog.weight),
+        )
+        .join(ExerciseLog, ExerciseLog.workout_id == Workout.id)
+        .join(Exercise, Exercise.id == ExerciseLog.exercise_id)
+        .where(Workout.user_id.is_not(None))
+        .group_by(Workout.user_id, Workout.date, ExerciseLog.exercise_id)
+        .order_by(Workout.user_id)
+    )
+    if user_id is not None:
+        query = query.where(Workout.user_id == user_id)
+    boards = [board] if board else list(BOARDS)
+    for name in boards:
+        model, subject = BOARDS[name]
+        clear = delete(model)
+        if user_id is not None:
+            clear = clear.where(model.user_id == user_id)
+        if subject_id is not None:
+            clear = clear.where(subject == subject_id)
+            query = query.where((Exercise.goal_id if name == "goals" else ExerciseLog.exercise_id) == subject_id)
+        db.session.execute(clear)
+
+    # Aggregate one user at a time so memory stays bounded
+    count = 0
+    pending, current = [], None
+    for row in db.session.execute(query).yield_per(10000):
+        if row[0] != current and pending:
+            count += _insert_scores(pending, boards)
+            pending = []
+        current = row[0]
+        pending.append(row)
+    if pending:
+        count += _insert_scores(pending, boards)
+    return count
+
+
+def _insert_scores(rows, boards):
+    volumes, weights = defaultdict(float), {}
+    for user_id, when, exercise_id, goal_id, volume, weight in rows:
+        day = workout_day(when)
+        if day is None:
+            continue
+        for period in (ALL_TIME, week(day)):
+            if goal_id is not None and volume:
+                volumes[(goal_id, period, user_id)] += volume
+            if weight and weight > 0:
+                key = (exercise_id, period, user_id)
+                weights[key] = max(weights.get(key, 0), weight)
+    count = 0
+    if "goals" in boards:
+        scores = [
+            {"goal_id": goal_id, "period": period, "user_id": user_id, "score": volume}
+            for (goal_id, period, user_id), volume in volumes.items() if volume > _EPSILON
+        ]
+        if scores:
+            db.session.execute(insert(GoalLeaderboard), scores)
+        count += len(scores)
+    if "exercises" in boards:
+        scores = [
+            {"exercise_id": exercise_id, "period": period, "user_id": user_id, "score": weight}
+            for (exercise_id, period, user_id), weight in weights.items()
+        ]
+        if scores:
+            db.session.execute(insert(ExerciseLeaderboard), scores)
+        count += len(scores)
+    return count
@@ -0,0 +1,203 @@
+import heapq
+import threading
+import time
+from collections import defaultdict
+from flask import Response, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Mapper
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+STATEMENT_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 1000)
+SLOW_LOG_STATEMENTS = 5
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def stats_lines(prefix, stats, help):
+    """Renders a flat dict of counters (e.g. PasswordHasher.stats()) as untyped samples."""
+    lines = []
+    for name, value in sorted(stats.items()):
+        lines += [f"# HELP {prefix}_{name} {help}", f"# TYPE {prefix}_{name} untyped", f"{prefix}_{name} {value}"]
+    return lines
+
+
+class Metrics:
+    """
+    Per-route request and SQL instrumentation, rendered in Prometheus text
+    format. Request timing runs from before_request to teardown, so time
+    spent streaming a response body is included. SQL is timed with cursor
+    execute events on every engine. Counts are per process.
+
+    Rows are counted as DML rowcounts plus ORM instances loaded. Rows a Core
+    select fetches aren't seen by any event, so reads such as the rollup and
+    leaderboard queries add nothing to the rows metric.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency = defaultdict(lambda: Histogram(LATENCY_BUCKETS))
+        self.statements = defaultdict(lambda: Histogram(STATEMENT_BUCKETS))
+        self.requests = defaultdict(int)
+        self.db_seconds = defaultdict(float)
+        self.db_dml_orm_rows = defaultdict(int)
+        self.slow_seconds = 1.0
+        self.sources = []
+
+    def init_app(self, app):
+        self.slow_seconds = app.config["SLOW_REQUEST_SECONDS"]
+        self.app = app
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        app.add_url_rule("/metrics", "metrics", self.render_response)
+        if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+            event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+            event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+            event.listen(Mapper, "load", _instance_loaded)
+
+    def add_source(self, render):
+        """Registers a callable returning extra exposition lines (e.g. hasher stats)."""
+        self.sources.append(render)
+
+    def _before_request(self):
+        g.metrics = {"started": time.perf_counter(), "statements": 0, "db_seconds": 0.0, "rows": 0, "sql": []}
+
+    def _after_request(self, response):
+        if "metrics" in g:
+            g.metrics["status"] = response.status_code
+        return response
+
+    def _teardown_request(self, exc):
+        data = g.pop("metrics", None)
+        if data is None:
+            return
+        elapsed = time.perf_counter() - data["started"]
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        key = (request.method, route)
+        status = data.get("status", 500)
+
+        with self._lock:
+            self.latency[key].observe(elapsed)
+            self.statements[key].observe(data["statements"])
+            self.requests[key + (status,)] += 1
+            self.db_seconds[key] += data["db_seconds"]
+            self.db_dml_orm_rows[key] += data["rows"]
+
+        if elapsed >= self.slow_seconds:
+            slowest = sorted(data["sql"], reverse=True)
+            self.app.logger.warning(
+                "Slow request %s %s: %.3fs, %d statements, %.3fs in SQL%s",
+                request.method, request.full_path.rstrip("?"), elapsed, data["statements"], data["db_seconds"],
+                "".join(f"\n  {seconds:.3f}s  {statement[:500]}" for seconds, statement in slowest),
+            )
+
+    def render(self):
+        lines = []
+        with self._lock:
+            lines += [
+                "# HELP http_request_duration_seconds Request latency, including streamed bodies.",
+                "# TYPE http_request_duration_seconds histogram",
+            ]
+            for (method, route), hist in sorted(self.latency.items()):
+                lines += _histogram_lines("http_request_duration_seconds", hist, method=method, route=route)
+
+            lines += [
+                "# HELP http_requests_total Requests by route and status.",
+                "# TYPE http_requests_total counter",
+            ]
+            for (method, route, status), count in sorted(self.requests.items()):
+                lines.append(f"http_requests_total{_labels(method=method, route=route, status=status)} {count}")
+
+            lines += [
+                "# HELP http_request_db_statements SQL statements issued per request.",
+                "# TYPE http_request_db_statements histogram",
+            ]
+            for (method, route), hist in sorted(self.statements.items()):
+                lines += _histogram_lines("http_request_db_statements", hist, method=method, route=route)
+
+            lines += [
+                "# HELP http_request_db_seconds_total Time spent executing SQL.",
+                "# TYPE http_request_db_seconds_total counter",
+            ]
+            for (method, route), seconds in sorted(self.db_seconds.items()):
+                lines.append(f"http_request_db_seconds_total{_labels(method=method, route=route)} {seconds}")
+
+            lines += [
+                "# HELP http_request_db_dml_orm_rows_total Rows changed by DML plus ORM objects loaded"
+                " (rows fetched by Core selects aren't counted).",
+                "# TYPE http_request_db_dml_orm_rows_total counter",
+            ]
+            for (method, route), rows in sorted(self.db_dml_orm_rows.items()):
+                lines.append(f"http_request_db_dml_orm_rows_total{_labels(method=method, route=route)} {rows}")
+
+        for source in self.sources:
+            lines += source()
+        return "\n".join(lines) + "\n"
+
+    def render_response(self):
+        return Response(self.render(), mimetype="text/plain; version=0.0.4")
+
+
+def _histogram_lines(name, hist, **labels):
+    lines = []
+    for bound, count in zip(hist.buckets, hist.counts):
+        lines.append(f"{name}_bucket{_labels(**labels, le=bound)} {count}")
+    lines.append(f"{name}_bucket{_labels(**labels, le='+Inf')} {hist.count}")
+    lines.append(f"{name}_sum{_labels(**labels)} {hist.sum}")
+    lines.append(f"{name}_count{_labels(**labels)} {hist.count}")
+    return lines
+
+
+def _current():
+    return g.get("metrics") if has_request_context() else None
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info["metrics_started"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    data = _current()
+    if data is None:
+        return
+    seconds = time.perf_counter() - conn.info.pop("metrics_started", time.perf_counter())
+    data["statements"] += 1
+    data["db_seconds"] += seconds
+    if cursor.rowcount and cursor.rowcount > 0:
+        data["rows"] += cursor.rowcount
+    # Keep only the slowest few statements for the slow-request log
+    if len(data["sql"]) < SLOW_LOG_STATEMENTS:
+        heapq.heappush(data["sql"], (seconds, statement))
+    else:
+        heapq.heappushpop(data["sql"], (seconds, statement))
+
+
+def _instance_loaded(target, context):
+    data = _current()
+    if data is not None:
+        data["rows"] += 1
+
+
+metrics = Metrics()
@@ -90,21 +90,41 @@ def run_migrations_online():
                 directives[:] = []
                 logger.info('No changes in schema detected.')
 
+    # Full-text indexes are created by hand-written migrations (see search.py)
+    # and aren't in the models, so autogenerate leaves them alone
+    def include_name(name, type_, parent_names):
+        from search import is_index_table
+
+        return not (type_ == "table" and is_index_table(name))
+
     conf_args = current_app.extensions['migrate'].configure_args
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
+    conf_args.setdefault("include_name", include_name)
 
     connectable = get_engine()
 
     with connectable.connect() as connection:
+        # The app turns on SQLite foreign keys (database.py), but batch
+        # migrations drop and recreate tables, which would fire ON DELETE
+        # CASCADE. The pragma is ignored inside a transaction, so it's set on
+        # the raw connection before Alembic begins one.
+        sqlite = connection.dialect.name == "sqlite"
+        if sqlite:
+            connection.connection.dbapi_connection.execute("PRAGMA foreign_keys=OFF")
+
         context.configure(
             connection=connection,
             target_metadata=get_metadata(),
             **conf_args
         )
 
-        with context.begin_transaction():
-            context.run_migrations()
+        try:
+            with context.begin_transaction():
+                context.run_migrations()
+        finally:
+            if sqlite:
+                connection.connection.dbapi_connection.execute("PRAGMA foreign_keys=ON")
 
 
 if context.is_offline_mode():
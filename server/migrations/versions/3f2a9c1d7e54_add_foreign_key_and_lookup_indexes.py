@@ -0,0 +1,52 @@
+"""Add foreign key and lookup indexes
+
+Revision ID: 3f2a9c1d7e54
+Revises: b4c3efd460b1
+Create Date: 2026-10-18 09:12:40.118305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f2a9c1d7e54'
+down_revision = 'b4c3efd460b1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('goals', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_goals_name'), ['name'], unique=False)
+
+    with op.batch_alter_table('user_goals', schema=None) as batch_op:
+        batch_op.create_index('ix_user_goals_goal_id', ['goal_id'], unique=False)
+
+    with op.batch_alter_table('exercises', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_exercises_goal_id'), ['goal_id'], unique=False)
+
+    with op.batch_alter_table('workouts', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_workouts_user_id'), ['user_id'], unique=False)
+
+    with op.batch_alter_table('exercise_logs', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_exercise_logs_exercise_id'), ['exercise_id'], unique=False)
+        batch_op.create_index('ix_exercise_logs_workout_id_exercise_id', ['workout_id', 'exercise_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('exercise_logs', schema=None) as batch_op:
+        batch_op.drop_index('ix_exercise_logs_workout_id_exercise_id')
+        batch_op.drop_index(batch_op.f('ix_exercise_logs_exercise_id'))
+
+    with op.batch_alter_table('workouts', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_workouts_user_id'))
+
+    with op.batch_alter_table('exercises', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_exercises_goal_id'))
+
+    with op.batch_alter_table('user_goals', schema=None) as batch_op:
+        batch_op.drop_index('ix_user_goals_goal_id')
+
+    with op.batch_alter_table('goals', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_goals_name'))
@@ -0,0 +1,77 @@
+"""Add daily volume rollup
+
+Revision ID: 8c41d2e07b6a
+Revises: 3f2a9c1d7e54
+Create Date: 2026-10-18 11:40:02.513877
+
+"""
+from collections import defaultdict
+from datetime import date, datetime
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c41d2e07b6a'
+down_revision = '3f2a9c1d7e54'
+branch_labels = None
+depends_on = None
+
+# Formats seen in free-form date strings besides ISO 8601; the same as the
+# workouts.date conversion in a7e3b95c2f18, so the backfill covers every
+# workout that revision converts
+FORMATS = ("%m/%d/%Y", "%d %b %Y", "%d %B %Y", "%b %d %Y", "%b %d, %Y", "%B %d %Y", "%B %d, %Y")
+
+
+def parse(value):
+    value = str(value).strip()
+    try:
+        return date.fromisoformat(value[:10])
+    except ValueError:
+        pass
+    for fmt in FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def upgrade():
+    daily_volumes = op.create_table('daily_volumes',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('exercise_id', sa.Integer(), nullable=False),
+    sa.Column('sets', sa.Integer(), nullable=False),
+    sa.Column('reps', sa.Integer(), nullable=False),
+    sa.Column('volume', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['exercise_id'], ['exercises.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'date', 'exercise_id')
+    )
+
+    # Backfill from existing logs; workout dates are free-form strings here
+    totals = defaultdict(lambda: [0, 0, 0.0])
+    rows = op.get_bind().execute(sa.text(
+        "SELECT w.user_id, w.date, l.exercise_id, SUM(l.sets), SUM(l.sets * l.reps), "
+        "SUM(l.sets * l.reps * COALESCE(l.weight, 0)) "
+        "FROM workouts w JOIN exercise_logs l ON l.workout_id = w.id "
+        "WHERE w.user_id IS NOT NULL AND l.exercise_id IS NOT NULL "
+        "GROUP BY w.id, l.exercise_id"
+    ))
+    for user_id, when, exercise_id, sets, reps, volume in rows:
+        day = parse(when)
+        if day is None:
+            continue
+        total = totals[(user_id, day, exercise_id)]
+        total[0] += sets
+        total[1] += reps
+        total[2] += volume
+    op.bulk_insert(daily_volumes, [
+        dict(user_id=u, date=d, exercise_id=e, sets=s, reps=r, volume=v)
+        for (u, d, e), (s, r, v) in totals.items()
+    ])
+
+
+def downgrade():
+    op.drop_table('daily_volumes')
@@ -0,0 +1,92 @@
+"""Convert workouts.date to a Date column
+
+Revision ID: a7e3b95c2f18
+Revises: 8c41d2e07b6a
+Create Date: 2026-10-18 14:05:31.902644
+
+"""
+from datetime import date, datetime
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7e3b95c2f18'
+down_revision = '8c41d2e07b6a'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+# Formats seen in free-form date strings besides ISO 8601
+FORMATS = ("%m/%d/%Y", "%d %b %Y", "%d %B %Y", "%b %d %Y", "%b %d, %Y", "%B %d %Y", "%B %d, %Y")
+
+
+def parse(value):
+    value = str(value).strip()
+    try:
+        return date.fromisoformat(value[:10])
+    except ValueError:
+        pass
+    for fmt in FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def batches(conn):
+    """(id, date) rows of workouts in id order, one batch at a time."""
+    last_id = 0
+    while True:
+        rows = conn.execute(sa.text(
+            "SELECT id, date FROM workouts WHERE id > :last_id ORDER BY id LIMIT :limit"
+        ), {"last_id": last_id, "limit": BATCH_SIZE}).fetchall()
+        if not rows:
+            return
+        last_id = rows[-1][0]
+        yield rows
+
+
+def upgrade():
+    conn = op.get_bind()
+
+    # Check every date before touching the schema: SQLite doesn't roll back
+    # the batch operations, so failing later would leave date_parsed behind
+    unparsed = [(id, value) for rows in batches(conn) for id, value in rows if parse(value) is None]
+    if unparsed:
+        sample = ", ".join(f"{id}: {value!r}" for id, value in unparsed[:10])
+        raise RuntimeError(
+            f"{len(unparsed)} workout dates could not be parsed; fix them and rerun ({sample})"
+        )
+
+    with op.batch_alter_table('workouts', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('date_parsed', sa.Date(), nullable=True))
+
+    workouts = sa.table('workouts', sa.column('id', sa.Integer), sa.column('date_parsed', sa.Date))
+    update = workouts.update().where(workouts.c.id == sa.bindparam('workout_id')).values(
+        date_parsed=sa.bindparam('parsed'))
+    for rows in batches(conn):
+        conn.execute(update, [{"workout_id": id, "parsed": parse(value)} for id, value in rows])
+
+    with op.batch_alter_table('workouts', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_workouts_user_id'))
+        batch_op.drop_column('date')
+        batch_op.alter_column('date_parsed', new_column_name='date',
+               existing_type=sa.Date(),
+               nullable=False)
+
+    with op.batch_alter_table('workouts', schema=None) as batch_op:
+        batch_op.create_index('ix_workouts_user_id_date', ['user_id', 'date'], unique=False)
+
+
+def downgrade():
+    # SQLite stores Date as 'YYYY-MM-DD' text, so the values carry over as strings
+    with op.batch_alter_table('workouts', schema=None) as batch_op:
+        batch_op.drop_index('ix_workouts_user_id_date')
+        batch_op.alter_column('date',
+               existing_type=sa.Date(),
+               type_=sa.String(length=50),
+               existing_nullable=False)
+        batch_op.create_index(batch_op.f('ix_workouts_user_id'), ['user_id'], unique=False)
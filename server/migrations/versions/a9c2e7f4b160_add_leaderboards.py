@@ -0,0 +1,60 @@
+"""Add goal and exercise leaderboards
+
+Revision ID: a9c2e7f4b160
+Revises: d3f6a9b2c815
+Create Date: 2026-10-18 23:05:48.217634
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9c2e7f4b160'
+down_revision = 'd3f6a9b2c815'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('exercise_leaderboards',
+    sa.Column('exercise_id', sa.Integer(), nullable=False),
+    sa.Column('period', sa.String(length=8), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['exercise_id'], ['exercises.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('exercise_id', 'period', 'user_id')
+    )
+    with op.batch_alter_table('exercise_leaderboards', schema=None) as batch_op:
+        batch_op.create_index('ix_exercise_leaderboards_ranking', ['exercise_id', 'period', 'score', 'user_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_exercise_leaderboards_user_id'), ['user_id'], unique=False)
+
+    op.create_table('goal_leaderboards',
+    sa.Column('goal_id', sa.Integer(), nullable=False),
+    sa.Column('period', sa.String(length=8), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['goal_id'], ['goals.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('goal_id', 'period', 'user_id')
+    )
+    with op.batch_alter_table('goal_leaderboards', schema=None) as batch_op:
+        batch_op.create_index('ix_goal_leaderboards_ranking', ['goal_id', 'period', 'score', 'user_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_goal_leaderboards_user_id'), ['user_id'], unique=False)
+
+    # Existing history is ranked by `flask rebuild-leaderboards` (ISO weeks
+    # can't be computed portably in SQL)
+
+
+def downgrade():
+    with op.batch_alter_table('goal_leaderboards', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_goal_leaderboards_user_id'))
+        batch_op.drop_index('ix_goal_leaderboards_ranking')
+
+    op.drop_table('goal_leaderboards')
+    with op.batch_alter_table('exercise_leaderboards', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_exercise_leaderboards_user_id'))
+        batch_op.drop_index('ix_exercise_leaderboards_ranking')
+
+    op.drop_table('exercise_leaderboards')
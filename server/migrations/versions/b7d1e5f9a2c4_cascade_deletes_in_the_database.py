@@ -0,0 +1,81 @@
+"""Cascade deletes in the database
+
+Revision ID: b7d1e5f9a2c4
+Revises: f4a8d2c6b371
+Create Date: 2026-10-18 20:41:07.552913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d1e5f9a2c4'
+down_revision = 'f4a8d2c6b371'
+branch_labels = None
+depends_on = None
+
+# SQLite foreign keys are unnamed; batch mode names the reflected ones with
+# this so they can be dropped
+naming_convention = {"fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s"}
+
+# (table, column, referred table, ON DELETE)
+FOREIGN_KEYS = [
+    ('user_goals', 'user_id', 'users', 'CASCADE'),
+    ('user_goals', 'goal_id', 'goals', 'CASCADE'),
+    ('exercises', 'goal_id', 'goals', 'CASCADE'),
+    ('workouts', 'user_id', 'users', 'CASCADE'),
+    ('exercise_logs', 'workout_id', 'workouts', 'CASCADE'),
+    ('exercise_logs', 'exercise_id', 'exercises', 'SET NULL'),
+    ('daily_volumes', 'user_id', 'users', 'CASCADE'),
+    ('daily_volumes', 'exercise_id', 'exercises', 'CASCADE'),
+    ('personal_records', 'user_id', 'users', 'CASCADE'),
+    ('personal_records', 'exercise_id', 'exercises', 'CASCADE'),
+    ('imports', 'user_id', 'users', 'CASCADE'),
+]
+
+
+def _dangling(column, referred):
+    return f"{column} IS NOT NULL AND {column} NOT IN (SELECT id FROM {referred})"
+
+
+def _replace_foreign_keys(ondelete):
+    tables = {}
+    for table, column, referred, action in FOREIGN_KEYS:
+        tables.setdefault(table, []).append((column, referred, action if ondelete else None))
+    for table, keys in tables.items():
+        with op.batch_alter_table(table, schema=None, naming_convention=naming_convention) as batch_op:
+            for column, referred, action in keys:
+                name = f'fk_{table}_{column}_{referred}'
+                batch_op.drop_constraint(name, type_='foreignkey')
+                batch_op.create_foreign_key(batch_op.f(name), referred, [column], ['id'], ondelete=action)
+
+
+def upgrade():
+    # Rows left pointing at deleted parents would fail once foreign keys are
+    # enforced: nullable references are cleared, the rest deleted
+    for table, column, referred, _ in FOREIGN_KEYS:
+        if (table, column) in {('exercises', 'goal_id'), ('workouts', 'user_id'),
+                               ('exercise_logs', 'workout_id'), ('exercise_logs', 'exercise_id')}:
+            op.execute(f"UPDATE {table} SET {column} = NULL WHERE {_dangling(column, referred)}")
+        else:
+            op.execute(f"DELETE FROM {table} WHERE {_dangling(column, referred)}")
+
+    _replace_foreign_keys(ondelete=True)
+
+    # Exercise deletes cascade by exercise_id, which neither primary key leads with
+    with op.batch_alter_table('daily_volumes', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_daily_volumes_exercise_id'), ['exercise_id'], unique=False)
+
+    with op.batch_alter_table('personal_records', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_personal_records_exercise_id'), ['exercise_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('personal_records', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_personal_records_exercise_id'))
+
+    with op.batch_alter_table('daily_volumes', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_daily_volumes_exercise_id'))
+
+    _replace_foreign_keys(ondelete=False)
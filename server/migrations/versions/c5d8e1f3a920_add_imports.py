@@ -0,0 +1,42 @@
+"""Add imports progress table
+
+Revision ID: c5d8e1f3a920
+Revises: a7e3b95c2f18
+Create Date: 2026-10-18 17:10:44.201935
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5d8e1f3a920'
+down_revision = 'a7e3b95c2f18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('imports',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('format', sa.String(length=10), nullable=False),
+    sa.Column('status', sa.String(length=10), nullable=False),
+    sa.Column('records', sa.Integer(), nullable=False),
+    sa.Column('workouts', sa.Integer(), nullable=False),
+    sa.Column('logs', sa.Integer(), nullable=False),
+    sa.Column('skipped', sa.Integer(), nullable=False),
+    sa.Column('errors', sa.JSON(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('imports', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_imports_user_id'), ['user_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('imports', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_imports_user_id'))
+
+    op.drop_table('imports')
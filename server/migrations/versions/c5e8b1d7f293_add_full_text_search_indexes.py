@@ -0,0 +1,59 @@
+"""Add full-text search indexes
+
+Revision ID: c5e8b1d7f293
+Revises: a9c2e7f4b160
+Create Date: 2026-10-18 23:48:12.390125
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5e8b1d7f293'
+down_revision = 'a9c2e7f4b160'
+branch_labels = None
+depends_on = None
+
+# FTS5 is SQLite's; elsewhere search.py falls back to LIKE
+INDEXES = ['exercises_fts', 'workouts_fts']
+
+# External-content indexes kept in sync by triggers; 'rebuild' indexes existing rows
+STATEMENTS = [
+    "CREATE VIRTUAL TABLE exercises_fts USING fts5(exercise_name, content='exercises', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE TRIGGER exercises_fts_insert AFTER INSERT ON exercises BEGIN "
+    "INSERT INTO exercises_fts(rowid, exercise_name) VALUES (new.id, new.exercise_name); END",
+    "CREATE TRIGGER exercises_fts_delete AFTER DELETE ON exercises BEGIN "
+    "INSERT INTO exercises_fts(exercises_fts, rowid, exercise_name) VALUES ('delete', old.id, old.exercise_name); END",
+    "CREATE TRIGGER exercises_fts_update AFTER UPDATE OF exercise_name ON exercises BEGIN "
+    "INSERT INTO exercises_fts(exercises_fts, rowid, exercise_name) VALUES ('delete', old.id, old.exercise_name); "
+    "INSERT INTO exercises_fts(rowid, exercise_name) VALUES (new.id, new.exercise_name); END",
+    "INSERT INTO exercises_fts(exercises_fts) VALUES ('rebuild')",
+    "CREATE VIRTUAL TABLE workouts_fts USING fts5(title, notes, content='workouts', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE TRIGGER workouts_fts_insert AFTER INSERT ON workouts BEGIN "
+    "INSERT INTO workouts_fts(rowid, title, notes) VALUES (new.id, new.title, new.notes); END",
+    "CREATE TRIGGER workouts_fts_delete AFTER DELETE ON workouts BEGIN "
+    "INSERT INTO workouts_fts(workouts_fts, rowid, title, notes) VALUES ('delete', old.id, old.title, old.notes); END",
+    "CREATE TRIGGER workouts_fts_update AFTER UPDATE OF title, notes ON workouts BEGIN "
+    "INSERT INTO workouts_fts(workouts_fts, rowid, title, notes) VALUES ('delete', old.id, old.title, old.notes); "
+    "INSERT INTO workouts_fts(rowid, title, notes) VALUES (new.id, new.title, new.notes); END",
+    "INSERT INTO workouts_fts(workouts_fts) VALUES ('rebuild')",
+]
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for statement in STATEMENTS:
+        op.execute(statement)
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for name in INDEXES:
+        for suffix in ('insert', 'delete', 'update'):
+            op.execute(f'DROP TRIGGER IF EXISTS {name}_{suffix}')
+        op.execute(f'DROP TABLE IF EXISTS {name}')
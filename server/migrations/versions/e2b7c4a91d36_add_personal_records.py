@@ -0,0 +1,46 @@
+"""Add personal records
+
+Revision ID: e2b7c4a91d36
+Revises: c5d8e1f3a920
+Create Date: 2026-10-18 17:32:15.774120
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2b7c4a91d36'
+down_revision = 'c5d8e1f3a920'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('personal_records',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('exercise_id', sa.Integer(), nullable=False),
+    sa.Column('max_weight', sa.Float(), nullable=False),
+    sa.Column('max_weight_reps', sa.Integer(), nullable=False),
+    sa.Column('max_weight_log_id', sa.Integer(), nullable=True),
+    sa.Column('best_1rm', sa.Float(), nullable=False),
+    sa.Column('best_1rm_log_id', sa.Integer(), nullable=True),
+    sa.Column('max_volume', sa.Float(), nullable=False),
+    sa.Column('max_volume_workout_id', sa.Integer(), nullable=True),
+    sa.Column('stale', sa.Boolean(), nullable=False),
+    sa.ForeignKeyConstraint(['exercise_id'], ['exercises.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'exercise_id')
+    )
+
+    # Existing history: stale placeholders, computed on each user's first read
+    op.execute(
+        "INSERT INTO personal_records (user_id, exercise_id, max_weight, max_weight_reps, best_1rm, max_volume, stale) "
+        "SELECT DISTINCT w.user_id, l.exercise_id, 0, 0, 0, 0, 1 "
+        "FROM workouts w JOIN exercise_logs l ON l.workout_id = w.id "
+        "WHERE w.user_id IS NOT NULL AND l.exercise_id IS NOT NULL"
+    )
+
+
+def downgrade():
+    op.drop_table('personal_records')
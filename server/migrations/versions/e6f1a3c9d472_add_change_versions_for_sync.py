@@ -0,0 +1,61 @@
+"""Add change versions and tombstones for sync
+
+Revision ID: e6f1a3c9d472
+Revises: c5e8b1d7f293
+Create Date: 2026-10-19 00:37:55.104786
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e6f1a3c9d472'
+down_revision = 'c5e8b1d7f293'
+branch_labels = None
+depends_on = None
+
+TABLES = ['goals', 'exercises', 'workouts', 'exercise_logs']
+
+
+def upgrade():
+    op.create_table('sync_state',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.BigInteger(), nullable=False),
+    sa.Column('pruned_version', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.execute("INSERT INTO sync_state (id, version, pruned_version) VALUES (1, 0, 0)")
+
+    op.create_table('sync_tombstones',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('row_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('version', sa.BigInteger(), server_default='0', nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('sync_tombstones', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_sync_tombstones_version'), ['version'], unique=False)
+
+    # Existing rows are version 0: part of a full sync, never of a delta.
+    # ADD COLUMN doesn't recreate the tables, so the search triggers survive
+    for table in TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('version', sa.BigInteger(), server_default='0', nullable=False))
+            batch_op.create_index(batch_op.f(f'ix_{table}_version'), ['version'], unique=False)
+
+
+def downgrade():
+    for table in reversed(TABLES):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(batch_op.f(f'ix_{table}_version'))
+        # DROP COLUMN rather than a batch copy, which would drop the search triggers
+        op.execute(f'ALTER TABLE {table} DROP COLUMN version')
+
+    with op.batch_alter_table('sync_tombstones', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_sync_tombstones_version'))
+
+    op.drop_table('sync_tombstones')
+    op.drop_table('sync_state')
@@ -1,14 +1,59 @@
+from datetime import date, datetime
+from sqlalchemy import DDL, event, select
 from app import db
 from sqlalchemy_serializer import SerializerMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from hashing import hasher
+
+
+def parse_date(value):
+    """Date from a date/datetime or an ISO 8601 string; any time part is dropped."""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if not isinstance(value, str):
+        raise ValueError("date must be an ISO 8601 date string")
+    return date.fromisoformat(value[:10])
+
 
 # Association table
 user_goals = db.Table(
     "user_goals",
-    db.Column("user_id", db.Integer, db.ForeignKey("users.id"), primary_key=True),
-    db.Column("goal_id", db.Integer, db.ForeignKey("goals.id"), primary_key=True),
+    db.Column("user_id", db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+    db.Column("goal_id", db.Integer, db.ForeignKey("goals.id", ondelete="CASCADE"), primary_key=True),
+    # The primary key covers user_id lookups; Goal.users needs goal_id
+    db.Index("ix_user_goals_goal_id", "goal_id"),
 )
 
+
+class SyncState(db.Model):
+    """
+    The current change version (a single row). Every transaction that
+    writes a synced table bumps it first; see sync.py.
+    """
+    __tablename__ = "sync_state"
+
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+    # Tombstones up to here have been deleted; older ?since= values can't be served
+    pruned_version = db.Column(db.BigInteger, nullable=False, default=0)
+
+
+event.listen(SyncState.__table__, "after_create", DDL("INSERT INTO sync_state (id, version, pruned_version) VALUES (1, 0, 0)"))
+
+
+def current_version():
+    return select(SyncState.version).where(SyncState.id == 1).scalar_subquery()
+
+
+def _change_version():
+    """Column for rows of synced tables, stamped on insert and update with the current version."""
+    return db.Column(
+        db.BigInteger, nullable=False, default=current_version(), onupdate=current_version(),
+        server_default="0", index=True,
+    )
+
+
 class User(db.Model, SerializerMixin):
     __tablename__ = "users"
 
@@ -17,33 +62,38 @@ class User(db.Model, SerializerMixin):
     email = db.Column(db.String(100), unique=True, nullable=False)
     password_hash = db.Column(db.String(128), nullable=True)
 
-    # Relationships
-    workouts = db.relationship("Workout", backref="user", cascade="all, delete-orphan")
-    goals = db.relationship("Goal", secondary=user_goals, back_populates="users")
+    # Relationships. Deletes cascade in the database (ON DELETE CASCADE, see
+    # database.py for SQLite) rather than loading every child row first
+    workouts = db.relationship("Workout", backref="user", cascade="all, delete-orphan", passive_deletes=True)
+    goals = db.relationship("Goal", secondary=user_goals, back_populates="users", passive_deletes=True)
 
     # Prevents recursion
     serialize_rules = ("-workouts.user", "-goals.users", "-password_hash")
 
     def set_password(self, password: str):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hasher.hash(password)
 
     def check_password(self, password: str) -> bool:
         if not self.password_hash:
             return False
-        return check_password_hash(self.password_hash, password)
+        return hasher.verify(self.password_hash, password)
+
+    def password_needs_rehash(self) -> bool:
+        return bool(self.password_hash) and hasher.needs_rehash(self.password_hash)
 
 
 class Goal(db.Model, SerializerMixin):
     __tablename__ = "goals"
 
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(50), nullable=False)
+    name = db.Column(db.String(50), nullable=False, index=True)
+    version = _change_version()
 
     # Relationships
-    users = db.relationship("User", secondary=user_goals, back_populates="goals")
-    exercises = db.relationship("Exercise", backref="goal", cascade="all, delete-orphan")
+    users = db.relationship("User", secondary=user_goals, back_populates="goals", passive_deletes=True)
+    exercises = db.relationship("Exercise", backref="goal", cascade="all, delete-orphan", passive_deletes=True)
 
-    serialize_rules = ("-users.goals", "-exercises.goal")
+    serialize_rules = ("-users.goals", "-exercises.goal", "-version")
 
 
 class Workout(db.Model, SerializerMixin):
@@ -51,13 +101,19 @@ class Workout(db.Model, SerializerMixin):
 
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
-    date = db.Column(db.String(50), nullable=False)
+    date = db.Column(db.Date, nullable=False)
     notes = db.Column(db.Text, default="")
+    version = _change_version()
 
-    user_id = db.Column(db.Integer, db.ForeignKey("users.id"))
-    exercises = db.relationship("ExerciseLog", backref="workout", cascade="all, delete-orphan")
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"))
+    exercises = db.relationship("ExerciseLog", backref="workout", cascade="all, delete-orphan", passive_deletes=True)
 
-    serialize_rules = ("-user.workouts", "-exercises.workout")
+    # Serves user_id lookups as well as per-user date ranges and ordering
+    __table_args__ = (
+        db.Index("ix_workouts_user_id_date", "user_id", "date"),
+    )
+
+    serialize_rules = ("-user.workouts", "-exercises.workout", "-version")
 
 
 class Exercise(db.Model, SerializerMixin):
@@ -65,10 +121,11 @@ class Exercise(db.Model, SerializerMixin):
 
     id = db.Column(db.Integer, primary_key=True)
     exercise_name = db.Column(db.String(50), nullable=False)
+    version = _change_version()
 
-    goal_id = db.Column(db.Integer, db.ForeignKey("goals.id"))
+    goal_id = db.Column(db.Integer, db.ForeignKey("goals.id", ondelete="CASCADE"), index=True)
 
-    serialize_rules = ("-goal.exercises", "-exercise_logs.exercise")
+    serialize_rules = ("-goal.exercises", "-exercise_logs.exercise", "-version")
 
 
 class ExerciseLog(db.Model, SerializerMixin):
@@ -78,8 +135,156 @@ class ExerciseLog(db.Model, SerializerMixin):
     sets = db.Column(db.Integer, nullable=False)
     reps = db.Column(db.Integer, nullable=False)
     weight = db.Column(db.Float)
+    version = _change_version()
+
+    workout_id = db.Column(db.Integer, db.ForeignKey("workouts.id", ondelete="CASCADE"))
+    # Logs outlive a deleted exercise, as they always have
+    exercise_id = db.Column(db.Integer, db.ForeignKey("exercises.id", ondelete="SET NULL"), index=True)
+
+    # Leading workout_id also serves Workout.exercises and cascades
+    __table_args__ = (
+        db.Index("ix_exercise_logs_workout_id_exercise_id", "workout_id", "exercise_id"),
+    )
+
+    serialize_rules = ("-workout.exercises", "-exercise.logs", "-version")
+
+
+class DailyVolume(db.Model):
+    """Per user/day/exercise training totals, maintained by rollups.py."""
+    __tablename__ = "daily_volumes"
+
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    date = db.Column(db.Date, primary_key=True)
+    exercise_id = db.Column(db.Integer, db.ForeignKey("exercises.id", ondelete="CASCADE"), primary_key=True, index=True)
+    sets = db.Column(db.Integer, nullable=False, default=0)
+    reps = db.Column(db.Integer, nullable=False, default=0)
+    volume = db.Column(db.Float, nullable=False, default=0)
+
+
+class PersonalRecord(db.Model):
+    """
+    Per user/exercise bests, maintained by records.py. *_log_id and
+    max_volume_workout_id point at the rows holding each record; stale rows
+    are recomputed from exercise_logs on the next read.
+    """
+    __tablename__ = "personal_records"
+
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    exercise_id = db.Column(db.Integer, db.ForeignKey("exercises.id", ondelete="CASCADE"), primary_key=True, index=True)
+    max_weight = db.Column(db.Float, nullable=False, default=0)
+    max_weight_reps = db.Column(db.Integer, nullable=False, default=0)
+    max_weight_log_id = db.Column(db.Integer)
+    best_1rm = db.Column(db.Float, nullable=False, default=0)
+    best_1rm_log_id = db.Column(db.Integer)
+    max_volume = db.Column(db.Float, nullable=False, default=0)
+    max_volume_workout_id = db.Column(db.Integer)
+    stale = db.Column(db.Boolean, nullable=False, default=False)
+
+
+class GoalLeaderboard(db.Model):
+    """
+    Per goal/period/user training volume, maintained by leaderboards.py.
+    period is "all" or an ISO week ("2024-W05").
+    """
+    __tablename__ = "goal_leaderboards"
+
+    goal_id = db.Column(db.Integer, db.ForeignKey("goals.id", ondelete="CASCADE"), primary_key=True)
+    period = db.Column(db.String(8), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True, index=True)
+    score = db.Column(db.Float, nullable=False)
+
+    # A board's top N is the first N entries of this index, read backwards
+    __table_args__ = (
+        db.Index("ix_goal_leaderboards_ranking", "goal_id", "period", "score", "user_id"),
+    )
+
+
+class ExerciseLeaderboard(db.Model):
+    """Per exercise/period/user heaviest logged weight, maintained by leaderboards.py."""
+    __tablename__ = "exercise_leaderboards"
+
+    exercise_id = db.Column(db.Integer, db.ForeignKey("exercises.id", ondelete="CASCADE"), primary_key=True)
+    period = db.Column(db.String(8), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True, index=True)
+    score = db.Column(db.Float, nullable=False)
+
+    __table_args__ = (
+        db.Index("ix_exercise_leaderboards_ranking", "exercise_id", "period", "score", "user_id"),
+    )
+
+
+class Tombstone(db.Model):
+    """
+    A synced row that was deleted, or moved out of user_id's data (user_id
+    is None for shared rows), at `version`. Not a foreign key, so it
+    outlives the user. See sync.py.
+    """
+    __tablename__ = "sync_tombstones"
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)
+    row_id = db.Column(db.Integer, nullable=False)
+    user_id = db.Column(db.Integer)
+    version = _change_version()
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+class TokenBlocklist(db.Model):
+    """
+    Revoked tokens by jti, kept until they'd have expired anyway. A
+    "user:<id>" row revokes every token issued to that user before
+    created_at. See revocation.py.
+    """
+    __tablename__ = "token_blocklist"
+    # Ids are never reused, so other processes can poll for new rows by id
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id = db.Column(db.Integer, primary_key=True)
+    jti = db.Column(db.String(120), nullable=False, unique=True, index=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+
+class Import(db.Model, SerializerMixin):
+    """Progress of a history upload; records counts input lines committed so far."""
+    __tablename__ = "imports"
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    format = db.Column(db.String(10), nullable=False)
+    status = db.Column(db.String(10), nullable=False, default="running")
+    records = db.Column(db.Integer, nullable=False, default=0)
+    workouts = db.Column(db.Integer, nullable=False, default=0)
+    logs = db.Column(db.Integer, nullable=False, default=0)
+    skipped = db.Column(db.Integer, nullable=False, default=0)
+    errors = db.Column(db.JSON, nullable=False, default=list)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class Job(db.Model, SerializerMixin):
+    """
+    Background work run by jobs.py. user_id isn't a foreign key so a job
+    (and its status) outlives the user it deletes.
+    """
+    __tablename__ = "jobs"
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(30), nullable=False)
+    status = db.Column(db.String(10), nullable=False, default="queued")
+    user_id = db.Column(db.Integer, index=True)
+    params = db.Column(db.JSON, nullable=False, default=dict)
+    result = db.Column(db.JSON)
+    error = db.Column(db.Text)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
 
-    workout_id = db.Column(db.Integer, db.ForeignKey("workouts.id"))
-    exercise_id = db.Column(db.Integer, db.ForeignKey("exercises.id"))
+    # Workers poll for the oldest due job in a status
+    __table_args__ = (
+        db.Index("ix_jobs_status_run_after", "status", "run_after"),
+    )
 
-    serialize_rules = ("-workout.exercises", "-exercise.logs")
+    serialize_rules = ("-params", "-run_after")
@@ -0,0 +1,168 @@
+from flask import Response, current_app, jsonify, request, stream_with_context
+from sqlalchemy import tuple_
+
+STREAM_FORMATS = ("json", "ndjson")
+
+
+def _int_arg(name):
+    value = request.args.get(name)
+    if value is None:
+        return None
+    try:
+        value = int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer")
+    if value < 0:
+        raise ValueError(f"{name} must not be negative")
+    return value
+
+
+def fields_arg(fieldset):
+    """Names requested with ?fields=, or None to return whole objects."""
+    value = request.args.get("fields")
+    if value is None:
+        return None
+    return fieldset.parse(value)
+
+
+class _Keyset:
+    """Ordering on (sort column, id) or just id, and filtering past a bound."""
+
+    def __init__(self, model, sort, descending):
+        self.columns = (sort[0], model.id) if sort else (model.id,)
+        self.descending = descending
+        self.projected = False
+
+    def project(self, query, columns):
+        """Selects just `columns`, with the keyset columns trailing for bound()."""
+        self.projected = True
+        return query.with_entities(*columns, *self.columns)
+
+    def order(self, query):
+        if self.descending:
+            return query.order_by(*(column.desc() for column in self.columns))
+        return query.order_by(*self.columns)
+
+    def after(self, query, bound):
+        if len(self.columns) == 1:
+            key, bound = self.columns[0], bound[0]
+        else:
+            key, bound = tuple_(*self.columns), tuple_(*bound)
+        return query.filter(key < bound if self.descending else key > bound)
+
+    def bound(self, row):
+        if self.projected:
+            return tuple(row[-len(self.columns):])
+        return tuple(getattr(row, column.key) for column in self.columns)
+
+    def cursor(self, row):
+        return ",".join(str(value) for value in self.bound(row)) if len(self.columns) > 1 else self.bound(row)[0]
+
+
+def _rows(query, keyset, limit, eager):
+    batch = current_app.config["STREAM_YIELD_PER"]
+    if not eager:
+        yield from (query.limit(limit) if limit else query).yield_per(batch)
+        return
+
+    # Eager loaders can't ride a yield_per cursor; walk keyset chunks instead
+    bound, remaining = None, limit
+    while remaining is None or remaining > 0:
+        size = batch if remaining is None else min(batch, remaining)
+        chunk = (query if bound is None else keyset.after(query, bound)).limit(size).all()
+        yield from chunk
+        if len(chunk) < size:
+            return
+        bound = keyset.bound(chunk[-1])
+        if remaining is not None:
+            remaining -= size
+
+
+def _stream(rows, serialize, fmt):
+    def generate_ndjson():
+        for row in rows:
+            yield current_app.json.dumps(serialize(row)) + "\n"
+
+    def generate_array():
+        yield "["
+        first = True
+        for row in rows:
+            if not first:
+                yield ","
+            first = False
+            yield current_app.json.dumps(serialize(row))
+        yield "]\n"
+
+    if fmt == "ndjson":
+        return Response(stream_with_context(generate_ndjson()), mimetype="application/x-ndjson")
+    return Response(stream_with_context(generate_array()), mimetype="application/json")
+
+
+def _sorted_cursor(parse):
+    value = request.args.get("after")
+    if value is None:
+        return None
+    key, _, id = value.rpartition(",")
+    try:
+        return parse(key), int(id)
+    except ValueError:
+        raise ValueError("after must be a cursor returned as next_cursor")
+
+
+def list_response(query, model, serialize, sort=None, descending=False, options=(), fields=None):
+    """
+    Keyset-paginated listing ordered by primary key, or by `sort` then id.
+
+    ?limit=N[&after=<cursor>]  -> { items, next_cursor } page of at most N rows
+    ?stream=json|ndjson        -> rows streamed from a server-side cursor
+    no arguments               -> full JSON array, streamed
+    ?fields=a,b                -> only those columns, selected as plain rows
+
+    `sort` is a (column, parse) pair; its cursors look like "<value>,<id>"
+    and `parse` turns the value part back into a column value. `options`
+    are eager loader options for whole objects; with them, streams are read
+    in keyset chunks rather than through yield_per. `fields` is the
+    serializers.Fieldset that ?fields= may choose from.
+    """
+    try:
+        if sort:
+            after = _sorted_cursor(sort[1])
+        else:
+            after = _int_arg("after")
+            after = (after,) if after is not None else None
+        limit = _int_arg("limit")
+        names = fields_arg(fields) if fields is not None else None
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    fmt = request.args.get("stream")
+    if fmt is not None and fmt not in STREAM_FORMATS:
+        return jsonify({"error": f"stream must be one of {', '.join(STREAM_FORMATS)}"}), 400
+
+    keyset = _Keyset(model, sort, descending)
+    if names:
+        query = keyset.project(query, fields.columns(names))
+        serialize = fields.dumper(names)
+        eager = False
+    else:
+        query = query.options(*options)
+        eager = bool(options)
+    query = keyset.order(query)
+    if after is not None:
+        query = keyset.after(query, after)
+
+    if limit is None:
+        return _stream(_rows(query, keyset, None, eager), serialize, fmt or "json"), 200
+
+    limit = max(1, min(limit, current_app.config["PAGINATION_MAX_LIMIT"]))
+    if fmt is not None:
+        return _stream(_rows(query, keyset, limit, eager), serialize, fmt), 200
+
+    rows = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = keyset.cursor(rows[limit - 1])
+    return jsonify({
+        "items": [serialize(row) for row in rows[:limit]],
+        "next_cursor": next_cursor,
+    }), 200
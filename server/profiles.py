@@ -0,0 +1,146 @@
+import threading
+import time
+from collections import OrderedDict
+from flask import Response, current_app
+from sqlalchemy import event, inspect
+
+
+class ProfileCache:
+    """
+    In-process LRU of serialized user profiles (GET /users/me), keyed by
+    user id.
+
+    Commits that touch a cached user, their workouts or logs drop just that
+    user's entry; goal and exercise changes (nested in every profile) and
+    Core updates/deletes whose rows can't be told apart drop them all.
+    Entries also expire after IDENTITY_CACHE_TTL seconds so changes made by
+    other processes are picked up.
+    """
+
+    def __init__(self):
+        self.ttl = 10
+        self.size = 1024
+        self._entries = OrderedDict()  # user id -> (stored at, body, workout ids)
+        self._owners = {}  # workout id -> user id, for cached users only
+        self._changes = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app, session):
+        self.ttl = app.config["IDENTITY_CACHE_TTL"]
+        self.size = app.config["IDENTITY_CACHE_SIZE"]
+        self.clear()
+        if not event.contains(session, "after_flush", self._after_flush):
+            event.listen(session, "after_flush", self._after_flush)
+            event.listen(session, "do_orm_execute", self._after_execute)
+            event.listen(session, "after_commit", self._after_commit)
+            event.listen(session, "after_rollback", self._after_rollback)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._owners.clear()
+            self._changes += 1
+
+    def invalidate(self, *user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                entry = self._entries.pop(user_id, None)
+                if entry:
+                    for workout_id in entry[2]:
+                        self._owners.pop(workout_id, None)
+            self._changes += 1
+
+    def _changed(self, session):
+        return session.info.setdefault("profiles_changed", set())
+
+    def _workout_owner(self, workout_id):
+        return self._owners.get(workout_id)
+
+    @staticmethod
+    def _columns_changed(session, obj):
+        """False for rows only "dirty" through a collection, e.g. goal.users on sign-up."""
+        if obj in session.new or obj in session.deleted:
+            return True
+        state = inspect(obj)
+        return any(state.attrs[prop.key].history.has_changes() for prop in state.mapper.column_attrs)
+
+    def _after_flush(self, session, flush_context):
+        from models import User, Goal, Exercise, Workout, ExerciseLog
+
+        changed = self._changed(session)
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+            if isinstance(obj, (Goal, Exercise)):
+                if self._columns_changed(session, obj):
+                    changed.add(None)
+            elif isinstance(obj, User):
+                changed.add(obj.id)
+            elif isinstance(obj, (Workout, ExerciseLog)):
+                # Current and pre-flush values, for rows moved between users/workouts
+                attr = "user_id" if isinstance(obj, Workout) else "workout_id"
+                values = {getattr(obj, attr), *inspect(obj).attrs[attr].history.sum()}
+                if isinstance(obj, ExerciseLog):
+                    values = {self._workout_owner(value) for value in values}
+                changed.update(value for value in values if value is not None)
+
+    def _after_execute(self, state):
+        from models import User, Goal, Exercise, Workout, ExerciseLog
+
+        if not (state.is_insert or state.is_update or state.is_delete) or state.bind_mapper is None:
+            return
+        cls = state.bind_mapper.class_
+        if not issubclass(cls, (User, Goal, Exercise, Workout, ExerciseLog)):
+            return
+        changed = self._changed(state.session)
+        rows = state.parameters if isinstance(state.parameters, list) else [state.parameters or {}]
+        # Bulk inserts (bulk.py) name their owner in every row
+        if state.is_insert and cls is Workout:
+            owners = {row.get("user_id") for row in rows}
+        elif state.is_insert and cls is ExerciseLog:
+            owners = {self._workout_owner(row.get("workout_id")) for row in rows}
+        elif state.is_insert and cls is User:
+            owners = set()
+        else:
+            changed.add(None)
+            return
+        changed.update(owner for owner in owners if owner is not None)
+
+    def _after_commit(self, session):
+        changed = session.info.pop("profiles_changed", None)
+        if not changed:
+            return
+        if None in changed:
+            self.clear()
+        else:
+            self.invalidate(*changed)
+
+    def _after_rollback(self, session):
+        session.info.pop("profiles_changed", None)
+
+    def response(self, user_id, build):
+        """Serve `user_id`'s profile from cache, calling build() for the payload on a miss."""
+        now = time.monotonic()
+        entry = self._entries.get(user_id)
+        if entry is not None and now - entry[0] <= self.ttl:
+            with self._lock:
+                if user_id in self._entries:
+                    self._entries.move_to_end(user_id)
+            body = entry[1]
+        else:
+            changes = self._changes
+            payload = build()
+            body = current_app.json.dumps(payload).encode()
+            workout_ids = [workout["id"] for workout in payload.get("workouts", ())]
+            with self._lock:
+                # Skip storing if a commit landed while building; it may not be in `payload`
+                if changes == self._changes:
+                    self._entries[user_id] = (now, body, workout_ids)
+                    self._entries.move_to_end(user_id)
+                    self._owners.update(dict.fromkeys(workout_ids, user_id))
+                    while len(self._entries) > self.size:
+                        _, (_, _, evicted) = self._entries.popitem(last=False)
+                        for workout_id in evicted:
+                            self._owners.pop(workout_id, None)
+        return Response(body, mimetype="application/json")
+
+
+profiles = ProfileCache()
@@ -0,0 +1,100 @@
+from datetime import date
+from sqlalchemy import case, func, select
+
+from app import db
+from models import Workout, ExerciseLog, DailyVolume
+
+METRICS = ("weight", "1rm", "volume")
+
+# Epley, as records.estimated_1rm; a single rep is taken as is
+_ESTIMATED_1RM = case(
+    (ExerciseLog.reps == 1, ExerciseLog.weight),
+    else_=ExerciseLog.weight * (1 + ExerciseLog.reps / 30.0),
+)
+
+
+def _query(user_id, exercise_id, metric, start, end):
+    """(date, value) per training day, oldest first."""
+    if metric == "volume":
+        # Already one row per day in the rollup
+        query = select(DailyVolume.date, DailyVolume.volume).where(
+            DailyVolume.user_id == user_id, DailyVolume.exercise_id == exercise_id, DailyVolume.volume > 0,
+        )
+        day = DailyVolume.date
+    else:
+        value = func.max(ExerciseLog.weight if metric == "weight" else _ESTIMATED_1RM)
+        query = (
+            select(Workout.date, value)
+            .join(ExerciseLog, ExerciseLog.workout_id == Workout.id)
+            .where(Workout.user_id == user_id, ExerciseLog.exercise_id == exercise_id)
+            .where(ExerciseLog.weight > 0, ExerciseLog.reps > 0)
+            .group_by(Workout.date)
+        )
+        day = Workout.date
+    if start:
+        query = query.where(day >= start)
+    if end:
+        query = query.where(day <= end)
+    return query.order_by(day)
+
+
+def _edges(size, points):
+    """
+    Bucket boundaries for LTTB: the first and last points are kept as is and
+    the rest split into points - 2 buckets; bucket i is [edges[i], edges[i + 1]).
+    """
+    every = (size - 2) / (points - 2)
+    edges = [int(i * every) + 1 for i in range(points - 1)]
+    edges[-1] = size - 1
+    return edges
+
+
+def _lttb(xs, ys, points):
+    size = len(xs)
+    edges = _edges(size, points)
+    keep = [0]
+    a = 0
+    for i in range(points - 2):
+        low, high = edges[i], edges[i + 1]
+        # Average of the next bucket (the last point after the last bucket)
+        next_low, next_high = (edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else (size - 1, size)
+        count = next_high - next_low
+        cx = sum(xs[next_low:next_high]) / count
+        cy = sum(ys[next_low:next_high]) / count
+        ax, ay = xs[a], ys[a]
+        best, best_area = low, -1.0
+        for j in range(low, high):
+            area = abs((ax - cx) * (ys[j] - ay) - (ax - xs[j]) * (cy - ay))
+            if area > best_area:
+                best, best_area = j, area
+        keep.append(best)
+        a = best
+    keep.append(size - 1)
+    return keep
+
+
+def lttb(xs, ys, points):
+    """
+    Indices of at most `points` of the (xs, ys) series (xs ascending) that
+    keep its shape: Largest-Triangle-Three-Buckets (Steinarsson, 2013).
+    The first and last points are always kept.
+    """
+    size = len(xs)
+    if size <= points:
+        return list(range(size))
+    if points < 3:
+        return [0, size - 1][:points]
+    return _lttb(xs, ys, points)
+
+
+def series(user_id, exercise_id, metric, points, start=None, end=None):
+    """
+    The user's best `metric` for the exercise per training day, reduced to
+    at most `points` points. Returns (points, number of days before
+    reducing).
+    """
+    rows = db.session.execute(_query(user_id, exercise_id, metric, start, end)).all()
+    days = [date.fromisoformat(day) if isinstance(day, str) else day for day, _ in rows]
+    values = [float(value) for _, value in rows]
+    keep = lttb([day.toordinal() for day in days], values, points)
+    return [{"date": days[i].isoformat(), "value": round(values[i], 2)} for i in keep], len(rows)
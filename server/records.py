@@ -0,0 +1,260 @@
+from sqlalchemy import case, delete, func, insert, literal, select, update
+
+from app import db
+from database import upsert
+from models import Workout, ExerciseLog, PersonalRecord
+
+_SESSION_VOLUME = func.sum(ExerciseLog.sets * ExerciseLog.reps * func.coalesce(ExerciseLog.weight, 0))
+
+
+def estimated_1rm(weight, reps):
+    """Epley estimate; a single rep is taken as is."""
+    if not weight or not reps or weight <= 0 or reps <= 0:
+        return 0.0
+    return float(weight) if reps == 1 else weight * (1 + reps / 30)
+
+
+def _offer_log(record, log_id, reps, weight):
+    weight, reps = weight or 0, reps or 0
+    if weight > record.max_weight or (weight == record.max_weight and reps > record.max_weight_reps):
+        record.max_weight, record.max_weight_reps, record.max_weight_log_id = weight, reps, log_id
+    one_rm = estimated_1rm(weight, reps)
+    if one_rm > record.best_1rm:
+        record.best_1rm, record.best_1rm_log_id = one_rm, log_id
+
+
+def _offer_session(record, workout_id, volume):
+    if (volume or 0) > record.max_volume:
+        record.max_volume, record.max_volume_workout_id = volume, workout_id
+
+
+def _sessions(workout_ids, owners=None):
+    """
+    (user_id, workout_id, exercise_id, volume) for every exercise in the
+    workouts. Given {workout_id: user_id} `owners`, workouts aren't joined.
+    """
+    if owners is None:
+        return db.session.execute(
+            select(Workout.user_id, ExerciseLog.workout_id, ExerciseLog.exercise_id, _SESSION_VOLUME)
+            .join(Workout, Workout.id == ExerciseLog.workout_id)
+            .where(ExerciseLog.workout_id.in_(workout_ids))
+            .group_by(ExerciseLog.workout_id, ExerciseLog.exercise_id)
+        ).all()
+    return [
+        (owners.get(workout_id), workout_id, exercise_id, volume)
+        for workout_id, exercise_id, volume in db.session.execute(
+            select(ExerciseLog.workout_id, ExerciseLog.exercise_id, _SESSION_VOLUME)
+            .where(ExerciseLog.workout_id.in_(workout_ids))
+            .group_by(ExerciseLog.workout_id, ExerciseLog.exercise_id)
+        )
+    ]
+
+
+def _better(new):
+    """Conditions under which the proposed row's records beat the stored ones, by column."""
+    weight = (new.max_weight > PersonalRecord.max_weight) | (
+        (new.max_weight == PersonalRecord.max_weight) & (new.max_weight_reps > PersonalRecord.max_weight_reps)
+    )
+    return {
+        "max_weight": weight, "max_weight_reps": weight, "max_weight_log_id": weight,
+        "best_1rm": new.best_1rm > PersonalRecord.best_1rm,
+        "best_1rm_log_id": new.best_1rm > PersonalRecord.best_1rm,
+        "max_volume": new.max_volume > PersonalRecord.max_volume,
+        "max_volume_workout_id": new.max_volume > PersonalRecord.max_volume,
+    }
+
+
+def _column_update(name):
+    def value(new):
+        return case((_better(new)[name], getattr(new, name)), else_=getattr(PersonalRecord, name))
+    return value
+
+
+# Every record column takes the proposed value where it's better; stale is
+# left alone, since a stale record is recomputed from scratch on its next read
+_UPSERT_VALUES = {name: _column_update(name) for name in (
+    "max_weight", "max_weight_reps", "max_weight_log_id", "best_1rm", "best_1rm_log_id",
+    "max_volume", "max_volume_workout_id",
+)}
+
+
+class _Best:
+    """A batch's bests for one (user, exercise), offered like a PersonalRecord."""
+    __slots__ = ("user_id", "exercise_id", "stale", *_UPSERT_VALUES)
+
+    def __init__(self, user_id, exercise_id):
+        self.user_id, self.exercise_id, self.stale = user_id, exercise_id, False
+        self.max_weight = self.max_weight_reps = self.best_1rm = self.max_volume = 0
+        self.max_weight_log_id = self.best_1rm_log_id = self.max_volume_workout_id = None
+
+
+def _add(logs, owners=None):
+    """
+    logs: (log_id, workout_id, exercise_id, reps, weight) of rows already
+    written; owners: {workout_id: user_id}, looked up when not given. The
+    batch's bests per (user, exercise) are worked out here and merged into
+    the stored records with one upsert.
+    """
+    logs = [log for log in logs if log[1] is not None and log[2] is not None]
+    if not logs:
+        return
+    sessions = _sessions({log[1] for log in logs}, owners)
+    if owners is None:
+        owners = {workout_id: user_id for user_id, workout_id, _, _ in sessions}
+    touched = {(log[1], log[2]) for log in logs}
+    bests = {}
+
+    def best_for(key):
+        if key not in bests:
+            bests[key] = _Best(*key)
+        return bests[key]
+
+    for log_id, workout_id, exercise_id, reps, weight in logs:
+        user_id = owners.get(workout_id)
+        if user_id is not None:
+            _offer_log(best_for((user_id, exercise_id)), log_id, reps, weight)
+    for user_id, workout_id, exercise_id, volume in sessions:
+        if user_id is not None and (workout_id, exercise_id) in touched:
+            _offer_session(best_for((user_id, exercise_id)), workout_id, volume)
+    if not bests:
+        return
+    db.session.execute(
+        upsert(db.session, PersonalRecord, ["user_id", "exercise_id"], **_UPSERT_VALUES),
+        [{name: getattr(best, name) for name in _Best.__slots__} for best in bests.values()],
+    )
+
+
+def add_log(log):
+    """Call after adding or changing a log (and after remove_log for a change)."""
+    db.session.flush()
+    _add([(log.id, log.workout_id, log.exercise_id, log.reps, log.weight)])
+
+
+def add_logs(rows, ids, workouts=None):
+    """
+    Freshly inserted log dicts (workout_id, exercise_id, sets, reps, weight)
+    and their ids. `workouts` is their rollups.workouts_by_id(), if the
+    caller has it.
+    """
+    owners = {id: user_id for id, (user_id, _) in workouts.items()} if workouts is not None else None
+    _add([(id, row["workout_id"], row["exercise_id"], row["reps"], row.get("weight")) for row, id in zip(rows, ids)], owners)
+
+
+def remove_log(log):
+    """
+    Call before deleting or changing a log. Records it held (or whose
+    session it was part of) are marked stale rather than recomputed here.
+    """
+    workout = db.session.get(Workout, log.workout_id) if log.workout_id else None
+    if workout is None or workout.user_id is None or log.exercise_id is None:
+        return
+    db.session.execute(
+        update(PersonalRecord)
+        .where(PersonalRecord.user_id == workout.user_id, PersonalRecord.exercise_id == log.exercise_id)
+        .where(
+            (PersonalRecord.max_weight_log_id == log.id)
+            | (PersonalRecord.best_1rm_log_id == log.id)
+            | (PersonalRecord.max_volume_workout_id == log.workout_id)
+        )
+        .values(stale=True)
+    )
+
+
+def remove_workout(workout):
+    """Call before deleting a workout or moving it to another user."""
+    if workout.user_id is None:
+        return
+    db.session.execute(
+        update(PersonalRecord)
+        .where(PersonalRecord.user_id == workout.user_id)
+        .where(PersonalRecord.exercise_id.in_(
+            select(ExerciseLog.exercise_id).where(ExerciseLog.workout_id == workout.id)
+        ))
+        .values(stale=True)
+    )
+
+
+def add_workout(workout):
+    _add(db.session.execute(
+        select(ExerciseLog.id, ExerciseLog.workout_id, ExerciseLog.exercise_id, ExerciseLog.reps, ExerciseLog.weight)
+        .where(ExerciseLog.workout_id == workout.id)
+    ).all())
+
+
+def _repair(user_id, records):
+    """Recomputes stale records from the user's logs. Deletes and returns those left with no logs."""
+    exercise_ids = [record.exercise_id for record in records]
+    for record in records:
+        record.max_weight = record.max_weight_reps = record.best_1rm = record.max_volume = 0
+        record.max_weight_log_id = record.best_1rm_log_id = record.max_volume_workout_id = None
+        record.stale = False
+    by_exercise = {record.exercise_id: record for record in records}
+
+    logs = db.session.execute(
+        select(ExerciseLog.id, ExerciseLog.exercise_id, ExerciseLog.reps, ExerciseLog.weight)
+        .join(Workout, Workout.id == ExerciseLog.workout_id)
+        .where(Workout.user_id == user_id, ExerciseLog.exercise_id.in_(exercise_ids))
+    )
+    seen = set()
+    for log_id, exercise_id, reps, weight in logs:
+        seen.add(exercise_id)
+        _offer_log(by_exercise[exercise_id], log_id, reps, weight)
+    sessions = db.session.execute(
+        select(ExerciseLog.workout_id, ExerciseLog.exercise_id, _SESSION_VOLUME)
+        .join(Workout, Workout.id == ExerciseLog.workout_id)
+        .where(Workout.user_id == user_id, ExerciseLog.exercise_id.in_(exercise_ids))
+        .group_by(ExerciseLog.workout_id, ExerciseLog.exercise_id)
+    )
+    for workout_id, exercise_id, volume in sessions:
+        _offer_session(by_exercise[exercise_id], workout_id, volume)
+
+    emptied = [record for record in records if record.exercise_id not in seen]
+    for record in emptied:
+        db.session.delete(record)
+    return emptied
+
+
+def user_records(user_id):
+    """
+    The user's records by exercise. Normally a single primary-key range
+    read; stale rows are repaired (ORM changes only, so they're flushed to
+    the primary) and the caller should commit.
+    """
+    records = db.session.execute(
+        select(PersonalRecord).where(PersonalRecord.user_id == user_id).order_by(PersonalRecord.exercise_id)
+    ).scalars().all()
+    stale = [record for record in records if record.stale]
+    if stale:
+        emptied = _repair(user_id, stale)
+        records = [record for record in records if record not in emptied]
+    return [
+        {
+            "exercise_id": record.exercise_id,
+            "max_weight": record.max_weight,
+            "max_weight_reps": record.max_weight_reps,
+            "best_1rm": round(record.best_1rm, 2),
+            "max_volume": record.max_volume,
+        }
+        for record in records
+    ]
+
+
+def rebuild(user_id=None):
+    """
+    Marks records stale for every (user, exercise) with logs, for one user
+    or everyone; each is recomputed the next time its user's records are read.
+    """
+    pairs = (
+        select(Workout.user_id, ExerciseLog.exercise_id)
+        .join(ExerciseLog, ExerciseLog.workout_id == Workout.id)
+        .where(Workout.user_id.is_not(None), ExerciseLog.exercise_id.is_not(None))
+        .distinct()
+    )
+    clear = delete(PersonalRecord)
+    if user_id is not None:
+        pairs = pairs.where(Workout.user_id == user_id)
+        clear = clear.where(PersonalRecord.user_id == user_id)
+    db.session.execute(clear)
+    columns = ["user_id", "exercise_id", "max_weight", "max_weight_reps", "best_1rm", "max_volume", "stale"]
+    pairs = pairs.add_columns(literal(0), literal(0), literal(0), literal(0), literal(True))
+    return db.session.execute(insert(PersonalRecord).from_select(columns, pairs)).rowcount
@@ -0,0 +1,185 @@
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import delete, event, select
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings; no false negatives, `error_rate` false positives at capacity."""
+
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(1, capacity)
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+def _utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _epoch(value):
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+def user_key(user_id):
+    return f"user:{user_id}"
+
+
+class TokenRevocations:
+    """
+    Revoked JWTs, checked on every @jwt_required() request without touching
+    the database in the common case.
+
+    A Bloom filter holds every unexpired revoked jti (and "user:<id>" keys
+    for users signed out everywhere), so most tokens are cleared in memory.
+    Filter hits are confirmed against token_blocklist and remembered until
+    the token expires. New rows from other processes are picked up by an
+    id-range query at most every TOKEN_BLOCKLIST_REFRESH_SECONDS, and the
+    filter is rebuilt from unexpired rows once per token lifetime so
+    expired entries drop out.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.refresh_seconds = 5
+        self.capacity = 100000
+        self.cache_size = 10000
+        self.lifetime = 86400
+        self._reset()
+
+    def _reset(self):
+        self._bloom = BloomFilter(self.capacity)
+        self._known = OrderedDict()  # key -> (revoked_before epoch or True/False, expires epoch)
+        self._last_id = 0
+        self._next_refresh = 0.0
+        self._next_rebuild = 0.0
+
+    def init_app(self, app, jwt, session):
+        self.session = session
+        self.refresh_seconds = app.config["TOKEN_BLOCKLIST_REFRESH_SECONDS"]
+        self.capacity = app.config["TOKEN_BLOCKLIST_CAPACITY"]
+        self.cache_size = app.config["TOKEN_BLOCKLIST_CACHE_SIZE"]
+        lifetime = app.config["JWT_ACCESS_TOKEN_EXPIRES"]
+        if isinstance(lifetime, timedelta):
+            lifetime = lifetime.total_seconds()
+        # No expiry configured: still rebuild the filter daily
+        self.lifetime = lifetime or 86400
+        self._reset()
+        jwt.token_in_blocklist_loader(self.is_revoked)
+        if not event.contains(session, "after_commit", self._after_commit):
+            event.listen(session, "after_commit", self._after_commit)
+            event.listen(session, "after_rollback", self._after_rollback)
+
+    def _remember(self, key, value, expires):
+        self._known[key] = (value, expires)
+        self._known.move_to_end(key)
+        while len(self._known) > self.cache_size:
+            self._known.popitem(last=False)
+
+    def _refresh(self):
+        from models import TokenBlocklist
+
+        now = time.time()
+        if now < self._next_refresh:
+            return
+        with self._lock:
+            if now < self._next_refresh:
+                return
+            query = select(TokenBlocklist.id, TokenBlocklist.jti, TokenBlocklist.created_at, TokenBlocklist.expires_at)
+            if now >= self._next_rebuild:
+                bloom, last_id = BloomFilter(self.capacity), 0
+                query = query.where(TokenBlocklist.expires_at > _utcnow())
+                self._known = OrderedDict((k, v) for k, v in self._known.items() if v[1] > now)
+                self._next_rebuild = now + self.lifetime
+            else:
+                bloom, last_id = self._bloom, self._last_id
+                query = query.where(TokenBlocklist.id > last_id)
+            for id, jti, created_at, expires_at in self.session.execute(query):
+                bloom.add(jti)
+                last_id = max(last_id, id)
+                # Rows we haven't seen change the answer for keys cached as clean
+                value = int(_epoch(created_at)) if jti.startswith("user:") else True
+                self._remember(jti, value, _epoch(expires_at))
+            self._bloom, self._last_id = bloom, last_id
+            self._next_refresh = now + self.refresh_seconds
+
+    def _lookup(self, key):
+        """Cached value for `key`, or None if the database has no row for it."""
+        from models import TokenBlocklist
+
+        entry = self._known.get(key)
+        if entry is not None and entry[1] > time.time():
+            return entry[0]
+        if key not in self._bloom:
+            return None
+        row = self.session.execute(
+            select(TokenBlocklist.created_at, TokenBlocklist.expires_at).where(TokenBlocklist.jti == key)
+        ).first()
+        if row is None:
+            # Bloom false positive; remember until the filter is rebuilt
+            self._remember(key, False, time.time() + self.lifetime)
+            return None
+        value = int(_epoch(row.created_at)) if key.startswith("user:") else True
+        self._remember(key, value, _epoch(row.expires_at))
+        return value
+
+    def is_revoked(self, jwt_header, jwt_payload):
+        self._refresh()
+        if self._lookup(jwt_payload["jti"]) is True:
+            return True
+        revoked_before = self._lookup(user_key(jwt_payload["sub"]))
+        # iat is whole seconds, so tokens from the sign-out's own second are revoked too
+        return bool(revoked_before) and jwt_payload.get("iat", 0) <= revoked_before
+
+    def _store(self, key, expires_at):
+        from models import TokenBlocklist
+
+        now = _utcnow()
+        # Replaced rather than updated, so the new id reaches other processes' refresh
+        self.session.execute(
+            delete(TokenBlocklist).where((TokenBlocklist.expires_at <= now) | (TokenBlocklist.jti == key))
+        )
+        self.session.add(TokenBlocklist(jti=key, created_at=now, expires_at=expires_at))
+        # Cached once the row is committed; a rolled back revocation never happened
+        value = int(_epoch(now)) if key.startswith("user:") else True
+        self.session.info.setdefault("revocations_pending", []).append((key, value, _epoch(expires_at)))
+
+    def _after_commit(self, session):
+        for key, value, expires in session.info.pop("revocations_pending", ()):
+            self._bloom.add(key)
+            self._remember(key, value, expires)
+
+    def _after_rollback(self, session):
+        session.info.pop("revocations_pending", None)
+
+    def revoke(self, jwt_payload):
+        """Revokes one token (logout); the caller commits."""
+        exp = jwt_payload.get("exp")
+        expires_at = (
+            datetime.fromtimestamp(exp, timezone.utc).replace(tzinfo=None) if exp
+            else _utcnow() + timedelta(seconds=self.lifetime)
+        )
+        self._store(jwt_payload["jti"], expires_at)
+
+    def revoke_user(self, user_id):
+        """Revokes every token issued to `user_id` until now (forced sign-out); the caller commits."""
+        self._store(user_key(user_id), _utcnow() + timedelta(seconds=self.lifetime))
+
+
+revocations = TokenRevocations()
@@ -0,0 +1,202 @@
+from collections import defaultdict
+from sqlalchemy import bindparam, delete, func, insert, select
+
+from app import db
+from database import upsert
+from models import Workout, ExerciseLog, DailyVolume, parse_date
+
+# Totals for one log row: (sets, total reps, volume = sets * reps * weight)
+_LOG_TOTALS = (
+    func.sum(ExerciseLog.sets),
+    func.sum(ExerciseLog.sets * ExerciseLog.reps),
+    func.sum(ExerciseLog.sets * ExerciseLog.reps * func.coalesce(ExerciseLog.weight, 0)),
+)
+
+
+# Upsert values adding a proposed row's totals onto the stored ones
+_ADD_TOTALS = {
+    "sets": lambda new: DailyVolume.sets + new.sets,
+    "reps": lambda new: DailyVolume.reps + new.reps,
+    "volume": lambda new: DailyVolume.volume + new.volume,
+}
+
+
+def workout_day(value):
+    """Calendar day of a workout date, or None if it can't be parsed."""
+    try:
+        return parse_date(value)
+    except ValueError:
+        return None
+
+
+def _apply(deltas):
+    """
+    Adds {(user_id, day, exercise_id): [sets, reps, volume]} onto the rollup
+    in one upsert, then drops the rows removals took to zero (or inserted
+    below it, for days without a row, say one the backfill skipped).
+    """
+    rows = [
+        {"user_id": user_id, "date": day, "exercise_id": exercise_id, "sets": sets, "reps": reps, "volume": volume}
+        for (user_id, day, exercise_id), (sets, reps, volume) in deltas.items() if sets or reps or volume
+    ]
+    if not rows:
+        return
+    db.session.execute(upsert(db.session, DailyVolume, ["user_id", "date", "exercise_id"], **_ADD_TOTALS), rows)
+    removed = [
+        {"key_user_id": row["user_id"], "key_date": row["date"], "key_exercise_id": row["exercise_id"]}
+        for row in rows if row["sets"] <= 0
+    ]
+    if removed:
+        table = DailyVolume.__table__
+        db.session.execute(
+            delete(table).where(
+                table.c.user_id == bindparam("key_user_id"),
+                table.c.date == bindparam("key_date"),
+                table.c.exercise_id == bindparam("key_exercise_id"),
+                table.c.sets <= 0,
+            ),
+            removed,
+        )
+
+
+def _log_deltas(rows, sign):
+    """rows: (user_id, workout date, exercise_id, sets, reps, volume)."""
+    deltas = defaultdict(lambda: [0, 0, 0.0])
+    for user_id, when, exercise_id, sets, reps, volume in rows:
+        day = workout_day(when)
+        if user_id is None or day is None or exercise_id is None:
+            continue
+        total = deltas[(user_id, day, exercise_id)]
+        total[0] += sign * (sets or 0)
+        total[1] += sign * (reps or 0)
+        total[2] += sign * (volume or 0)
+    return deltas
+
+
+def _log_row(log):
+    workout = db.session.get(Workout, log.workout_id) if log.workout_id else None
+    if workout is None:
+        return None
+    sets, reps, weight = log.sets or 0, log.reps or 0, log.weight or 0
+    return workout.user_id, workout.date, log.exercise_id, sets, sets * reps, sets * reps * weight
+
+
+def add_log(log):
+    row = _log_row(log)
+    if row:
+        _apply(_log_deltas([row], 1))
+
+
+def remove_log(log):
+    row = _log_row(log)
+    if row:
+        _apply(_log_deltas([row], -1))
+
+
+def _workout_rows(workout_ids):
+    return db.session.execute(
+        select(Workout.user_id, Workout.date, ExerciseLog.exercise_id, *_LOG_TOTALS)
+        .join(ExerciseLog, ExerciseLog.workout_id == Workout.id)
+        .where(Workout.id.in_(workout_ids))
+        .group_by(Workout.id, ExerciseLog.exercise_id)
+    ).all()
+
+
+def add_workouts(workout_ids):
+    """Adds every log of the given workouts, e.g. after a bulk insert."""
+    if workout_ids:
+        _apply(_log_deltas(_workout_rows(workout_ids), 1))
+
+
+def remove_workout(workout):
+    """Call before deleting a workout, or before moving it to another user/date."""
+    _apply(_log_deltas(_workout_rows([workout.id]), -1))
+
+
+def add_workout(workout):
+    add_workouts([workout.id])
+
+
+def workouts_by_id(workout_ids):
+    """{workout_id: (user_id, date)}, for add_logs here and in leaderboards.py and records.py."""
+    return {
+        id: (user_id, when) for id, user_id, when in db.session.execute(
+            select(Workout.id, Workout.user_id, Workout.date).where(Workout.id.in_(set(workout_ids)))
+        )
+    }
+
+
+def add_logs(rows, workouts=None):
+    """
+    Adds freshly inserted log dicts (workout_id, exercise_id, sets, reps,
+    weight). `workouts` is their workouts_by_id(), if the caller has it.
+    """
+    if workouts is None:
+        workouts = workouts_by_id(row["workout_id"] for row in rows)
+    log_rows = []
+    for row in rows:
+        user_id, when = workouts.get(row["workout_id"], (None, None))
+        sets, reps, weight = row["sets"], row["reps"], row.get("weight") or 0
+        log_rows.append((user_id, when, row["exercise_id"], sets, sets * reps, sets * reps * weight))
+    _apply(_log_deltas(log_rows, 1))
+
+
+def rebuild(user_id=None):
+    """Recomputes the rollup from exercise_logs, for one user or everyone."""
+    query = (
+        select(Workout.user_id, Workout.date, ExerciseLog.exercise_id, *_LOG_TOTALS)
+        .join(ExerciseLog, ExerciseLog.workout_id == Workout.id)
+        .group_by(Workout.id, ExerciseLog.exercise_id)
+        .order_by(Workout.user_id)
+    )
+    clear = delete(DailyVolume)
+    if user_id is not None:
+        query = query.where(Workout.user_id == user_id)
+        clear = clear.where(DailyVolume.user_id == user_id)
+    db.session.execute(clear)
+
+    # Aggregate one user at a time so memory stays bounded
+    count = 0
+    pending, current = [], None
+    for row in db.session.execute(query).yield_per(10000):
+        if row[0] != current and pending:
+            count += _insert_totals(_log_deltas(pending, 1))
+            pending = []
+        current = row[0]
+        pending.append(row)
+    if pending:
+        count += _insert_totals(_log_deltas(pending, 1))
+    return count
+
+
+def _insert_totals(deltas):
+    rows = [
+        dict(user_id=u, date=d, exercise_id=e, sets=s, reps=r, volume=v)
+        for (u, d, e), (s, r, v) in deltas.items() if s or r or v
+    ]
+    if rows:
+        db.session.execute(insert(DailyVolume), rows)
+    return len(rows)
+
+
+def stats(user_id, start=None, end=None):
+    """Daily totals from the rollup, with a per-exercise breakdown."""
+    query = select(DailyVolume).where(DailyVolume.user_id == user_id)
+    if start:
+        query = query.where(DailyVolume.date >= start)
+    if end:
+        query = query.where(DailyVolume.date <= end)
+    query = query.order_by(DailyVolume.date, DailyVolume.exercise_id)
+
+    days = []
+    for row in db.session.execute(query).scalars():
+        if not days or days[-1]["date"] != row.date.isoformat():
+            days.append({"date": row.date.isoformat(), "sets": 0, "reps": 0, "volume": 0.0, "exercises": []})
+        day = days[-1]
+        day["sets"] += row.sets
+        day["reps"] += row.reps
+        day["volume"] += row.volume
+        day["exercises"].append({
+            "exercise_id": row.exercise_id, "sets": row.sets, "reps": row.reps, "volume": row.volume,
+        })
+    return days
@@ -0,0 +1,117 @@
+import re
+from sqlalchemy import DDL, column, event, or_, select, table
+
+from app import db
+from models import Exercise, Workout
+from serializers import EXERCISE_FIELDS, WORKOUT_SUMMARY
+
+# Full-text indexes (SQLite FTS5): name -> (content model, indexed columns).
+# They store only the index and read text from the content table; triggers
+# keep them in sync with every write, Core bulk inserts and cascades included.
+# Note that a batch migration recreating a content table drops its triggers.
+INDEXES = {
+    "exercises_fts": (Exercise, ("exercise_name",)),
+    "workouts_fts": (Workout, ("title", "notes")),
+}
+
+_WORD = re.compile(r"\w+")
+
+EXERCISE_COLUMNS = ("id", "name", "goal_id")
+WORKOUT_COLUMNS = ("id", "title", "date", "user_id")
+
+
+def index_ddl(name):
+    """Statements creating an index and its triggers, then filling it from the content table."""
+    model, columns = INDEXES[name]
+    content = model.__tablename__
+    names = ", ".join(columns)
+    new = ", ".join(f"new.{column}" for column in columns)
+    old = ", ".join(f"old.{column}" for column in columns)
+    remove = f"INSERT INTO {name}({name}, rowid, {names}) VALUES ('delete', old.id, {old});"
+    add = f"INSERT INTO {name}(rowid, {names}) VALUES (new.id, {new});"
+    return [
+        # Prefix indexes for 2 and 3 characters keep short autocomplete prefixes cheap
+        f"CREATE VIRTUAL TABLE {name} USING fts5({names}, content='{content}', content_rowid='id', "
+        f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        f"CREATE TRIGGER {name}_insert AFTER INSERT ON {content} BEGIN {add} END",
+        f"CREATE TRIGGER {name}_delete AFTER DELETE ON {content} BEGIN {remove} END",
+        f"CREATE TRIGGER {name}_update AFTER UPDATE OF {names} ON {content} BEGIN {remove} {add} END",
+        f"INSERT INTO {name}({name}) VALUES ('rebuild')",
+    ]
+
+
+def drop_ddl(name):
+    return [f"DROP TABLE IF EXISTS {name}"]  # its triggers are dropped with the content table
+
+
+def is_index_table(name):
+    """True for an index and the shadow tables FTS5 keeps its data in."""
+    return any(name == index or name.startswith(f"{index}_") for index in INDEXES)
+
+
+# db.create_all() and drop_all() build and remove the indexes with their tables
+for _name, (_model, _) in INDEXES.items():
+    for _statement in index_ddl(_name):
+        event.listen(_model.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
+    for _statement in drop_ddl(_name):
+        event.listen(_model.__table__, "before_drop", DDL(_statement).execute_if(dialect="sqlite"))
+
+
+def match_query(text, prefix=True):
+    """
+    An FTS5 query matching every word of `text`, the last one as a prefix
+    (it may still be being typed). None when there are no words. Words are
+    quoted, so FTS5 syntax in user input is matched literally.
+    """
+    words = _WORD.findall(text or "")
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    if prefix:
+        terms[-1] += "*"
+    return " ".join(terms)
+
+
+def _full_text():
+    return db.session.get_bind().dialect.name == "sqlite"
+
+
+def _ranked(name, query, text, limit, fallback):
+    """
+    Rows of `query` matching `text`, best first. Without FTS5 every word
+    must occur (case-insensitively) in one of the `fallback` columns, and
+    rows come back in id order.
+    """
+    if _full_text():
+        index = table(name, column("rowid"), column("rank"), column(name))
+        model = INDEXES[name][0]
+        query = (
+            query.join(index, index.c.rowid == model.id)
+            .where(index.c[name].op("MATCH")(match_query(text)))
+            .order_by(index.c.rank, model.id)
+        )
+    else:
+        for word in _WORD.findall(text):
+            query = query.where(or_(*(attr.ilike(f"%{word}%") for attr in fallback)))
+        query = query.order_by(fallback[0].class_.id)
+    return db.session.execute(query.limit(limit)).all()
+
+
+def exercises(text, limit):
+    """Exercises whose name has words starting with those in `text`, as /exercises rows."""
+    if match_query(text) is None:
+        return []
+    dump = EXERCISE_FIELDS.dumper(EXERCISE_COLUMNS)
+    query = select(*EXERCISE_FIELDS.columns(EXERCISE_COLUMNS))
+    return [dump(row) for row in _ranked("exercises_fts", query, text, limit, [Exercise.exercise_name])]
+
+
+def workouts(text, limit, user_id=None):
+    """Workouts whose title or notes match `text`, optionally one user's, as /workouts rows."""
+    if match_query(text) is None:
+        return []
+    dump = WORKOUT_SUMMARY.fieldset.dumper(WORKOUT_COLUMNS)
+    query = select(*WORKOUT_SUMMARY.fieldset.columns(WORKOUT_COLUMNS))
+    if user_id is not None:
+        query = query.where(Workout.user_id == user_id)
+    return [dump(row) for row in _ranked("workouts_fts", query, text, limit, [Workout.title, Workout.notes])]
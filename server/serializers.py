@@ -0,0 +1,136 @@
+from datetime import date
+from operator import attrgetter
+from sqlalchemy import inspect
+from sqlalchemy.orm import joinedload, selectinload
+
+from models import User, Goal, Workout, Exercise, ExerciseLog
+
+
+class Fieldset:
+    """
+    Columns a collection can be projected to with ?fields=. Maps output
+    names to column attributes (`renamed` for names that differ from the
+    attribute). `columns(names)` labels the chosen columns for a select and
+    `dumper(names)` turns each result row into a dict, dates as ISO strings,
+    without building ORM objects.
+    """
+
+    def __init__(self, model, columns, **renamed):
+        self.model = model
+        self.available = {name: getattr(model, name) for name in columns}
+        self.available.update({name: getattr(model, attr) for name, attr in renamed.items()})
+
+    def parse(self, value):
+        """Requested names from a comma-separated list, in declaration order."""
+        names = {name.strip() for name in value.split(",") if name.strip()}
+        unknown = names - set(self.available)
+        if not names or unknown:
+            raise ValueError(f"fields must be a comma-separated list of: {', '.join(self.available)}")
+        return tuple(name for name in self.available if name in names)
+
+    def columns(self, names):
+        return [self.available[name].label(name) for name in names]
+
+    def dumper(self, names):
+        """Dict for the first len(names) values of a row; trailing values are ignored."""
+        count = len(names)
+        dates = [
+            index for index, name in enumerate(names)
+            if issubclass(self.available[name].type.python_type, date)
+        ]
+
+        def dump(row):
+            values = list(row[:count])
+            for index in dates:
+                if values[index] is not None:
+                    values[index] = values[index].isoformat()
+            return dict(zip(names, values))
+        return dump
+
+    def rows(self, query, names):
+        dump = self.dumper(names)
+        return [dump(row) for row in query.with_entities(*self.columns(names))]
+
+
+class Shape:
+    """
+    Fixed output shape for a model: plain columns plus nested shapes for
+    relationships. Built once at import time; `dump` turns an instance into a
+    dict and `options` are the loader options that fetch the whole tree up
+    front (selectinload for collections, joinedload for many-to-one).
+    """
+
+    def __init__(self, model, columns, **nested):
+        self.model = model
+        self.columns = tuple(columns)
+        self.nested = nested
+
+        if len(self.columns) == 1:
+            only = self.columns[0]
+            get_columns = lambda obj: (getattr(obj, only),)
+        else:
+            get_columns = attrgetter(*self.columns)
+
+        mapper = inspect(model)
+        dates = tuple(
+            name for name in self.columns
+            if issubclass(mapper.columns[name].type.python_type, date)
+        )
+
+        relationships = mapper.relationships
+        children = []
+        for name, shape in nested.items():
+            many = relationships[name].uselist
+            children.append((name, attrgetter(name), shape.dump, many))
+
+        columns = self.columns
+
+        def dump(obj):
+            data = dict(zip(columns, get_columns(obj)))
+            for name in dates:
+                if data[name] is not None:
+                    data[name] = data[name].isoformat()
+            for name, get, child, many in children:
+                value = get(obj)
+                if many:
+                    data[name] = [child(item) for item in value]
+                else:
+                    data[name] = child(value) if value is not None else None
+            return data
+
+        self.dump = dump
+        self.options = tuple(self._loader_options())
+        # Nested shapes can't be projected; ?fields= picks among the plain columns
+        self.fieldset = Fieldset(model, self.columns)
+
+    def _loader_options(self):
+        relationships = inspect(self.model).relationships
+        for name, shape in self.nested.items():
+            attr = getattr(self.model, name)
+            loader = selectinload(attr) if relationships[name].uselist else joinedload(attr)
+            if shape.options:
+                loader = loader.options(*shape.options)
+            yield loader
+
+
+# Leaf shapes, matching the columns SerializerMixin emitted
+EXERCISE = Shape(Exercise, ("id", "exercise_name", "goal_id"))
+EXERCISE_LOG = Shape(ExerciseLog, ("id", "sets", "reps", "weight", "workout_id", "exercise_id"))
+# GET /workouts and GET /exercises rows
+WORKOUT_SUMMARY = Shape(Workout, ("id", "title", "date", "user_id"))
+EXERCISE_FIELDS = Fieldset(Exercise, ("id", "goal_id"), name="exercise_name")
+WORKOUT_WITH_LOGS = Shape(Workout, ("id", "title", "date", "notes", "user_id"), exercises=EXERCISE_LOG)
+GOAL_WITH_EXERCISES = Shape(Goal, ("id", "name"), exercises=EXERCISE)
+
+# Same output as User/Goal/Workout.to_dict() with their serialize_rules
+USER = Shape(User, ("id", "name", "email"), goals=GOAL_WITH_EXERCISES, workouts=WORKOUT_WITH_LOGS)
+GOAL = Shape(
+    Goal, ("id", "name"),
+    exercises=EXERCISE,
+    users=Shape(User, ("id", "name", "email"), workouts=WORKOUT_WITH_LOGS),
+)
+WORKOUT = Shape(
+    Workout, ("id", "title", "date", "notes", "user_id"),
+    exercises=EXERCISE_LOG,
+    user=Shape(User, ("id", "name", "email"), goals=GOAL_WITH_EXERCISES),
+)
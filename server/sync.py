@@ -0,0 +1,191 @@
+from datetime import datetime, timedelta
+from sqlalchemy import delete, event, func, inspect, select, update
+
+
+class SyncExpired(Exception):
+    """?since= is older than the oldest tombstone kept; the client has to sync from scratch."""
+
+    def __init__(self, version):
+        super().__init__("since is older than the retained change history; sync from scratch")
+        self.version = version
+
+
+class ChangeFeed:
+    """
+    Change versions for delta sync (GET /sync?since=).
+
+    Goals, exercises, workouts and exercise logs carry a `version` column
+    that inserts and updates stamp with the current version from
+    sync_state. Before the first write to any of them, a transaction bumps
+    that version, which holds the write lock on the row until it commits,
+    so versions are handed out in commit order and a client that has seen
+    version N has seen every change up to N.
+
+    Deletes (and workouts or logs moving to another user) leave a tombstone
+    with the version they happened at. Database cascades don't, so clients
+    cascade locally the same way: a deleted goal takes its exercises, a
+    deleted workout its logs, and logs of a deleted exercise keep a null
+    exercise_id.
+    """
+
+    def __init__(self):
+        self.session = None
+
+    def init_app(self, app, session):
+        self.session = session
+        if not event.contains(session, "before_flush", self._before_flush):
+            event.listen(session, "before_flush", self._before_flush)
+            event.listen(session, "do_orm_execute", self._before_execute)
+            event.listen(session, "after_commit", self._after_end)
+            event.listen(session, "after_rollback", self._after_end)
+
+    @staticmethod
+    def _synced(cls):
+        from models import Goal, Exercise, Workout, ExerciseLog
+
+        return issubclass(cls, (Goal, Exercise, Workout, ExerciseLog))
+
+    def _bump(self, session):
+        from models import SyncState
+
+        if not session.info.get("sync_bumped"):
+            session.info["sync_bumped"] = True
+            session.execute(update(SyncState).where(SyncState.id == 1).values(version=SyncState.version + 1))
+
+    def _after_end(self, session):
+        session.info.pop("sync_bumped", None)
+
+    def _before_execute(self, state):
+        # Core inserts/updates (bulk.py, importer.py) are stamped by the column defaults
+        if (state.is_insert or state.is_update or state.is_delete) and state.bind_mapper is not None:
+            if self._synced(state.bind_mapper.class_):
+                self._bump(state.session)
+
+    @staticmethod
+    def _previous(obj, attr):
+        """The value `attr` had before this flush (the current one if unchanged)."""
+        history = inspect(obj).attrs[attr].history
+        return history.deleted[0] if history.deleted else getattr(obj, attr)
+
+    def _owner(self, session, workout_id):
+        from models import Workout
+
+        workout = session.get(Workout, workout_id) if workout_id is not None else None
+        return workout.user_id if workout is not None else None
+
+    def _before_flush(self, session, flush_context, instances):
+        from models import Goal, Exercise, Workout, ExerciseLog, Tombstone, current_version
+
+        changed = [obj for obj in list(session.new) + list(session.dirty) + list(session.deleted)
+                   if self._synced(type(obj))]
+        if not changed:
+            return
+        self._bump(session)
+
+        tombstones = []
+        for obj in session.deleted:
+            if isinstance(obj, (Goal, Exercise)):
+                tombstones.append((obj.__tablename__, obj.id, None))
+            elif isinstance(obj, Workout):
+                tombstones.append(("workouts", obj.id, self._previous(obj, "user_id")))
+            elif isinstance(obj, ExerciseLog):
+                tombstones.append(("exercise_logs", obj.id, self._owner(session, self._previous(obj, "workout_id"))))
+        for obj in session.dirty:
+            if isinstance(obj, Workout) and inspect(obj).attrs.user_id.history.deleted:
+                previous = self._previous(obj, "user_id")
+                if previous != obj.user_id:
+                    if previous is not None:
+                        tombstones.append(("workouts", obj.id, previous))
+                    # Its logs are new to the new owner too
+                    session.execute(
+                        update(ExerciseLog).where(ExerciseLog.workout_id == obj.id)
+                        .values(version=current_version())
+                    )
+            elif isinstance(obj, ExerciseLog) and inspect(obj).attrs.workout_id.history.deleted:
+                previous = self._owner(session, self._previous(obj, "workout_id"))
+                if previous is not None and previous != self._owner(session, obj.workout_id):
+                    tombstones.append(("exercise_logs", obj.id, previous))
+        for kind, row_id, user_id in tombstones:
+            session.add(Tombstone(kind=kind, row_id=row_id, user_id=user_id))
+
+    def changes(self, user_id, since=None):
+        """
+        Goals and exercises, plus `user_id`'s workouts and logs, changed
+        after version `since` (everything when None), the ids deleted since
+        then and the version to pass as `since` next time. Each collection is
+        read off its version index, so the cost follows the number of
+        changes rather than the size of the history.
+        """
+        from models import Goal, Exercise, Workout, ExerciseLog, SyncState, Tombstone
+        from serializers import EXERCISE_FIELDS, EXERCISE_LOG, GOAL, WORKOUT
+
+        version, pruned = self.session.execute(
+            select(SyncState.version, SyncState.pruned_version).where(SyncState.id == 1)
+        ).one()
+        if since is not None and since < pruned:
+            raise SyncExpired(version)
+
+        # A delta of logs is found through their version index and filtered by
+        # owner (the + 0 keeps SQLite from walking the owner's whole history
+        # instead); a full sync goes through the owner's workouts
+        owner = Workout.user_id if since is None else Workout.user_id + 0
+        # kind -> (model, query, fieldset, dumped columns)
+        collections = {
+            "goals": (Goal, select().select_from(Goal), GOAL.fieldset, ("id", "name")),
+            "exercises": (Exercise, select().select_from(Exercise), EXERCISE_FIELDS, ("id", "name", "goal_id")),
+            "workouts": (
+                Workout, select().select_from(Workout).where(Workout.user_id == user_id),
+                WORKOUT.fieldset, ("id", "title", "date", "notes", "user_id"),
+            ),
+            "exercise_logs": (
+                ExerciseLog,
+                select().select_from(ExerciseLog).join(Workout, Workout.id == ExerciseLog.workout_id)
+                .where(owner == user_id),
+                EXERCISE_LOG.fieldset, EXERCISE_LOG.columns,
+            ),
+        }
+        result = {"version": version}
+        for kind, (model, query, fieldset, names) in collections.items():
+            if since is None:
+                query = query.order_by(model.id)
+            else:
+                # In change order, which the version index (version, id) already has
+                query = query.where(model.version > since).order_by(model.version, model.id)
+            dump = fieldset.dumper(names)
+            rows = self.session.execute(query.add_columns(*fieldset.columns(names)))
+            result[kind] = [dump(row) for row in rows]
+
+        deleted = {kind: [] for kind in collections}
+        if since is not None:
+            for kind, row_id in self.session.execute(
+                select(Tombstone.kind, Tombstone.row_id)
+                .where(Tombstone.version > since)
+                .where((Tombstone.user_id == user_id) | Tombstone.user_id.is_(None))
+                .order_by(Tombstone.version, Tombstone.id)
+            ):
+                deleted[kind].append(row_id)
+        result["deleted"] = deleted
+        return result
+
+    def prune(self, days):
+        """
+        Deletes tombstones older than `days` days. Clients whose ?since= is
+        older than the newest one removed get 410 and resync from scratch.
+        Returns the number deleted; the caller commits.
+        """
+        from models import SyncState, Tombstone
+
+        cutoff = datetime.utcnow() - timedelta(days=days)
+        newest = self.session.execute(
+            select(func.max(Tombstone.version)).where(Tombstone.created_at < cutoff)
+        ).scalar()
+        if newest is None:
+            return 0
+        self.session.execute(
+            update(SyncState).where(SyncState.id == 1, SyncState.pruned_version < newest)
+            .values(pruned_version=newest)
+        )
+        return self.session.execute(delete(Tombstone).where(Tombstone.version <= newest)).rowcount
+
+
+sync = ChangeFeed()